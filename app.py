@@ -1,10 +1,14 @@
 import os
 import logging
-from flask import Flask, jsonify, render_template
+from flask import Flask, jsonify, render_template, abort
 from flask_cors import CORS
 from config import get_config
 from routes.analyze import analyze_bp
 from routes.question import question_bp
+from utils.document_registry import DocumentRegistry
+from utils.embeddings import warm_up_embeddings, is_embeddings_ready, get_embeddings_error
+from utils.reranker import warm_up_reranker
+from utils.validators import validate_document_id
 
 logging.basicConfig(
     level=logging.INFO,
@@ -12,20 +16,23 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Global variables for document state
-document_store = {
-    'retrieval_chain': None,
-    'document_text': '',
-    'document_metadata': {}
-}
 
-def get_document_store():
-    return document_store
+def _load_persisted_document(document_id):
+    # Import here to avoid circular imports
+    from routes.analyze import doc_processor
+    return doc_processor.load_document(document_id)
 
-def set_document_store(retrieval_chain, document_text, metadata=None):
-    document_store['retrieval_chain'] = retrieval_chain
-    document_store['document_text'] = document_text
-    document_store['document_metadata'] = metadata or {}
+
+# Analyzed documents, keyed by document ID
+document_registry = DocumentRegistry(loader=_load_persisted_document)
+
+def get_document_registry():
+    return document_registry
+
+def get_document(document_id):
+    if not validate_document_id(document_id):
+        return None
+    return document_registry.get(document_id)
 
 def create_app():
     # Set static_folder and template_folder to match your structure
@@ -50,15 +57,46 @@ def create_app():
     app.register_blueprint(analyze_bp, url_prefix='/api')
     app.register_blueprint(question_bp, url_prefix='/api')
 
-    # Health check
+    # Load the models ahead of the first request. When preloading, the
+    # reranker goes first: the embedding warm-up freezes the loaded objects
+    if config_class.EMBEDDING_PRELOAD:
+        if config_class.RERANK_ENABLED:
+            warm_up_reranker(background=False)
+        warm_up_embeddings(background=False)
+    elif config_class.EMBEDDING_WARMUP:
+        warm_up_embeddings(background=True)
+        if config_class.RERANK_ENABLED:
+            warm_up_reranker(background=True)
+
+    # Health check (liveness: the process is up and serving)
     @app.route('/health', methods=['GET'])
     def health_check():
         return jsonify({
             'status': 'healthy',
             'service': 'Document Analyzer API',
-            'version': '1.0.0'
+            'version': '1.0.0',
+            'ready': is_embeddings_ready()
         })
 
+    # Readiness: the embedding model is loaded and requests won't block on it
+    @app.route('/health/ready', methods=['GET'])
+    def readiness_check():
+        from routes.analyze import doc_processor
+
+        ready = is_embeddings_ready()
+        body = {
+            'ready': ready,
+            'embedding_model': 'loaded' if ready else 'loading',
+            'documents': document_registry.stats()
+        }
+        if doc_processor.answer_cache is not None:
+            body['answer_cache'] = doc_processor.answer_cache.stats()
+        error = get_embeddings_error()
+        if error:
+            body['embedding_model'] = 'failed'
+            body['error'] = error
+        return jsonify(body), 200 if ready else 503
+
     # Serve frontend (index.html) for root and any non-API path
     @app.route('/', defaults={'path': ''})
     @app.route('/<path:path>')
@@ -0,0 +1,81 @@
+"""
+Approximate nearest-neighbor benchmark: recall and latency against the flat index.
+
+Builds every FAISS index type over a synthetic corpus of clustered,
+normalized vectors (embedding-like) and compares each one with exact flat
+search:
+
+    python -m benchmarks.ann_benchmark --vectors 50000 --types flat ivf hnsw ivfpq
+
+recall@k is the fraction of the exact top-k neighbours an index returns.
+Search parameters come from the usual FAISS_* settings (e.g.
+FAISS_IVF_NPROBE, FAISS_HNSW_EF_SEARCH).
+"""
+import time
+import argparse
+import logging
+
+import faiss
+import numpy as np
+from utils.vector_index import create_index, INDEX_TYPES
+
+
+def make_vectors(count: int, dim: int, clusters: int, seed: int = 0, intrinsic_dim: int = 32) -> np.ndarray:
+    """
+    Unit vectors scattered around random cluster centres, like chunk
+    embeddings of documents on a handful of topics. The spread lives in a
+    low-dimensional subspace, as real embeddings do; isotropic noise in
+    full dimension makes every neighbour nearly equidistant.
+    """
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((clusters, dim)).astype(np.float32)
+    projection = rng.standard_normal((intrinsic_dim, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, count)
+    noise = rng.standard_normal((count, intrinsic_dim)).astype(np.float32) @ projection
+    vectors = centres[labels] + 0.5 * noise / np.sqrt(intrinsic_dim)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    hits = sum(len(set(row) & set(expected)) for row, expected in zip(found, truth))
+    return hits / truth.size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--types', nargs='+', default=list(INDEX_TYPES), choices=INDEX_TYPES)
+    parser.add_argument('--vectors', type=int, default=50000)
+    parser.add_argument('--dim', type=int, default=384)
+    parser.add_argument('--clusters', type=int, default=64)
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--k', type=int, default=10)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    # Queries come from the same distribution as the corpus
+    vectors = make_vectors(args.vectors + args.queries, args.dim, args.clusters)
+    vectors, queries = vectors[:args.vectors], vectors[args.vectors:]
+
+    exact = faiss.IndexFlatL2(args.dim)
+    exact.add(vectors)
+    _, truth = exact.search(queries, args.k)
+
+    print(f"{'type':<7} {'build s':>8} {'MB':>8} {'ms/query':>9} {'recall@' + str(args.k):>10}")
+    for index_type in args.types:
+        started = time.perf_counter()
+        index = create_index(vectors, index_type)
+        build_seconds = time.perf_counter() - started
+        size_mb = faiss.serialize_index(index).nbytes / (1024 * 1024)
+
+        # One query at a time, as the app searches
+        started = time.perf_counter()
+        found = np.vstack([index.search(queries[i:i + 1], args.k)[1] for i in range(len(queries))])
+        latency_ms = (time.perf_counter() - started) * 1000 / len(queries)
+
+        print(f"{index_type:<7} {build_seconds:>8.2f} {size_mb:>8.1f} {latency_ms:>9.3f} "
+              f"{recall_at_k(found, truth):>10.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Embedding throughput benchmark (chunks per second).
+
+Compares embedding backends, batch sizes and torch thread counts on a
+synthetic corpus of document-sized chunks:
+
+    python -m benchmarks.embedding_benchmark --backends torch onnx-int8 --batch-sizes 32 64 128
+"""
+import time
+import random
+import argparse
+import logging
+
+import numpy as np
+from utils.embeddings import create_embeddings, embed_texts
+from config import get_config
+
+WORDS = (
+    "document analysis retrieval summary vector index embedding query answer context model "
+    "section report data result method figure table value system process network error user"
+).split()
+
+
+def make_chunks(count: int, chunk_size: int, seed: int = 0):
+    """
+    Build synthetic chunks roughly chunk_size characters long
+    """
+    rng = random.Random(seed)
+    chunks = []
+    for _ in range(count):
+        words = []
+        length = 0
+        while length < chunk_size:
+            word = rng.choice(WORDS)
+            words.append(word)
+            length += len(word) + 1
+        chunks.append(' '.join(words))
+    return chunks
+
+
+def main():
+    config = get_config()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backends', nargs='+', default=['torch'])
+    parser.add_argument('--batch-sizes', nargs='+', type=int, default=[config.EMBEDDING_BATCH_SIZE])
+    parser.add_argument('--threads', nargs='+', type=int, default=[config.EMBEDDING_NUM_THREADS])
+    parser.add_argument('--chunks', type=int, default=512)
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    chunks = make_chunks(args.chunks, config.CHUNK_SIZE)
+    reference = None
+
+    print(f"{'backend':<10} {'threads':>7} {'batch':>6} {'chunks/s':>10} {'cos vs first':>13}")
+    for backend in args.backends:
+        for threads in args.threads:
+            embeddings = create_embeddings(backend, num_threads=threads)
+            # Warm up so model initialization is not timed
+            embed_texts(chunks[:8], embeddings=embeddings)
+
+            for batch_size in args.batch_sizes:
+                best = float('inf')
+                for _ in range(args.repeats):
+                    started = time.perf_counter()
+                    vectors = embed_texts(chunks, batch_size=batch_size, embeddings=embeddings)
+                    best = min(best, time.perf_counter() - started)
+
+                # Agreement with the first configuration, to spot quantization loss
+                if reference is None:
+                    reference = vectors
+                agreement = float(np.mean(np.sum(reference * vectors, axis=1)))
+
+                print(f"{backend:<10} {threads or 'auto':>7} {batch_size:>6} "
+                      f"{len(chunks) / best:>10.1f} {agreement:>13.4f}")
+
+
+if __name__ == '__main__':
+    main()
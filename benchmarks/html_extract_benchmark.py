@@ -0,0 +1,134 @@
+"""
+HTML extraction benchmark (milliseconds per page).
+
+Runs every extraction backend over a corpus of saved HTML pages and
+reports parse+extract time and how much text each backend kept:
+
+    python -m benchmarks.html_extract_benchmark --backends lxml bs4
+
+Pages are read from benchmarks/html_corpus/*.html. Add real pages with
+--fetch URL ... (they are saved into the corpus), or regenerate the
+synthetic heavy pages with --generate.
+"""
+import os
+import re
+import time
+import random
+import argparse
+import logging
+
+import requests
+from utils.html_extract import create_extractor, EXTRACTION_BACKENDS
+
+CORPUS_DIR = os.path.join(os.path.dirname(__file__), 'html_corpus')
+
+WORDS = (
+    "document analysis retrieval summary vector index embedding query answer context model "
+    "section report data result method figure table value system process network error user"
+).split()
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize() + '.'
+
+
+def make_page(kind: str, sections: int, seed: int = 0) -> str:
+    """
+    Build a synthetic page. 'article' has a <main> container, 'nested' has
+    only deeply nested divs (the quadratic case for the bs4 fallback) and
+    'paragraphs' has bare paragraphs with no main container.
+    """
+    rng = random.Random(seed)
+    head = (
+        '<head><title>Synthetic %s page</title>'
+        '<meta name="description" content="Benchmark page">'
+        '<script>var tracking = {};</script><style>body { margin: 0 }</style></head>' % kind
+    )
+    nav = '<nav>' + ''.join('<a href="#s%d">Section %d</a>' % (i, i) for i in range(sections)) + '</nav>'
+    body = []
+
+    for i in range(sections):
+        paragraphs = ''.join('<p>%s</p>' % _sentence(rng, rng.randint(15, 40)) for _ in range(4))
+        if kind == 'nested':
+            depth = rng.randint(4, 10)
+            body.append('<div class="wrap">' * depth + '<h2>Section %d</h2>%s' % (i, paragraphs) + '</div>' * depth)
+        else:
+            body.append('<section id="s%d"><h2>Section %d</h2>%s</section>' % (i, i, paragraphs))
+
+    content = ''.join(body)
+    if kind == 'article':
+        content = '<main><article>%s</article></main>' % content
+    elif kind == 'nested':
+        content = '<div id="page">%s</div>' % content
+
+    return '<!DOCTYPE html><html>%s<body><header>Site</header>%s%s<footer>Footer</footer></body></html>' % (
+        head, nav, content
+    )
+
+
+def generate_corpus(sections: int):
+    os.makedirs(CORPUS_DIR, exist_ok=True)
+    for kind in ('article', 'nested', 'paragraphs'):
+        path = os.path.join(CORPUS_DIR, f'synthetic-{kind}.html')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(make_page(kind, sections))
+        print(f"Wrote {path}")
+
+
+def fetch_pages(urls):
+    os.makedirs(CORPUS_DIR, exist_ok=True)
+    for url in urls:
+        response = requests.get(url, timeout=30)
+        response.raise_for_status()
+        name = re.sub(r'[^0-9A-Za-z_.-]+', '_', url.split('://', 1)[-1]).strip('_')[:80]
+        path = os.path.join(CORPUS_DIR, f'{name}.html')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(response.text)
+        print(f"Saved {url} to {path}")
+
+
+def load_corpus():
+    pages = []
+    for name in sorted(os.listdir(CORPUS_DIR)):
+        if name.endswith('.html'):
+            with open(os.path.join(CORPUS_DIR, name), encoding='utf-8', errors='replace') as f:
+                pages.append((name, f.read()))
+    return pages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backends', nargs='+', default=list(EXTRACTION_BACKENDS), choices=EXTRACTION_BACKENDS)
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--fetch', nargs='+', metavar='URL', help='Save pages into the corpus first')
+    parser.add_argument('--generate', action='store_true', help='Regenerate the synthetic pages first')
+    parser.add_argument('--sections', type=int, default=40, help='Sections per generated page')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    if args.generate:
+        generate_corpus(args.sections)
+    if args.fetch:
+        fetch_pages(args.fetch)
+
+    pages = load_corpus()
+    if not pages:
+        parser.error(f"No pages in {CORPUS_DIR}; use --generate or --fetch")
+
+    extractors = [create_extractor(backend) for backend in args.backends]
+
+    print(f"{'page':<40} {'KB':>7} " + ' '.join(f"{e.name + ' ms':>10} {e.name + ' chars':>11}" for e in extractors))
+    for name, html in pages:
+        row = f"{name[:40]:<40} {len(html) / 1024:>7.1f} "
+        for extractor in extractors:
+            best = float('inf')
+            for _ in range(args.repeats):
+                started = time.perf_counter()
+                result = extractor.extract(html, 'https://example.com/')
+                best = min(best, time.perf_counter() - started)
+            row += f"{best * 1000:>10.1f} {len(result['content']):>11} "
+        print(row)
+
+
+if __name__ == '__main__':
+    main()
@@ -15,22 +15,121 @@ class Config:
     UPLOAD_FOLDER = 'uploads'
     ALLOWED_EXTENSIONS = {'pdf'}
 
+    # PDF extraction settings
+    PDF_PARALLEL_MIN_PAGES = int(os.environ.get('PDF_PARALLEL_MIN_PAGES', 32))  # Smaller files extract serially
+    PDF_EXTRACT_WORKERS = int(os.environ.get('PDF_EXTRACT_WORKERS', 0))  # 0 = one per CPU
+
     # Vector store settings
     VECTOR_STORE_PATH = 'vector_stores'
+    VECTOR_STORE_MMAP = os.environ.get('VECTOR_STORE_MMAP', 'True').lower() == 'true'
     EMBEDDING_MODEL = 'all-MiniLM-L6-v2'
+    EMBEDDING_BACKEND = os.environ.get('EMBEDDING_BACKEND', 'torch')  # 'torch', 'onnx' or 'onnx-int8'
+    EMBEDDING_ONNX_INT8_FILE = 'onnx/model_quint8_avx2.onnx'
+    EMBEDDING_BATCH_SIZE = int(os.environ.get('EMBEDDING_BATCH_SIZE', 64))
+    EMBEDDING_NUM_THREADS = int(os.environ.get('EMBEDDING_NUM_THREADS', 0))  # 0 = torch default
+    EMBEDDING_CACHE_ENABLED = os.environ.get('EMBEDDING_CACHE_ENABLED', 'True').lower() == 'true'
+    EMBEDDING_CACHE_PATH = os.path.join(VECTOR_STORE_PATH, 'embedding_cache')
+    # Load the model in the background at startup instead of on the first request
+    EMBEDDING_WARMUP = os.environ.get('EMBEDDING_WARMUP', 'True').lower() == 'true'
+    # Load the model before forking workers (gunicorn preload_app) so they share it copy-on-write
+    EMBEDDING_PRELOAD = os.environ.get('EMBEDDING_PRELOAD', 'False').lower() == 'true'
+
+    # Background analysis jobs
+    ANALYZE_WORKERS = int(os.environ.get('ANALYZE_WORKERS', 2))
+    ANALYZE_MAX_PENDING_JOBS = int(os.environ.get('ANALYZE_MAX_PENDING_JOBS', 16))
+    JOB_STATE_PATH = os.path.join(VECTOR_STORE_PATH, 'jobs')
+    JOB_TTL_SECONDS = 3600
+
+    # Batch analysis (/api/analyze/batch)
+    ANALYZE_BATCH_MAX_SOURCES = int(os.environ.get('ANALYZE_BATCH_MAX_SOURCES', 256))
+    BATCH_FETCH_WORKERS = int(os.environ.get('BATCH_FETCH_WORKERS', 8))
+    BATCH_PER_HOST_CONCURRENCY = int(os.environ.get('BATCH_PER_HOST_CONCURRENCY', 2))
+
+    # Document registry settings
+    DOCUMENT_REGISTRY_MAX_MEMORY_MB = int(os.environ.get('DOCUMENT_REGISTRY_MAX_MEMORY_MB', 1024))
 
     # Text processing settings
     CHUNK_SIZE = 1000
     CHUNK_OVERLAP = 200
+    # Retrieval settings: vector search fused with BM25 keyword search (reciprocal-rank fusion)
+    RETRIEVAL_K = 4
+    RETRIEVAL_FETCH_K = 20  # Candidates taken from each retriever before fusion
+    HYBRID_SEARCH_ENABLED = os.environ.get('HYBRID_SEARCH_ENABLED', 'True').lower() == 'true'
+    HYBRID_VECTOR_WEIGHT = 1.0
+    HYBRID_KEYWORD_WEIGHT = 1.0
+    RRF_K = 60
+    # Optional cross-encoder reranking: RERANK_FETCH_K candidates are rescored and the best
+    # RERANK_TOP_N sent to the LLM; over RERANK_TIMEOUT_MS the retrieval order is kept
+    RERANK_ENABLED = os.environ.get('RERANK_ENABLED', 'False').lower() == 'true'
+    RERANK_MODEL = os.environ.get('RERANK_MODEL', 'cross-encoder/ms-marco-MiniLM-L-6-v2')
+    RERANK_MAX_LENGTH = 512  # Tokens per question + chunk pair
+    RERANK_FETCH_K = int(os.environ.get('RERANK_FETCH_K', 20))
+    RERANK_TOP_N = int(os.environ.get('RERANK_TOP_N', 3))
+    RERANK_TIMEOUT_MS = int(os.environ.get('RERANK_TIMEOUT_MS', 300))
+    RERANK_MAX_CONCURRENCY = int(os.environ.get('RERANK_MAX_CONCURRENCY', 2))
+    # FAISS index type: 'flat' (exact), 'ivf', 'hnsw' or 'ivfpq' (compressed).
+    # Approximate types are only built once a document has FAISS_ANN_MIN_CHUNKS chunks.
+    FAISS_INDEX_TYPE = os.environ.get('FAISS_INDEX_TYPE', 'flat')
+    FAISS_ANN_MIN_CHUNKS = int(os.environ.get('FAISS_ANN_MIN_CHUNKS', 5000))
+    FAISS_IVF_NLIST = int(os.environ.get('FAISS_IVF_NLIST', 0))  # 0 = about 4 * sqrt(chunks)
+    FAISS_IVF_NPROBE = int(os.environ.get('FAISS_IVF_NPROBE', 16))
+    FAISS_HNSW_M = 32
+    FAISS_HNSW_EF_CONSTRUCTION = 80
+    FAISS_HNSW_EF_SEARCH = int(os.environ.get('FAISS_HNSW_EF_SEARCH', 64))
+    FAISS_PQ_M = int(os.environ.get('FAISS_PQ_M', 48))  # Sub-quantizers; must divide the embedding dimension
+    INGEST_BATCH_CHUNKS = int(os.environ.get('INGEST_BATCH_CHUNKS', 256))  # Chunks embedded per streaming batch
     MAX_TOKENS = 512
+    # Prompt sizing: context is packed into CONTEXT_BUDGET_TOKENS, and never more than the model's
+    # window minus the completion (MAX_TOKENS), the prompt template and the question
+    CONTEXT_WINDOW_TOKENS = int(os.environ.get('CONTEXT_WINDOW_TOKENS', 8192))
+    CONTEXT_BUDGET_TOKENS = int(os.environ.get('CONTEXT_BUDGET_TOKENS', 3000))
+    PROMPT_OVERHEAD_TOKENS = 250  # System prompt and instructions
+    # Tokenizer used to count tokens (a Hugging Face hub name); empty = estimate from characters
+    CONTEXT_TOKENIZER = os.environ.get('CONTEXT_TOKENIZER', 'sentence-transformers/all-MiniLM-L6-v2')
+
+    # Summarization settings
+    SUMMARY_MAX_CONCURRENCY = int(os.environ.get('SUMMARY_MAX_CONCURRENCY', 4))
+    SUMMARY_SECTION_TOKENS = int(os.environ.get('SUMMARY_SECTION_TOKENS', 1000))  # Text per map-phase LLM call
+    SUMMARY_REDUCE_FANOUT = 8  # Summaries merged per reduce call
+    SUMMARY_CACHE_MAX_ENTRIES = 256
+    SUMMARY_CACHE_PERSIST = os.environ.get('SUMMARY_CACHE_PERSIST', 'True').lower() == 'true'
+    # Document-specific suggested questions, generated from the section summaries
+    SUGGESTED_QUESTIONS_COUNT = 6
+    SUGGESTION_PREANSWER = os.environ.get('SUGGESTION_PREANSWER', 'True').lower() == 'true'
+
+    # Answer cache: exact (normalized) question matches, then embedding neighbours above the threshold
+    ANSWER_CACHE_ENABLED = os.environ.get('ANSWER_CACHE_ENABLED', 'True').lower() == 'true'
+    ANSWER_CACHE_TTL = int(os.environ.get('ANSWER_CACHE_TTL', 3600))  # Seconds; 0 = no expiry
+    ANSWER_CACHE_MAX_ENTRIES = 256  # Per document
+    ANSWER_CACHE_MAX_DOCUMENTS = 64
+    ANSWER_CACHE_SIMILARITY = float(os.environ.get('ANSWER_CACHE_SIMILARITY', 0.95))  # Cosine
 
     # Groq model settings
     GROQ_MODEL = 'llama3-8b-8192'
     GROQ_API_URL = 'https://api.groq.com/openai/v1/chat/completions'
 
+    # LLM transport settings
+    LLM_POOL_SIZE = int(os.environ.get('LLM_POOL_SIZE', 16))
+    LLM_CONNECT_TIMEOUT = 5
+    LLM_READ_TIMEOUT = 45
+    LLM_MAX_RETRIES = 5
+    LLM_RETRY_BACKOFF = 1.0  # Base seconds for exponential backoff
+    # Concurrent LLM calls for batched questions; halved on rate limits, then recovers
+    LLM_BATCH_CONCURRENCY = int(os.environ.get('LLM_BATCH_CONCURRENCY', 8))
+
+    # Batch questions (/api/ask/batch)
+    ASK_BATCH_MAX_QUESTIONS = int(os.environ.get('ASK_BATCH_MAX_QUESTIONS', 100))
+
     # Web scraping settings
     REQUEST_TIMEOUT = 30
     MAX_URL_LENGTH = 2048
+    SCRAPER_MAX_BYTES = int(os.environ.get('SCRAPER_MAX_BYTES', 16 * 1024 * 1024))  # Download size cap
+    SCRAPER_BACKEND = os.environ.get('SCRAPER_BACKEND', 'lxml')  # 'lxml' or 'bs4'
+    SCRAPER_POOL_SIZE = int(os.environ.get('SCRAPER_POOL_SIZE', 10))
+    SCRAPER_CACHE_ENABLED = os.environ.get('SCRAPER_CACHE_ENABLED', 'True').lower() == 'true'
+    SCRAPER_CACHE_TTL = int(os.environ.get('SCRAPER_CACHE_TTL', 300))  # Upper bound for max-age, in seconds
+    SCRAPER_CACHE_MAX_ENTRIES = 128
+    SCRAPER_CACHE_MAX_MB = int(os.environ.get('SCRAPER_CACHE_MAX_MB', 64))
 
     # Hosting and debugging (read from env)
     HOST = os.environ.get("HOST", "0.0.0.0")
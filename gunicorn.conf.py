@@ -0,0 +1,11 @@
+import os
+
+# Run with: gunicorn -c gunicorn.conf.py "app:create_app()"
+bind = f"{os.environ.get('HOST', '0.0.0.0')}:{os.environ.get('PORT', 5000)}"
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+timeout = 120
+
+# With EMBEDDING_PRELOAD=true the app (and the embedding model) is loaded once
+# in the master process and shared copy-on-write by the forked workers
+preload_app = os.environ.get('EMBEDDING_PRELOAD', 'False').lower() == 'true'
@@ -1,10 +1,14 @@
-import os
+import io
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
 from flask import Blueprint, request, jsonify
 from werkzeug.utils import secure_filename
 from utils.scraper import WebScraper
 from utils.pdf_reader import PDFProcessor
 from utils.chain import DocumentProcessor
+from utils.jobs import JobManager, JobQueueFullError
 from utils.validators import validate_url, validate_file
 from config import get_config
 
@@ -17,21 +21,24 @@ analyze_bp = Blueprint('analyze', __name__)
 web_scraper = WebScraper()
 pdf_processor = PDFProcessor()
 doc_processor = DocumentProcessor()
+job_manager = JobManager()
+
+# Reported when every summarization call failed (the summary isn't cached, so a retry regenerates it)
+SUMMARY_FAILED_MESSAGE = 'Failed to generate a summary; please try again later'
+
+# Per-host limits for concurrent batch fetches
+_host_semaphores = {}
+_host_semaphores_lock = threading.Lock()
 
 
 @analyze_bp.route('/analyze', methods=['POST'])
 def analyze_document():
     """
-    Analyze a document from URL or PDF upload
+    Queue analysis of a document from URL or PDF upload.
+    Returns a job ID immediately; poll /analyze/jobs/<job_id> for progress.
     """
     try:
-        config = get_config()
-
-        # Import here to avoid circular imports
-        from app import get_document_store, set_document_store
-
-        document_data = None
-        source_type = None
+        source = None
 
         # Check if PDF file was uploaded
         if 'pdf' in request.files:
@@ -44,25 +51,14 @@ def analyze_document():
             if not validate_file(pdf_file, ['pdf']):
                 return jsonify({'error': 'Invalid PDF file'}), 400
 
-            logger.info(f"Processing PDF upload: {pdf_file.filename}")
-
-            try:
-                # Process PDF
-                pdf_data = pdf_processor.read_pdf_content(pdf_file)
-                document_data = {
-                    'content': pdf_data['content'],
-                    'metadata': {
-                        **pdf_data['metadata'],
-                        'source_type': 'pdf',
-                        'filename': secure_filename(pdf_file.filename),
-                        'file_size': pdf_data.get('char_count', 0)
-                    }
-                }
-                source_type = 'pdf'
+            logger.info(f"Queueing PDF upload: {pdf_file.filename}")
 
-            except Exception as e:
-                logger.error(f"PDF processing error: {str(e)}")
-                return jsonify({'error': f'Failed to process PDF: {str(e)}'}), 400
+            # The upload stream is closed when the request ends, so keep the bytes for the job
+            source = {
+                'type': 'pdf',
+                'data': pdf_file.read(),
+                'filename': secure_filename(pdf_file.filename)
+            }
 
         # Check if URL was provided
         elif request.is_json:
@@ -76,101 +72,498 @@ def analyze_document():
             if not validate_url(url):
                 return jsonify({'error': 'Invalid URL format'}), 400
 
-            logger.info(f"Processing URL: {url}")
-
-            try:
-                # Scrape URL content
-                url_data = web_scraper.scrape_url_content(url)
-                document_data = {
-                    'content': url_data['content'],
-                    'metadata': {
-                        **url_data['metadata'],
-                        'source_type': 'url',
-                        'title': url_data.get('title', 'Untitled'),
-                        'word_count': url_data.get('word_count', 0)
-                    }
-                }
-                source_type = 'url'
-
-            except Exception as e:
-                logger.error(f"URL scraping error: {str(e)}")
-                return jsonify({'error': f'Failed to scrape URL: {str(e)}'}), 400
+            logger.info(f"Queueing URL: {url}")
+            source = {'type': 'url', 'url': url}
 
         else:
             return jsonify({'error': 'No URL or PDF file provided'}), 400
 
-        # Validate document content
-        if not document_data['content'].strip():
-            return jsonify({'error': 'No readable content found in the document'}), 400
-
-        # Process document and create retrieval chain
         try:
-            logger.info("Creating retrieval chain...")
+            job = job_manager.submit(_run_analysis, source)
+        except JobQueueFullError as e:
+            return jsonify({'error': str(e)}), 503
+
+        return jsonify({
+            'success': True,
+            'job_id': job.job_id,
+            'status_url': f'/api/analyze/jobs/{job.job_id}',
+            'message': f'Analysis of {source["type"].upper()} queued'
+        }), 202
+
+    except Exception as e:
+        logger.error(f"Unexpected error in analyze endpoint: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+
+@analyze_bp.route('/analyze/jobs/<job_id>', methods=['GET'])
+def get_analysis_job(job_id):
+    """
+    Get progress of a queued analysis job
+    """
+    try:
+        job = job_manager.get(job_id)
+
+        if job is None:
+            return jsonify({'error': 'Job not found'}), 404
+
+        return jsonify(job)
+
+    except Exception as e:
+        logger.error(f"Error getting job status: {str(e)}")
+        return jsonify({'error': 'Failed to get job status'}), 500
+
+
+def _run_analysis(job, source):
+    """
+    Background analysis pipeline: extract, chunk, embed, index, then summarize.
+    The document is registered as soon as its index is ready so questions can
+    be asked while the summary is still being generated.
+    """
+    # Import here to avoid circular imports
+    from app import get_document_registry
+
+    source_type = source['type']
+    job.update('extract', 0.0, f'Extracting text from {source_type.upper()}')
+
+    stage_messages = {
+        'chunk': 'Splitting document into chunks',
+        'embed': 'Embedding document chunks',
+        'index': 'Building search index',
+    }
+
+    def report(stage, fraction):
+        job.update(stage, fraction, stage_messages.get(stage))
+
+    if source_type == 'pdf':
+        retrieval_chain, metadata = _index_pdf(
+            io.BytesIO(source['data']),
+            {'filename': source['filename'], 'file_size': len(source['data'])},
+            report,
+            source_key=doc_processor.get_source_key(source['data'])
+        )
+    else:
+        retrieval_chain, metadata = _index_url(source['url'], report)
+
+    # Register the document so questions can reference it by ID
+    document_id = retrieval_chain.index_key
+    statistics = retrieval_chain.statistics
+    get_document_registry().put(
+        document_id,
+        retrieval_chain,
+        metadata,
+        statistics
+    )
+    job.set_document(document_id)
+
+    # Generate summary (returns markdown with bullets/sections) and suggested questions
+    summary = _summarize(job, retrieval_chain)
+
+    logger.info(f"Successfully processed {source_type} document")
+    return {
+        'success': True,
+        'document_id': document_id,
+        'message': f'Successfully analyzed {source_type.upper()}',
+        **summary,
+        'metadata': {
+            'source_type': source_type,
+            'content_length': statistics.get('total_characters', 0),
+            'word_count': statistics.get('total_words', 0),
+            **metadata
+        },
+        'ready_for_questions': True
+    }
+
+
+def _summarize(job, retrieval_chain):
+    """
+    Summarize an indexed document, then generate its suggested questions from
+    the section summaries (whose answers are pre-generated in the background).
+    Returns the summary fields of the job result; when no summary could be
+    generated they include a summary_error, and the document can still be
+    asked about.
+    """
+    job.update('summarize', 0.0, 'Generating summary')
+    section_summaries = []
+    summary_markdown = doc_processor.get_document_summary(
+        retrieval_chain.get_chunks(),
+        document_id=retrieval_chain.index_key,
+        progress=lambda stage, fraction: job.update(stage, fraction),
+        section_summaries=section_summaries
+    )
+
+    # A cached summary comes without section summaries; the summary itself will do
+    summaries = [summary for summary in section_summaries or [summary_markdown] if summary.strip()]
+    if summaries or retrieval_chain.suggested_questions:
+        if not retrieval_chain.suggested_questions:
+            job.update('summarize', 0.95, 'Suggesting questions')
+        suggested_questions = doc_processor.prepare_suggestions(retrieval_chain, summaries)
+    else:
+        # Nothing to suggest questions from
+        suggested_questions = []
+
+    fields = {
+        'summary_markdown': summary_markdown,
+        'suggested_questions': suggested_questions
+    }
+    if not summary_markdown.strip():
+        logger.warning(f"No summary generated for document {retrieval_chain.index_key}")
+        fields['summary_error'] = SUMMARY_FAILED_MESSAGE
+    return fields
+
+
+def _index_pdf(file_obj, metadata, report, source_key=None):
+    """
+    Index a PDF, streaming its pages through chunking and embedding.
+    With a source_key, an identical PDF indexed before is reused without extraction.
+    Returns (retrieval_chain, metadata).
+    """
+    metadata = {'source_type': 'pdf', **metadata}
+
+    if source_key:
+        retrieval_chain = doc_processor.load_by_source(source_key)
+        if retrieval_chain is not None:
+            metadata = {**retrieval_chain.document_metadata, **metadata}
+            retrieval_chain.document_metadata = metadata
+            report('index', 1.0)
+            return retrieval_chain, metadata
+
+    try:
+        pdf_stream = pdf_processor.iter_pdf_pages(file_obj)
+    except Exception as e:
+        logger.error(f"PDF processing error: {str(e)}")
+        raise Exception(f'Failed to process PDF: {str(e)}')
+
+    metadata = {
+        **pdf_stream['metadata'],
+        **metadata,
+        'extraction_mode': pdf_stream['extraction_mode']
+    }
+
+    # Pages are chunked and embedded as they are extracted
+    logger.info("Creating retrieval chain from streamed pages...")
+    retrieval_chain = doc_processor.process_segments(
+        pdf_stream['pages'],
+        metadata,
+        progress=report,
+        total_segments=pdf_stream['page_count'],
+        source_key=source_key
+    )
+    metadata['extraction_ms'] = pdf_stream['extraction_ms']
+    return retrieval_chain, metadata
+
+
+def _index_url(url, report):
+    """
+    Index a web page (or a PDF served from a URL), re-using or incrementally
+    updating the index from the previous fetch of the same URL.
+    Returns (retrieval_chain, metadata).
+    """
+    index_store = doc_processor.index_store
+    url_state = index_store.load_url_state(url)
+
+    try:
+        url_data = web_scraper.scrape_url_content(
+            url,
+            etag=url_state.get('etag') if url_state else None,
+            last_modified=url_state.get('last_modified') if url_state else None
+        )
+    except Exception as e:
+        logger.error(f"URL scraping error: {str(e)}")
+        raise Exception(f'Failed to scrape URL: {str(e)}')
+
+    if url_data['not_modified']:
+        loaded = doc_processor.load_document(url_state['index_key'])
+        if loaded is not None:
+            # Unchanged since the last fetch: reuse the stored index as is
+            retrieval_chain, metadata, _ = loaded
+            report('index', 1.0)
+            return retrieval_chain, metadata
+
+        # The stored index vanished meanwhile; fetch the page unconditionally
+        url_data = web_scraper.scrape_url_content(url)
+
+    if url_data.get('content_type') == 'pdf':
+        with url_data['pdf_file'] as pdf_file:
+            retrieval_chain, metadata = _index_pdf(
+                pdf_file,
+                {'filename': url_data['filename'], 'source_url': url},
+                report
+            )
+    else:
+        # Validate document content
+        if not url_data['content'].strip():
+            raise ValueError('No readable content found in the document')
+
+        metadata = {
+            **url_data['metadata'],
+            'source_type': 'url',
+            'title': url_data.get('title', 'Untitled'),
+            'word_count': url_data.get('word_count', 0)
+        }
+
+        # Process document and create retrieval chain, re-embedding only
+        # changed chunks when a previous version of the page is indexed
+        logger.info("Creating retrieval chain...")
+        if url_state:
+            retrieval_chain = doc_processor.update_document(
+                url_state['index_key'],
+                url_data['content'],
+                metadata,
+                progress=report
+            )
+        else:
             retrieval_chain = doc_processor.process_document(
-                document_data['content'],
-                document_data['metadata']
+                url_data['content'],
+                metadata,
+                progress=report
             )
 
-            # Store in global state
-            set_document_store(
-                retrieval_chain,
-                document_data['content'],
-                document_data['metadata']
-            )
+    try:
+        index_store.save_url_state(url, {
+            'etag': url_data.get('etag'),
+            'last_modified': url_data.get('last_modified'),
+            'index_key': retrieval_chain.index_key
+        })
+    except OSError as e:
+        logger.warning(f"Failed to record fetch state for {url}: {str(e)}")
 
-            # Generate summary (returns markdown with bullets/sections)
-            summary_markdown = doc_processor.get_document_summary(document_data['content'])
-
-            # Prepare response
-            response_data = {
-                'success': True,
-                'message': f'Successfully analyzed {source_type.upper()}',
-                'summary_markdown': summary_markdown,
-                'metadata': {
-                    'source_type': source_type,
-                    'content_length': len(document_data['content']),
-                    'word_count': len(document_data['content'].split()),
-                    **document_data['metadata']
-                },
-                'ready_for_questions': True
-            }
+    return retrieval_chain, metadata
 
-            logger.info(f"Successfully processed {source_type} document")
-            return jsonify(response_data)
 
-        except Exception as e:
-            logger.error(f"Document processing error: {str(e)}")
-            return jsonify({'error': f'Failed to process document: {str(e)}'}), 500
+@analyze_bp.route('/analyze/batch', methods=['POST'])
+def analyze_batch():
+    """
+    Queue analysis of many URLs and/or PDF uploads into one searchable collection.
+    URLs come as a JSON list {"urls": [...]} or as repeated "urls" form fields
+    next to "pdfs" file uploads. Returns a job ID like /analyze.
+    """
+    try:
+        config = get_config()
+        sources = []
+
+        if request.is_json:
+            urls = (request.get_json() or {}).get('urls') or []
+        else:
+            urls = request.form.getlist('urls')
+        if not isinstance(urls, list):
+            return jsonify({'error': 'urls must be a list'}), 400
+
+        seen = set()
+        for url in urls:
+            url = str(url).strip()
+            if not url or url in seen:
+                continue
+            if not validate_url(url):
+                return jsonify({'error': f'Invalid URL format: {url}'}), 400
+            seen.add(url)
+            sources.append({'type': 'url', 'url': url})
+
+        for pdf_file in request.files.getlist('pdfs') + request.files.getlist('pdf'):
+            if pdf_file.filename == '':
+                continue
+            if not validate_file(pdf_file, ['pdf']):
+                return jsonify({'error': f'Invalid PDF file: {pdf_file.filename}'}), 400
+            sources.append({
+                'type': 'pdf',
+                'data': pdf_file.read(),
+                'filename': secure_filename(pdf_file.filename)
+            })
+
+        if not sources:
+            return jsonify({'error': 'No URLs or PDF files provided'}), 400
+        if len(sources) > config.ANALYZE_BATCH_MAX_SOURCES:
+            return jsonify({
+                'error': f'Too many documents in one batch (maximum {config.ANALYZE_BATCH_MAX_SOURCES})'
+            }), 400
+
+        logger.info(f"Queueing batch of {len(sources)} documents")
+
+        try:
+            job = job_manager.submit(_run_batch_analysis, sources)
+        except JobQueueFullError as e:
+            return jsonify({'error': str(e)}), 503
+
+        return jsonify({
+            'success': True,
+            'job_id': job.job_id,
+            'status_url': f'/api/analyze/jobs/{job.job_id}',
+            'message': f'Analysis of {len(sources)} documents queued'
+        }), 202
 
     except Exception as e:
-        logger.error(f"Unexpected error in analyze endpoint: {str(e)}")
+        logger.error(f"Unexpected error in batch analyze endpoint: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
 
 
+def _run_batch_analysis(job, sources):
+    """
+    Background batch pipeline: fetch and parse all sources concurrently, then
+    chunk and embed them in shared batches into one combined index whose
+    chunks record their source document. Sources that fail are reported and
+    skipped.
+    """
+    # Import here to avoid circular imports
+    from app import get_document_registry
+
+    config = get_config()
+    total = len(sources)
+    job.update('extract', 0.0, f'Fetching {total} documents')
+
+    outcomes = [None] * total
+    completed = []
+
+    def extract(index, source):
+        try:
+            return _extract_batch_source(source)
+        finally:
+            completed.append(index)
+            job.update('extract', len(completed) / total, f'Fetched {len(completed)} of {total} documents')
+
+    def report(stage, fraction):
+        # Extract/embed progress is reported per source by the generator below
+        if stage == 'index':
+            job.update(stage, fraction, 'Building search index')
+
+    def segments(futures):
+        # Consume in input order so embedding overlaps with later fetches
+        for index, future in enumerate(futures):
+            source = sources[index]
+            label = source.get('url') or source.get('filename')
+            try:
+                document = future.result()
+            except Exception as e:
+                logger.warning(f"Skipping batch source {label}: {str(e)}")
+                outcomes[index] = {'source': label, 'status': 'failed', 'error': str(e)}
+                continue
+
+            outcomes[index] = {'source': label, 'status': 'indexed', 'title': document['title']}
+            source_metadata = {
+                'source': label,
+                'source_index': index,
+                'source_type': document['source_type'],
+                'title': document['title']
+            }
+            for page_num, text in document['segments']:
+                yield page_num, text, source_metadata
+            job.update('embed', (index + 1) / total, 'Embedding document chunks')
+
+    with ThreadPoolExecutor(max_workers=config.BATCH_FETCH_WORKERS, thread_name_prefix='batch-fetch') as executor:
+        futures = [executor.submit(extract, index, source) for index, source in enumerate(sources)]
+        try:
+            retrieval_chain = doc_processor.process_segments(
+                segments(futures),
+                {'source_type': 'collection', 'title': f'Collection of {total} documents', 'source_count': total},
+                progress=report
+            )
+        except ValueError:
+            failed = [outcome for outcome in outcomes if outcome and outcome['status'] == 'failed']
+            if len(failed) == total:
+                raise ValueError(f"None of the {total} documents could be processed")
+            raise
+
+    indexed = [outcome for outcome in outcomes if outcome and outcome['status'] == 'indexed']
+    metadata = {
+        **retrieval_chain.document_metadata,
+        'source_count': len(indexed),
+        'failed_count': total - len(indexed),
+        'sources': [outcome['source'] for outcome in indexed]
+    }
+    retrieval_chain.document_metadata = metadata
+
+    # Register the collection so questions search across all of its documents
+    document_id = retrieval_chain.index_key
+    statistics = retrieval_chain.statistics
+    get_document_registry().put(document_id, retrieval_chain, metadata, statistics)
+    job.set_document(document_id)
+
+    summary = _summarize(job, retrieval_chain)
+
+    logger.info(f"Successfully processed batch of {len(indexed)}/{total} documents")
+    return {
+        'success': True,
+        'document_id': document_id,
+        'message': f'Successfully analyzed {len(indexed)} of {total} documents',
+        **summary,
+        'metadata': {
+            'content_length': statistics.get('total_characters', 0),
+            'word_count': statistics.get('total_words', 0),
+            **metadata
+        },
+        'sources': outcomes,
+        'ready_for_questions': True
+    }
+
+
+def _extract_batch_source(source):
+    """
+    Fetch and extract one batch source into its text segments
+    """
+    if source['type'] == 'pdf':
+        pdf_stream = pdf_processor.iter_pdf_pages(io.BytesIO(source['data']))
+        return {
+            'source_type': 'pdf',
+            'title': pdf_stream['metadata'].get('title') or source['filename'],
+            'segments': list(pdf_stream['pages'])
+        }
+
+    url = source['url']
+    with _host_semaphore(urlparse(url).netloc):
+        url_data = web_scraper.scrape_url_content(url)
+
+    if url_data.get('content_type') == 'pdf':
+        with url_data['pdf_file'] as pdf_file:
+            pdf_stream = pdf_processor.iter_pdf_pages(pdf_file)
+            return {
+                'source_type': 'pdf',
+                'title': pdf_stream['metadata'].get('title') or url_data['filename'],
+                'segments': list(pdf_stream['pages'])
+            }
+
+    return {
+        'source_type': 'url',
+        'title': url_data.get('title', 'Untitled'),
+        'segments': [(None, url_data['content'])]
+    }
+
+
+def _host_semaphore(host):
+    """
+    Semaphore limiting concurrent batch fetches from one host
+    """
+    with _host_semaphores_lock:
+        semaphore = _host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = threading.BoundedSemaphore(get_config().BATCH_PER_HOST_CONCURRENCY)
+            _host_semaphores[host] = semaphore
+        return semaphore
+
+
 @analyze_bp.route('/analyze/status', methods=['GET'])
 def get_analysis_status():
     """
-    Get current analysis status
+    Get analysis status of a document
     """
     try:
-        from app import get_document_store
+        from app import get_document
 
-        doc_store = get_document_store()
+        document_id = request.args.get('document_id', '').strip()
+        entry = get_document(document_id) if document_id else None
 
-        if doc_store['retrieval_chain'] is None:
+        if entry is None:
             return jsonify({
                 'ready': False,
                 'message': 'No document has been analyzed yet'
             })
 
-        metadata = doc_store.get('document_metadata', {})
+        metadata = entry.metadata
 
         return jsonify({
             'ready': True,
+            'document_id': document_id,
             'message': 'Document is ready for questions',
             'metadata': {
                 'source_type': metadata.get('source_type', 'unknown'),
-                'content_length': len(doc_store.get('document_text', '')),
+                'content_length': entry.statistics.get('total_characters', 0),
                 'processed_at': metadata.get('processed_at'),
                 **metadata
             }
@@ -187,23 +580,35 @@ def get_document_summary():
     Get document summary (as markdown, for pointer/bullet formatting)
     """
     try:
-        from app import get_document_store
+        from app import get_document
+
+        document_id = request.args.get('document_id', '').strip()
+        if not document_id:
+            return jsonify({'error': 'document_id is required'}), 400
+
+        entry = get_document(document_id)
 
-        doc_store = get_document_store()
+        if entry is None:
+            return jsonify({'error': 'Document not found. Please analyze it again.'}), 404
 
-        if not doc_store['document_text']:
-            return jsonify({'error': 'No document has been analyzed'}), 404
+        # Serve the cached summary unless ?refresh=1 asks to regenerate it
+        refresh = request.args.get('refresh', '').lower() in ('1', 'true', 'yes')
+        summary_markdown = doc_processor.get_document_summary(
+            entry.retrieval_chain.get_chunks(),
+            document_id=document_id,
+            refresh=refresh
+        )
 
-        # Generate summary with markdown bullets/sections
-        summary_markdown = doc_processor.get_document_summary(doc_store['document_text'])
-        metadata = doc_store.get('document_metadata', {})
+        if not summary_markdown.strip():
+            return jsonify({'error': SUMMARY_FAILED_MESSAGE}), 503
 
         return jsonify({
+            'document_id': document_id,
             'summary_markdown': summary_markdown,
-            'metadata': metadata,
+            'metadata': entry.metadata,
             'statistics': {
-                'total_characters': len(doc_store['document_text']),
-                'total_words': len(doc_store['document_text'].split()),
+                'total_characters': entry.statistics.get('total_characters', 0),
+                'total_words': entry.statistics.get('total_words', 0),
                 'summary_length': len(summary_markdown)
             }
         })
@@ -1,6 +1,8 @@
+import json
 import logging
-from flask import Blueprint, request, jsonify
-from utils.validators import validate_question
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from utils.validators import validate_question, get_string_field, parse_retrieval_options
+from config import get_config
 
 logger = logging.getLogger(__name__)
 
@@ -15,14 +17,20 @@ def ask_question():
     """
     try:
         # Import here to avoid circular imports
-        from app import get_document_store
+        from app import get_document
 
         # Get request data
         if not request.is_json:
             return jsonify({'error': 'Content-Type must be application/json'}), 400
 
         data = request.get_json()
-        question = data.get('question', '').strip()
+        if not isinstance(data, dict):
+            return jsonify({'error': 'Request body must be a JSON object'}), 400
+        try:
+            question = get_string_field(data, 'question')
+            document_id = get_string_field(data, 'document_id')
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
 
         # Validate question
         if not question:
@@ -31,30 +39,41 @@ def ask_question():
         if not validate_question(question):
             return jsonify({'error': 'Invalid question format'}), 400
 
-        # Check if document has been processed
-        doc_store = get_document_store()
+        try:
+            retrieval = parse_retrieval_options(data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
 
-        if doc_store['retrieval_chain'] is None:
+        if not document_id:
             return jsonify({
                 'error': 'No document has been analyzed yet. Please analyze a URL or PDF first.'
             }), 400
 
+        # Check if document has been processed
+        entry = get_document(document_id)
+
+        if entry is None:
+            return jsonify({
+                'error': 'Document not found. Please analyze the URL or PDF again.'
+            }), 404
+
         logger.info(f"Processing question: {question[:100]}...")
 
         try:
-            # Get answer from retrieval chain
-            answer = doc_store['retrieval_chain'].run(question)
-
-            # Get relevant context for transparency
-            context = doc_store['retrieval_chain'].get_relevant_context(question, max_docs=2)
+            # Get answer and the scored context it was based on from one retrieval pass
+            result = entry.retrieval_chain.run_with_context(question, retrieval=retrieval)
+            context = result['contexts']
 
             response_data = {
+                'document_id': document_id,
                 'question': question,
-                'answer': answer,
+                'answer': result['answer'],
                 'context_used': len(context),
-                'source_metadata': doc_store.get('document_metadata', {}),
+                'source_metadata': entry.metadata,
                 'context_preview': context[:1] if context else []  # Show first context for transparency
             }
+            if 'cache' in result:
+                response_data['cache'] = result['cache']
 
             logger.info("Successfully generated answer")
             return jsonify(response_data)
@@ -71,19 +90,183 @@ def ask_question():
         return jsonify({'error': 'Internal server error'}), 500
 
 
+@question_bp.route('/ask/stream', methods=['POST'])
+def ask_question_stream():
+    """
+    Ask a question and stream the answer as server-sent events.
+
+    Events: 'context' (retrieved chunks), 'token' (answer text as it is
+    generated), then 'done' (timings) or 'error'.
+    """
+    try:
+        from app import get_document
+
+        if not request.is_json:
+            return jsonify({'error': 'Content-Type must be application/json'}), 400
+
+        data = request.get_json()
+        if not isinstance(data, dict):
+            return jsonify({'error': 'Request body must be a JSON object'}), 400
+        try:
+            question = get_string_field(data, 'question')
+            document_id = get_string_field(data, 'document_id')
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        if not question:
+            return jsonify({'error': 'Question is required'}), 400
+
+        if not validate_question(question):
+            return jsonify({'error': 'Invalid question format'}), 400
+
+        try:
+            retrieval = parse_retrieval_options(data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        if not document_id:
+            return jsonify({
+                'error': 'No document has been analyzed yet. Please analyze a URL or PDF first.'
+            }), 400
+
+        entry = get_document(document_id)
+
+        if entry is None:
+            return jsonify({
+                'error': 'Document not found. Please analyze the URL or PDF again.'
+            }), 404
+
+        logger.info(f"Streaming answer for question: {question[:100]}...")
+
+        def generate():
+            for event, payload in entry.retrieval_chain.stream_with_context(question, retrieval=retrieval):
+                if event == 'token':
+                    payload = {'text': payload}
+                elif event == 'context':
+                    payload = {
+                        'document_id': document_id,
+                        'context_used': len(payload),
+                        'context_preview': payload[:1],
+                        'source_metadata': entry.metadata
+                    }
+                yield f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+        return Response(
+            stream_with_context(generate()),
+            mimetype='text/event-stream',
+            headers={
+                'Cache-Control': 'no-cache',
+                'X-Accel-Buffering': 'no'  # Disable proxy buffering so tokens arrive immediately
+            }
+        )
+
+    except Exception as e:
+        logger.error(f"Unexpected error in ask stream endpoint: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+
+@question_bp.route('/ask/batch', methods=['POST'])
+def ask_questions_batch():
+    """
+    Ask several questions about a document in one request.
+
+    Questions share one embedding call and one index search, and their
+    answers are generated concurrently. Each result carries its answer,
+    contexts and timings, or an error for that question alone.
+    """
+    try:
+        from app import get_document
+
+        if not request.is_json:
+            return jsonify({'error': 'Content-Type must be application/json'}), 400
+
+        data = request.get_json()
+        if not isinstance(data, dict):
+            return jsonify({'error': 'Request body must be a JSON object'}), 400
+        questions = data.get('questions')
+        try:
+            document_id = get_string_field(data, 'document_id')
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        max_contexts = data.get('max_contexts')
+        max_questions = get_config().ASK_BATCH_MAX_QUESTIONS
+
+        if not isinstance(questions, list) or not questions:
+            return jsonify({'error': 'questions must be a non-empty list'}), 400
+
+        if len(questions) > max_questions:
+            return jsonify({'error': f'Too many questions (max {max_questions})'}), 400
+
+        questions = [question.strip() if isinstance(question, str) else question for question in questions]
+        for position, question in enumerate(questions):
+            if not validate_question(question):
+                return jsonify({'error': f'Invalid question format at position {position}'}), 400
+
+        if max_contexts is not None and (not isinstance(max_contexts, int) or max_contexts < 0):
+            return jsonify({'error': 'max_contexts must be a non-negative integer'}), 400
+
+        try:
+            retrieval = parse_retrieval_options(data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        if not document_id:
+            return jsonify({
+                'error': 'No document has been analyzed yet. Please analyze a URL or PDF first.'
+            }), 400
+
+        entry = get_document(document_id)
+
+        if entry is None:
+            return jsonify({
+                'error': 'Document not found. Please analyze the URL or PDF again.'
+            }), 404
+
+        logger.info(f"Processing batch of {len(questions)} questions")
+
+        try:
+            batch = entry.retrieval_chain.answer_batch(questions, max_context=max_contexts, retrieval=retrieval)
+
+            return jsonify({
+                'document_id': document_id,
+                'results': batch['results'],
+                'answered': sum(1 for result in batch['results'] if 'error' not in result),
+                'failed': sum(1 for result in batch['results'] if 'error' in result),
+                'timings': batch['timings'],
+                'source_metadata': entry.metadata
+            })
+
+        except Exception as e:
+            logger.error(f"Error answering question batch: {str(e)}")
+            return jsonify({
+                'error': 'Failed to answer questions',
+                'details': str(e)
+            }), 500
+
+    except Exception as e:
+        logger.error(f"Unexpected error in ask batch endpoint: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+
 @question_bp.route('/context', methods=['POST'])
 def get_relevant_context():
     """
     Get relevant context for a question without generating an answer
     """
     try:
-        from app import get_document_store
+        from app import get_document
 
         if not request.is_json:
             return jsonify({'error': 'Content-Type must be application/json'}), 400
 
         data = request.get_json()
-        question = data.get('question', '').strip()
+        if not isinstance(data, dict):
+            return jsonify({'error': 'Request body must be a JSON object'}), 400
+        try:
+            question = get_string_field(data, 'question')
+            document_id = get_string_field(data, 'document_id')
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         max_contexts = data.get('max_contexts', 3)
 
         if not question:
@@ -92,19 +275,30 @@ def get_relevant_context():
         if not validate_question(question):
             return jsonify({'error': 'Invalid question format'}), 400
 
-        # Check if document has been processed
-        doc_store = get_document_store()
+        try:
+            retrieval = parse_retrieval_options(data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
 
-        if doc_store['retrieval_chain'] is None:
+        if not document_id:
             return jsonify({
                 'error': 'No document has been analyzed yet'
             }), 400
 
+        # Check if document has been processed
+        entry = get_document(document_id)
+
+        if entry is None:
+            return jsonify({
+                'error': 'Document not found'
+            }), 404
+
         try:
             # Get relevant contexts
-            contexts = doc_store['retrieval_chain'].get_relevant_context(
+            contexts = entry.retrieval_chain.get_relevant_context(
                 question,
-                max_docs=min(max_contexts, 5)  # Limit to max 5 contexts
+                max_docs=min(max_contexts, 5),  # Limit to max 5 contexts
+                retrieval=retrieval
             )
 
             return jsonify({
@@ -128,51 +322,72 @@ def suggest_questions():
     Suggest questions based on the analyzed document
     """
     try:
-        from app import get_document_store
-
-        doc_store = get_document_store()
+        from app import get_document
 
-        if not doc_store['document_text']:
+        document_id = request.args.get('document_id', '').strip()
+        if not document_id:
             return jsonify({'error': 'No document has been analyzed'}), 400
 
-        # Generate basic question suggestions based on document metadata
-        metadata = doc_store.get('document_metadata', {})
-        source_type = metadata.get('source_type', 'document')
+        entry = get_document(document_id)
 
-        suggestions = []
+        if entry is None:
+            return jsonify({'error': 'Document not found'}), 404
 
-        # Generic suggestions
-        suggestions.extend([
-            "What is the main topic of this document?",
-            "Can you summarize the key points?",
-            "What are the most important findings mentioned?"
-        ])
+        metadata = entry.metadata
+        source_type = metadata.get('source_type', 'document')
 
-        # Source-specific suggestions
-        if source_type == 'pdf':
-            suggestions.extend([
-                "What is the purpose of this document?",
-                "Are there any conclusions or recommendations?",
-                "What methodology was used?"
-            ])
-        elif source_type == 'url':
-            if metadata.get('title'):
-                suggestions.append(f"What does this article say about {metadata['title']}?")
-            suggestions.extend([
-                "What is the author's main argument?",
-                "Are there any statistics or data mentioned?",
-                "What examples are provided?"
-            ])
+        # Questions generated from the document at ingestion, with pre-generated answers
+        suggestions = list(entry.retrieval_chain.suggested_questions)
+        generated = bool(suggestions)
+        unanswered = entry.retrieval_chain.unanswered_suggestions()
+
+        if not generated:
+            # Fall back to basic suggestions based on document metadata
+            suggestions = _generic_suggestions(metadata, source_type)
 
         return jsonify({
             'suggestions': suggestions[:6],  # Limit to 6 suggestions
+            'generated': generated,
+            'answered': sum(1 for question in suggestions[:6] if question not in unanswered) if generated else 0,
             'source_type': source_type,
             'document_info': {
-                'word_count': len(doc_store['document_text'].split()),
-                'char_count': len(doc_store['document_text'])
+                'word_count': entry.statistics.get('total_words', 0),
+                'char_count': entry.statistics.get('total_characters', 0)
             }
         })
 
     except Exception as e:
         logger.error(f"Error generating suggestions: {str(e)}")
-        return jsonify({'error': 'Failed to generate suggestions'}), 500
\ No newline at end of file
+        return jsonify({'error': 'Failed to generate suggestions'}), 500
+
+
+def _generic_suggestions(metadata, source_type):
+    """
+    Basic question suggestions based on document metadata
+    """
+    suggestions = []
+
+    # Generic suggestions
+    suggestions.extend([
+        "What is the main topic of this document?",
+        "Can you summarize the key points?",
+        "What are the most important findings mentioned?"
+    ])
+
+    # Source-specific suggestions
+    if source_type == 'pdf':
+        suggestions.extend([
+            "What is the purpose of this document?",
+            "Are there any conclusions or recommendations?",
+            "What methodology was used?"
+        ])
+    elif source_type == 'url':
+        if metadata.get('title'):
+            suggestions.append(f"What does this article say about {metadata['title']}?")
+        suggestions.extend([
+            "What is the author's main argument?",
+            "Are there any statistics or data mentioned?",
+            "What examples are provided?"
+        ])
+
+    return suggestions
@@ -2,6 +2,17 @@ document.addEventListener("DOMContentLoaded", () => {
     // Configuration
     const API_BASE_URL = window.location.origin;
 
+    // Current document (returned by /api/analyze, kept across reloads)
+    let currentDocumentId = localStorage.getItem("askdocDocumentId");
+    function setCurrentDocument(documentId) {
+        currentDocumentId = documentId || null;
+        if (currentDocumentId) localStorage.setItem("askdocDocumentId", currentDocumentId);
+        else localStorage.removeItem("askdocDocumentId");
+    }
+    function documentQuery() {
+        return `document_id=${encodeURIComponent(currentDocumentId || "")}`;
+    }
+
     // Tab switching logic
     const tabButtons = document.querySelectorAll(".tab-btn");
     const tabPanels = document.querySelectorAll(".tab-panel");
@@ -45,6 +56,7 @@ document.addEventListener("DOMContentLoaded", () => {
         clearSummary();
         clearChat();
         clearSuggestions();
+        setCurrentDocument(null);
     });
 
     function clearSummary() {
@@ -70,21 +82,30 @@ document.addEventListener("DOMContentLoaded", () => {
     }
 
     // Status handling
+    let statusInterval = null;
     function showStatus(message) {
         document.getElementById("status-text").textContent = message;
         document.getElementById("status-section").classList.remove("hidden");
         document.getElementById("progress-fill").style.width = "0%";
         let width = 0;
-        const interval = setInterval(() => {
+        clearInterval(statusInterval);
+        statusInterval = setInterval(() => {
             if (width >= 90) {
-                clearInterval(interval);
+                clearInterval(statusInterval);
                 return;
             }
             width += Math.random() * 10;
             document.getElementById("progress-fill").style.width = Math.min(width, 90) + "%";
         }, 200);
     }
+    // Show real progress reported by the server instead of the simulated bar
+    function updateStatus(message, percent) {
+        clearInterval(statusInterval);
+        document.getElementById("status-text").textContent = message;
+        document.getElementById("progress-fill").style.width = `${percent}%`;
+    }
     function hideStatus() {
+        clearInterval(statusInterval);
         document.getElementById("progress-fill").style.width = "100%";
         setTimeout(() => {
             document.getElementById("status-section").classList.add("hidden");
@@ -127,18 +148,46 @@ document.addEventListener("DOMContentLoaded", () => {
             const formData = new FormData();
             formData.append('pdf', file);
             const response = await fetch(`${API_BASE_URL}/api/analyze`, { method: 'POST', body: formData });
-            const result = await response.json();
-            if (!response.ok) throw new Error(result.error || 'Failed to process PDF');
-            hideStatus();
-            showSummary(result.summary_markdown, result.metadata);
-            showQASection();
-            await loadSuggestedQuestions();
+            await runAnalysisJob(response, 'Failed to process PDF');
         } catch (error) {
             hideStatus();
             showError(`Failed to process PDF: ${error.message}`);
         }
     }
 
+    // Follow a queued analysis job until it finishes. Questions are enabled
+    // as soon as the index is ready, before the summary is done.
+    async function runAnalysisJob(response, failureMessage) {
+        const queued = await response.json();
+        if (!response.ok) throw new Error(queued.error || failureMessage);
+
+        let questionsEnabled = false;
+        while (true) {
+            await new Promise(resolve => setTimeout(resolve, 1000));
+            const jobResponse = await fetch(`${API_BASE_URL}${queued.status_url}`);
+            const job = await jobResponse.json();
+            if (!jobResponse.ok) throw new Error(job.error || failureMessage);
+
+            updateStatus(job.message || 'Processing document...', job.percent || 0);
+
+            if (job.ready_for_questions && !questionsEnabled) {
+                questionsEnabled = true;
+                setCurrentDocument(job.document_id);
+                showQASection();
+            }
+            if (job.status === 'failed') throw new Error(job.error || failureMessage);
+            if (job.status === 'completed') {
+                const result = job.result;
+                setCurrentDocument(result.document_id);
+                hideStatus();
+                showSummary(result.summary_markdown || result.summary_error, result.metadata);
+                showQASection();
+                await loadSuggestedQuestions();
+                return result;
+            }
+        }
+    }
+
     // URL Submit logic
     const urlForm = document.getElementById("url-form");
     const urlInput = document.getElementById("url-input");
@@ -153,12 +202,7 @@ document.addEventListener("DOMContentLoaded", () => {
                 headers: { 'Content-Type': 'application/json' },
                 body: JSON.stringify({ url: url })
             });
-            const result = await response.json();
-            if (!response.ok) throw new Error(result.error || 'Failed to analyze URL');
-            hideStatus();
-            showSummary(result.summary_markdown, result.metadata);
-            showQASection();
-            await loadSuggestedQuestions();
+            await runAnalysisJob(response, 'Failed to analyze URL');
         } catch (error) {
             hideStatus();
             showError(`Failed to analyze URL: ${error.message}`);
@@ -181,22 +225,81 @@ document.addEventListener("DOMContentLoaded", () => {
         // Show typing indicator
         const typingId = showTypingIndicator();
         try {
-            const response = await fetch(`${API_BASE_URL}/api/ask`, {
+            const response = await fetch(`${API_BASE_URL}/api/ask/stream`, {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ question: question })
+                body: JSON.stringify({ question: question, document_id: currentDocumentId })
             });
-            const result = await response.json();
-            removeTypingIndicator(typingId);
-            if (!response.ok) throw new Error(result.error || 'Failed to get answer');
-            appendMessage("ai", result.answer);
-            if (result.context_used > 0) appendContextInfo(result.context_used);
+            if (!response.ok) {
+                const result = await response.json();
+                throw new Error(result.error || 'Failed to get answer');
+            }
+            await renderStreamedAnswer(response, typingId);
         } catch (error) {
             removeTypingIndicator(typingId);
             appendMessage("ai", `Sorry, I encountered an error: ${error.message}`);
         }
     });
 
+    // Read server-sent events from /api/ask/stream and render the answer as it arrives
+    async function renderStreamedAnswer(response, typingId) {
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = "";
+        let answer = "";
+        let contextUsed = 0;
+        let msg = null;
+        let renderPending = false;
+
+        const render = () => {
+            renderPending = false;
+            msg.innerHTML = marked.parse(answer);
+            chatMessages.scrollTop = chatMessages.scrollHeight;
+        };
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+
+            let boundary;
+            while ((boundary = buffer.indexOf("\n\n")) !== -1) {
+                const rawEvent = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+
+                let event = "message";
+                let data = "";
+                rawEvent.split("\n").forEach(line => {
+                    if (line.startsWith("event:")) event = line.slice(6).trim();
+                    else if (line.startsWith("data:")) data += line.slice(5).trim();
+                });
+                const payload = data ? JSON.parse(data) : {};
+
+                if (event === "context") {
+                    contextUsed = payload.context_used || 0;
+                } else if (event === "token") {
+                    if (!msg) {
+                        removeTypingIndicator(typingId);
+                        msg = appendMessage("ai", "");
+                    }
+                    answer += payload.text;
+                    // Re-render at most once per frame
+                    if (!renderPending) {
+                        renderPending = true;
+                        requestAnimationFrame(render);
+                    }
+                } else if (event === "error") {
+                    throw new Error(payload.error || 'Failed to get answer');
+                }
+            }
+        }
+
+        removeTypingIndicator(typingId);
+        if (!msg) msg = appendMessage("ai", answer);
+        render();
+        if (contextUsed > 0) appendContextInfo(contextUsed);
+    }
+
     // Suggested Questions logic
     const suggestBtn = document.getElementById("suggest-questions");
     const suggestionsBox = document.getElementById("suggestions");
@@ -225,7 +328,7 @@ document.addEventListener("DOMContentLoaded", () => {
 
     async function loadSuggestedQuestions() {
         try {
-            const response = await fetch(`${API_BASE_URL}/api/suggest`);
+            const response = await fetch(`${API_BASE_URL}/api/suggest?${documentQuery()}`);
             const result = await response.json();
             if (response.ok && result.suggestions) {
                 suggestionsBox.innerHTML = result.suggestions.map(q =>
@@ -252,6 +355,7 @@ document.addEventListener("DOMContentLoaded", () => {
         msg.innerHTML = sender === "ai" ? marked.parse(text) : `<p>${text}</p>`;
         chatMessages.appendChild(msg);
         chatMessages.scrollTop = chatMessages.scrollHeight;
+        return msg;
     }
     function showTypingIndicator() {
         const typingId = 'typing-' + Date.now();
@@ -279,7 +383,7 @@ document.addEventListener("DOMContentLoaded", () => {
     document.getElementById("refresh-summary").addEventListener("click", async () => {
         showStatus("Refreshing summary...");
         try {
-            const response = await fetch(`${API_BASE_URL}/api/analyze/summary`);
+            const response = await fetch(`${API_BASE_URL}/api/analyze/summary?${documentQuery()}&refresh=1`);
             const result = await response.json();
             if (!response.ok) throw new Error(result.error || 'Failed to refresh summary');
             hideStatus();
@@ -308,11 +412,12 @@ document.addEventListener("DOMContentLoaded", () => {
     // Check if document is already loaded on page load
     checkDocumentStatus();
     async function checkDocumentStatus() {
+        if (!currentDocumentId) return;
         try {
-            const response = await fetch(`${API_BASE_URL}/api/analyze/status`);
+            const response = await fetch(`${API_BASE_URL}/api/analyze/status?${documentQuery()}`);
             const result = await response.json();
             if (response.ok && result.ready) {
-                const summaryResponse = await fetch(`${API_BASE_URL}/api/analyze/summary`);
+                const summaryResponse = await fetch(`${API_BASE_URL}/api/analyze/summary?${documentQuery()}`);
                 const summaryResult = await summaryResponse.json();
                 if (summaryResponse.ok) {
                     showSummary(summaryResult.summary_markdown, summaryResult.metadata);
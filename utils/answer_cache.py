@@ -0,0 +1,180 @@
+import re
+import json
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+import numpy as np
+from config import get_config
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_question(question: str) -> str:
+    """
+    Lowercase, collapse whitespace and drop trailing punctuation, so trivially
+    different spellings of a question share an exact cache entry
+    """
+    question = re.sub(r'\s+', ' ', question.strip().lower())
+    return question.rstrip(' ?!.')
+
+
+class _Namespace:
+    """
+    Cached answers of one document under one set of retrieval options, in LRU order
+    """
+
+    def __init__(self):
+        self.entries: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        # Stacked question embeddings of the entries, rebuilt after changes
+        self._matrix = None
+        self._matrix_keys = None
+
+    def matrix(self):
+        if self._matrix is None:
+            keys = [key for key, entry in self.entries.items() if entry['vector'] is not None]
+            self._matrix_keys = keys
+            self._matrix = np.vstack([self.entries[key]['vector'] for key in keys]) if keys else None
+        return self._matrix, self._matrix_keys
+
+    def changed(self):
+        self._matrix = None
+        self._matrix_keys = None
+
+
+class AnswerCache:
+    """
+    Per-document cache of generated answers.
+
+    A question is looked up by its normalized text first and then, given its
+    embedding, by the nearest cached question with cosine similarity of at
+    least ANSWER_CACHE_SIMILARITY. Answers expire after ANSWER_CACHE_TTL
+    seconds; each document keeps its ANSWER_CACHE_MAX_ENTRIES most recently
+    used answers and the least recently used documents are dropped beyond
+    ANSWER_CACHE_MAX_DOCUMENTS.
+
+    Namespaces are index keys (plus any non-default retrieval options), so a
+    changed document never serves answers about its previous content.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, max_documents: Optional[int] = None,
+                 ttl: Optional[float] = None, similarity: Optional[float] = None):
+        config = get_config()
+        self.max_entries = max_entries or config.ANSWER_CACHE_MAX_ENTRIES
+        self.max_documents = max_documents or config.ANSWER_CACHE_MAX_DOCUMENTS
+        self.ttl = config.ANSWER_CACHE_TTL if ttl is None else ttl
+        self.similarity = config.ANSWER_CACHE_SIMILARITY if similarity is None else similarity
+
+        self._namespaces: 'OrderedDict[str, _Namespace]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {'exact_hits': 0, 'semantic_hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0}
+
+    @staticmethod
+    def make_namespace(index_key: str, options: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Namespace for a document's answers under the given retrieval options
+        """
+        if not options:
+            return index_key
+        return f"{index_key}:{json.dumps(options, sort_keys=True)}"
+
+    def get(self, namespace: str, question: str, vector: Optional[np.ndarray] = None) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached answer by exact normalized question and, when the
+        question's embedding is given, by the most similar cached question.
+        Without a vector an exact miss is not counted, so the caller can embed
+        the question and ask again.
+        """
+        key = normalize_question(question)
+        with self._lock:
+            bucket = self._namespaces.get(namespace)
+            if bucket is not None:
+                self._namespaces.move_to_end(namespace)
+                self._expire(bucket)
+
+                entry = bucket.entries.get(key)
+                if entry is not None:
+                    bucket.entries.move_to_end(key)
+                    self._counters['exact_hits'] += 1
+                    return self._hit(entry, 'exact', 1.0)
+
+                if vector is not None:
+                    matrix, keys = bucket.matrix()
+                    if matrix is not None:
+                        similarities = matrix @ np.asarray(vector, dtype=np.float32)
+                        best = int(np.argmax(similarities))
+                        if similarities[best] >= self.similarity:
+                            bucket.entries.move_to_end(keys[best])
+                            self._counters['semantic_hits'] += 1
+                            return self._hit(bucket.entries[keys[best]], 'semantic', float(similarities[best]))
+
+            if vector is not None:
+                self._counters['misses'] += 1
+        return None
+
+    def put(self, namespace: str, question: str, result: Dict[str, Any], vector: Optional[np.ndarray] = None):
+        """
+        Cache an answer result (answer and contexts) for a question
+        """
+        key = normalize_question(question)
+        entry = {
+            'question': question,
+            'result': result,
+            'vector': None if vector is None else np.asarray(vector, dtype=np.float32),
+            'created_at': time.time()
+        }
+        with self._lock:
+            bucket = self._namespaces.get(namespace)
+            if bucket is None:
+                bucket = self._namespaces[namespace] = _Namespace()
+            self._namespaces.move_to_end(namespace)
+
+            bucket.entries[key] = entry
+            bucket.entries.move_to_end(key)
+            while len(bucket.entries) > self.max_entries:
+                bucket.entries.popitem(last=False)
+                self._counters['evictions'] += 1
+            bucket.changed()
+
+            while len(self._namespaces) > self.max_documents:
+                _, evicted = self._namespaces.popitem(last=False)
+                self._counters['evictions'] += len(evicted.entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Hit/miss counters and current size
+        """
+        with self._lock:
+            lookups = self._counters['exact_hits'] + self._counters['semantic_hits'] + self._counters['misses']
+            hits = lookups - self._counters['misses']
+            return {
+                **self._counters,
+                'hit_rate': round(hits / lookups, 4) if lookups else 0.0,
+                'documents': len(self._namespaces),
+                'entries': sum(len(bucket.entries) for bucket in self._namespaces.values())
+            }
+
+    def _expire(self, bucket: _Namespace):
+        if not self.ttl:
+            return
+        cutoff = time.time() - self.ttl
+        expired = [key for key, entry in bucket.entries.items() if entry['created_at'] < cutoff]
+        for key in expired:
+            del bucket.entries[key]
+        if expired:
+            self._counters['expirations'] += len(expired)
+            bucket.changed()
+
+    @staticmethod
+    def _hit(entry: Dict[str, Any], match: str, similarity: float) -> Dict[str, Any]:
+        return {
+            **entry['result'],
+            'cache': {
+                'match': match,
+                'similarity': round(similarity, 4),
+                'question': entry['question'],
+                'age_seconds': round(time.time() - entry['created_at'], 1)
+            }
+        }
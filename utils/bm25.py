@@ -0,0 +1,226 @@
+import os
+import re
+import bisect
+import logging
+from collections import Counter
+from typing import List, Tuple, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BM25_FILE_NAME = 'bm25.npz'
+
+# Words plus compound tokens such as part numbers (AB-1234), dotted names
+# (os.path.join), codes (0x80070005) and snake_case identifiers
+TOKEN_RE = re.compile(r'\w+(?:[.\-:/]\w+)*')
+PART_RE = re.compile(r'[^\W_]+')
+MAX_TOKEN_LENGTH = 64
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercase tokens; compound tokens are kept whole and also split into their parts
+    """
+    tokens = []
+    for token in TOKEN_RE.findall((text or '').lower()):
+        if len(token) > MAX_TOKEN_LENGTH:
+            continue
+        tokens.append(token)
+        parts = PART_RE.findall(token)
+        if len(parts) > 1:
+            tokens.extend(parts)
+    return tokens
+
+
+class _TermTable(Sequence):
+    """
+    Sorted vocabulary stored as one UTF-8 blob plus offsets, searchable with bisect
+    """
+
+    def __init__(self, blob: bytes, offsets: np.ndarray):
+        self.blob = blob
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return self.blob[self.offsets[i]:self.offsets[i + 1]]
+
+    def find(self, term: str) -> Optional[int]:
+        key = term.encode('utf-8')
+        i = bisect.bisect_left(self, key)
+        if i < len(self) and self[i] == key:
+            return i
+        return None
+
+
+class BM25Index:
+    """
+    Okapi BM25 keyword index over the chunks of one document.
+
+    Postings are stored in compressed-sparse-row form: for term t,
+    postings[offsets[t]:offsets[t + 1]] are the chunk positions containing it
+    and frequencies[...] the matching term counts. The vocabulary is a single
+    sorted byte blob, so the whole index is a handful of numpy arrays that
+    are saved next to the FAISS index.
+    """
+
+    def __init__(self, term_blob: bytes, term_offsets: np.ndarray, offsets: np.ndarray,
+                 postings: np.ndarray, frequencies: np.ndarray, doc_lengths: np.ndarray,
+                 doc_ids: List[str], k1: float = 1.5, b: float = 0.75):
+        self.terms = _TermTable(term_blob, term_offsets)
+        self.offsets = offsets
+        self.postings = postings
+        self.frequencies = frequencies
+        self.doc_lengths = doc_lengths
+        self.doc_ids = doc_ids
+        self.k1 = k1
+        self.b = b
+
+        doc_count = len(doc_lengths)
+        self.avg_doc_length = float(doc_lengths.mean()) if doc_count else 0.0
+        document_frequency = np.diff(offsets).astype(np.float32)
+        self.idf = np.log1p((doc_count - document_frequency + 0.5) / (document_frequency + 0.5)).astype(np.float32)
+
+    @classmethod
+    def build(cls, doc_ids: List[str], texts: List[str], k1: float = 1.5, b: float = 0.75) -> 'BM25Index':
+        """
+        Build the index for chunks given by docstore ID and text
+        """
+        vocabulary = {}
+        term_column, doc_column, frequency_column = [], [], []
+        doc_lengths = np.zeros(len(texts), dtype=np.int32)
+
+        for position, text in enumerate(texts):
+            tokens = tokenize(text)
+            doc_lengths[position] = len(tokens)
+            for term, count in Counter(tokens).items():
+                term_column.append(vocabulary.setdefault(term, len(vocabulary)))
+                doc_column.append(position)
+                frequency_column.append(count)
+
+        # Renumber terms in sorted (byte) order so lookups can bisect
+        encoded = sorted((term.encode('utf-8'), term_id) for term, term_id in vocabulary.items())
+        remap = np.zeros(len(vocabulary), dtype=np.int32)
+        for new_id, (_, old_id) in enumerate(encoded):
+            remap[old_id] = new_id
+        term_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        term_offsets[1:] = np.cumsum([len(term) for term, _ in encoded])
+        term_blob = b''.join(term for term, _ in encoded)
+
+        terms = remap[np.asarray(term_column, dtype=np.int32)] if term_column else np.zeros(0, dtype=np.int32)
+        order = np.argsort(terms, kind='stable')
+        postings = np.asarray(doc_column, dtype=np.int32)[order]
+        frequencies = np.minimum(np.asarray(frequency_column, dtype=np.int64), 65535).astype(np.uint16)[order]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(np.bincount(terms, minlength=len(encoded)))
+
+        return cls(term_blob, term_offsets, offsets, postings, frequencies, doc_lengths, list(doc_ids), k1, b)
+
+    @classmethod
+    def from_vectorstore(cls, vectorstore) -> 'BM25Index':
+        """
+        Build the index for every chunk of a FAISS vector store
+        """
+        doc_ids = [vectorstore.index_to_docstore_id[i] for i in range(len(vectorstore.index_to_docstore_id))]
+        texts = [vectorstore.docstore.search(doc_id).page_content for doc_id in doc_ids]
+        return cls.build(doc_ids, texts)
+
+    def search(self, query: str, k: int) -> List[Tuple[str, float]]:
+        """
+        Top-k chunks for a query as (docstore_id, bm25_score), best first
+        """
+        doc_count = len(self.doc_lengths)
+        if not doc_count or k <= 0:
+            return []
+
+        term_ids = {self.terms.find(token) for token in tokenize(query)}
+        term_ids.discard(None)
+        if not term_ids:
+            return []
+
+        scores = np.zeros(doc_count, dtype=np.float32)
+        length_norm = self.k1 * (1 - self.b + self.b * self.doc_lengths / max(self.avg_doc_length, 1e-9))
+        for term_id in term_ids:
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            docs = self.postings[start:end]
+            tf = self.frequencies[start:end].astype(np.float32)
+            scores[docs] += self.idf[term_id] * tf * (self.k1 + 1) / (tf + length_norm[docs])
+
+        k = min(k, doc_count)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.doc_ids[i], float(scores[i])) for i in top if scores[i] > 0]
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Approximate memory held by the index
+        """
+        return (
+            len(self.terms.blob) + self.terms.offsets.nbytes + self.offsets.nbytes + self.postings.nbytes +
+            self.frequencies.nbytes + self.doc_lengths.nbytes + self.idf.nbytes +
+            sum(len(doc_id) for doc_id in self.doc_ids)
+        )
+
+    def save(self, directory: str):
+        """
+        Save the index arrays into an index directory
+        """
+        np.savez(
+            os.path.join(directory, BM25_FILE_NAME),
+            term_blob=np.frombuffer(self.terms.blob, dtype=np.uint8),
+            term_offsets=self.terms.offsets,
+            offsets=self.offsets,
+            postings=self.postings,
+            frequencies=self.frequencies,
+            doc_lengths=self.doc_lengths,
+            doc_ids=np.asarray(self.doc_ids, dtype=str),
+            params=np.asarray([self.k1, self.b], dtype=np.float64)
+        )
+
+    @classmethod
+    def load(cls, directory: str) -> Optional['BM25Index']:
+        """
+        Load the index saved in an index directory, or None when there is none
+        """
+        path = os.path.join(directory, BM25_FILE_NAME)
+        if not os.path.isfile(path):
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                k1, b = data['params']
+                return cls(
+                    data['term_blob'].tobytes(),
+                    data['term_offsets'],
+                    data['offsets'],
+                    data['postings'],
+                    data['frequencies'],
+                    data['doc_lengths'],
+                    data['doc_ids'].tolist(),
+                    float(k1),
+                    float(b)
+                )
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Ignoring unreadable BM25 index {path}: {str(e)}")
+            return None
+
+
+def reciprocal_rank_fusion(rankings: List[Tuple[List[str], float]], rrf_k: int = 60) -> List[Tuple[str, float]]:
+    """
+    Merge ranked ID lists given as (ids, weight) pairs with weighted
+    reciprocal-rank fusion. Scores are normalized so an ID ranked first by
+    every list scores 1.0.
+    """
+    scores = {}
+    for ids, weight in rankings:
+        for rank, doc_id in enumerate(ids, 1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + weight / (rrf_k + rank)
+
+    best_possible = sum(weight for _, weight in rankings) / (rrf_k + 1)
+    if best_possible <= 0:
+        return []
+    fused = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+    return [(doc_id, score / best_possible) for doc_id, score in fused if score > 0]
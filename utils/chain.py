@@ -1,19 +1,56 @@
-import os
+import re
+import json
 import time
+import hashlib
 import logging
-from typing import Dict, Any, List, Optional
-# from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_huggingface import HuggingFaceEmbeddings
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple, Iterator, Iterable, Callable
 
+import numpy as np
 from langchain_community.vectorstores import FAISS
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.chains import RetrievalQA
 from langchain.schema import Document
 from utils.groq_llm import GroqLLM
+from utils.embeddings import get_embeddings, embed_texts
+from utils.llm_client import get_llm_client, get_llm_limiter
+from utils.index_store import IndexStore
+from utils.bm25 import BM25Index, reciprocal_rank_fusion
+from utils import reranker
+from utils.context_packer import pack_context, prompt_budget, split_by_budget, count_tokens
+from utils.vector_index import build_search_index, index_type_of, to_flat
+from utils.embedding_cache import EmbeddingCache
+from utils.summary_cache import SummaryCache, DegradedSummaryError
+from utils.answer_cache import AnswerCache, normalize_question
+from utils.validators import validate_question
 from config import get_config
 
 logger = logging.getLogger(__name__)
 
+# Bump whenever the summarization prompts change so cached summaries are regenerated
+SUMMARY_PROMPT_VERSION = 1
+
+# Completion tokens for each map-phase section summary
+SECTION_SUMMARY_MAX_TOKENS = 350
+
+# Completion tokens for the suggested questions
+SUGGESTION_MAX_TOKENS = 300
+
+# Bullets or numbering in front of a generated question
+QUESTION_PREFIX_RE = re.compile(r'^\s*(?:[-*\u2022]|\d+[.)])?\s*')
+
+
+def _no_progress(stage: str, fraction: float):
+    pass
+
+
+def chunk_hash(text: str) -> str:
+    """
+    Content hash of a chunk, used to match chunks across document versions
+    """
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
 
 class DocumentProcessor:
     """
@@ -25,13 +62,27 @@ class DocumentProcessor:
         self.chunk_size = config.CHUNK_SIZE
         self.chunk_overlap = config.CHUNK_OVERLAP
         self.embedding_model_name = config.EMBEDDING_MODEL
+        self.embedding_backend = config.EMBEDDING_BACKEND
         self.vector_store_path = config.VECTOR_STORE_PATH
         self.groq_api_key = config.GROQ_API_KEY
+        self.summary_max_concurrency = config.SUMMARY_MAX_CONCURRENCY
+        self.summary_section_tokens = config.SUMMARY_SECTION_TOKENS
+        self.summary_reduce_fanout = config.SUMMARY_REDUCE_FANOUT
+        self.ingest_batch_chunks = config.INGEST_BATCH_CHUNKS
+        self.retrieval_k = config.RETRIEVAL_K
+        self.hybrid_search = config.HYBRID_SEARCH_ENABLED
+        self.suggested_questions_count = config.SUGGESTED_QUESTIONS_COUNT
+        self.suggestion_preanswer = config.SUGGESTION_PREANSWER
 
         # Initialize components
-        self.embeddings = None
         self.text_splitter = None
         self.groq_llm = None
+        self.index_store = None
+        self.summary_cache = None
+        self.embedding_cache = None
+        self.answer_cache = None
+        # Pre-answers suggested questions in the background, one document at a time
+        self._suggestion_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='suggest')
 
         self._initialize_components()
 
@@ -40,13 +91,7 @@ class DocumentProcessor:
         Initialize the processing components
         """
         try:
-            # Initialize embeddings
-            logger.info(f"Loading embedding model: {self.embedding_model_name}")
-            self.embeddings = HuggingFaceEmbeddings(
-                model_name=self.embedding_model_name,
-                model_kwargs={'device': 'cpu'},
-                encode_kwargs={'normalize_embeddings': True}
-            )
+            # The embedding model is shared and loaded lazily (see utils.embeddings)
 
             # Initialize text splitter
             self.text_splitter = RecursiveCharacterTextSplitter(
@@ -59,41 +104,161 @@ class DocumentProcessor:
             # Initialize Groq LLM
             self.groq_llm = GroqLLM(api_key=self.groq_api_key)
 
+            # Initialize persistent index store
+            self.index_store = IndexStore(self.vector_store_path)
+
+            # Initialize summary cache
+            self.summary_cache = SummaryCache()
+
+            # Initialize chunk embedding cache
+            if get_config().EMBEDDING_CACHE_ENABLED:
+                self.embedding_cache = EmbeddingCache(self.embedding_model_name)
+
+            # Initialize answer cache, shared by every document's chain
+            if get_config().ANSWER_CACHE_ENABLED:
+                self.answer_cache = AnswerCache()
+
             logger.info("Successfully initialized all components")
 
         except Exception as e:
             logger.error(f"Error initializing components: {str(e)}")
             raise
 
-    def process_document(self, document_text: str, metadata: Dict[str, Any] = None) -> 'EnhancedRetrievalQA':
+    @property
+    def embeddings(self):
+        """
+        Shared embedding model, loaded on first use
+        """
+        return get_embeddings()
+
+    def get_index_settings(self) -> Dict[str, Any]:
+        """
+        Settings that affect the produced index, hashed into the index key
+        """
+        settings = {
+            'chunk_size': self.chunk_size,
+            'chunk_overlap': self.chunk_overlap,
+            'embedding_model': self.embedding_model_name
+        }
+        if self.embedding_backend != 'torch':
+            # Quantized/ONNX vectors differ slightly, so keep their indexes apart
+            settings['embedding_backend'] = self.embedding_backend
+        return settings
+
+    def process_document(self, document_text: str, metadata: Dict[str, Any] = None,
+                         progress: Optional[Callable[[str, float], None]] = None) -> 'EnhancedRetrievalQA':
         """
-        Process document and create retrieval chain
+        Process document and create retrieval chain, reusing a stored index when
+        the same content was processed before.
+        progress(stage, fraction) is called as the chunk/embed/index stages advance.
         """
         try:
             logger.info(f"Processing document with {len(document_text)} characters")
 
-            # Create document object
-            doc = Document(
-                page_content=document_text,
-                metadata=metadata or {}
-            )
+            index_key = self.index_store.compute_key(document_text, self.get_index_settings())
+            vectorstore = self.index_store.load(index_key, self.embeddings)
 
-            # Split document into chunks
-            chunks = self.text_splitter.split_documents([doc])
-            logger.info(f"Split document into {len(chunks)} chunks")
-
-            # Create vector store
-            vectorstore = FAISS.from_documents(chunks, self.embeddings)
-
-            # Create enhanced retrieval chain
-            qa_chain = EnhancedRetrievalQA(
-                llm=self.groq_llm,
-                retriever=vectorstore.as_retriever(
-                    search_type="similarity",
-                    search_kwargs={"k": 4}
-                ),
-                document_metadata=metadata or {}
-            )
+            if vectorstore is not None:
+                logger.info(f"Reusing stored index {index_key}")
+                meta = self.index_store.load_meta(index_key)
+                qa_chain = self._create_chain(vectorstore, metadata, index_key, meta.get('statistics'))
+                (progress or _no_progress)('index', 1.0)
+                return qa_chain
+
+            return self.process_segments([(None, document_text)], metadata, progress, total_segments=1)
+
+        except Exception as e:
+            logger.error(f"Error processing document: {str(e)}")
+            raise
+
+    def process_segments(self, segments: Iterable[Tuple], metadata: Dict[str, Any] = None,
+                         progress: Optional[Callable[[str, float], None]] = None,
+                         total_segments: Optional[int] = None,
+                         source_key: Optional[str] = None) -> 'EnhancedRetrievalQA':
+        """
+        Streaming ingestion: segments (page_number or None, text), e.g. PDF pages
+        from a generator, are split and embedded in INGEST_BATCH_CHUNKS batches as
+        they arrive, so the full document text is never held in memory at once.
+        Statistics and the content key are computed incrementally.
+
+        A segment may carry a third element, a metadata dict merged into its
+        chunks' metadata (e.g. the source of each document in a collection);
+        it is part of the content key.
+
+        The content key is only known once every segment has been read, so an
+        identical stored index is picked up at the end (the embedding cache
+        keeps the repeated work cheap). When source_key is given it is recorded
+        so the same raw source can skip extraction next time.
+        """
+        progress = progress or _no_progress
+        try:
+            hasher = self.index_store.key_hasher(self.get_index_settings())
+            statistics = {'total_characters': 0, 'total_words': 0, 'segments': 0}
+            vectorstore = None
+            pending: List[Document] = []
+            chunk_count = 0
+
+            progress('chunk', 0.0)
+            for position, (page_num, text, *extra) in enumerate(segments):
+                if statistics['segments']:
+                    statistics['total_characters'] += 2  # Segments are separated by a blank line
+                statistics['segments'] += 1
+                statistics['total_characters'] += len(text)
+                statistics['total_words'] += len(text.split())
+                hasher.update(text)
+
+                segment_metadata = dict(metadata or {})
+                if extra and extra[0]:
+                    hasher.update(json.dumps(extra[0], sort_keys=True, default=str))
+                    segment_metadata.update(extra[0])
+                if page_num is not None:
+                    segment_metadata['page'] = page_num
+                segment_chunks = self.text_splitter.split_documents([
+                    Document(page_content=text, metadata=segment_metadata)
+                ])
+
+                for done, chunk in enumerate(segment_chunks, 1):
+                    chunk.metadata['chunk_index'] = chunk_count
+                    chunk.metadata['content_hash'] = chunk_hash(chunk.page_content)
+                    chunk_count += 1
+                    pending.append(chunk)
+
+                    if len(pending) >= self.ingest_batch_chunks:
+                        vectorstore = self._add_to_vectorstore(vectorstore, pending)
+                        pending = []
+                        if total_segments:
+                            progress('embed', (position + done / len(segment_chunks)) / total_segments)
+
+                if total_segments:
+                    progress('embed', (position + 1) / total_segments)
+
+            if pending:
+                vectorstore = self._add_to_vectorstore(vectorstore, pending)
+                pending = []
+
+            if vectorstore is None:
+                raise ValueError("No readable content found in the document")
+
+            logger.info(f"Split document into {chunk_count} chunks from {statistics['segments']} segments")
+
+            progress('index', 0.0)
+            index_key = hasher.hexdigest()
+            stored = self.index_store.load(index_key, self.embeddings)
+            bm25 = None
+            if stored is not None:
+                logger.info(f"Reusing stored index {index_key}")
+                vectorstore = stored
+            else:
+                bm25 = self._save_index(index_key, vectorstore, metadata, statistics)
+
+            if source_key:
+                try:
+                    self.index_store.save_alias(source_key, index_key)
+                except OSError as e:
+                    logger.warning(f"Failed to record source alias {source_key}: {str(e)}")
+
+            qa_chain = self._create_chain(vectorstore, metadata, index_key, statistics, bm25)
+            progress('index', 1.0)
 
             logger.info("Successfully created retrieval chain")
             return qa_chain
@@ -102,33 +267,321 @@ class DocumentProcessor:
             logger.error(f"Error processing document: {str(e)}")
             raise
 
-    def get_document_summary(self, document_text):
+    def update_document(self, previous_key: str, document_text: str, metadata: Dict[str, Any] = None,
+                        progress: Optional[Callable[[str, float], None]] = None) -> 'EnhancedRetrievalQA':
         """
-        Generate a detailed, structured summary for the document using chunked summarization to avoid token limit errors.
+        Re-index a changed version of a stored document incrementally.
+
+        Chunks are matched to the previous index by content hash: unchanged
+        chunks keep their vectors, only added or changed chunks are embedded,
+        and vectors of chunks that no longer exist are removed. The result is
+        stored under the new content key. Falls back to a full build when the
+        previous index is not available.
         """
-        # Split the document into manageable chunks for summarization (e.g., 2000-3000 characters or less)
-        doc = Document(page_content=document_text)
-        chunks = self.text_splitter.split_documents([doc])
+        progress = progress or _no_progress
+        index_key = self.index_store.compute_key(document_text, self.get_index_settings())
+        if index_key == previous_key or self.index_store.exists(index_key):
+            return self.process_document(document_text, metadata, progress)
+
+        # Read into memory: a memory-mapped index is read-only
+        vectorstore = self.index_store.load(previous_key, self.embeddings, use_mmap=False)
+        if vectorstore is None:
+            return self.process_document(document_text, metadata, progress)
 
-        chunk_summaries = []
-        max_chunks = 12  # To avoid hitting token limits, you may wish to limit total number of chunks summarized
+        try:
+            if index_type_of(vectorstore.index) != 'flat':
+                # Approximate indexes can't remove vectors (or don't renumber the rest);
+                # edit a flat copy, _save_index converts it back
+                vectorstore.index = to_flat(vectorstore.index, self._stored_vectors(vectorstore))
+
+            progress('chunk', 0.0)
+            chunks = self.text_splitter.split_documents([
+                Document(page_content=document_text, metadata=metadata or {})
+            ])
+            if not chunks:
+                raise ValueError("No readable content found in the document")
+
+            existing: Dict[str, List[str]] = {}
+            for doc_id in vectorstore.index_to_docstore_id.values():
+                doc = vectorstore.docstore.search(doc_id)
+                content_hash = doc.metadata.get('content_hash') or chunk_hash(doc.page_content)
+                existing.setdefault(content_hash, []).append(doc_id)
+
+            added = []
+            for idx, chunk in enumerate(chunks):
+                content_hash = chunk_hash(chunk.page_content)
+                chunk.metadata['chunk_index'] = idx
+                chunk.metadata['content_hash'] = content_hash
 
-        logger.info(f"Summarizing {min(len(chunks), max_chunks)} chunks out of {len(chunks)} for summary.")
+                doc_ids = existing.get(content_hash)
+                if doc_ids:
+                    # Same text: keep the vector, refresh position and document metadata
+                    vectorstore.docstore.search(doc_ids.pop()).metadata = chunk.metadata
+                else:
+                    added.append(chunk)
 
-        for idx, chunk in enumerate(chunks[:max_chunks]):
-            prompt = (
-                "Read the following section of a document and generate a concise bullet-point summary. "
-                "Use '-' or '*' for bullets. Be specific to the content. Keep the summary under 120 words.\n\n"
-                f"Section {idx + 1}:\n{chunk.page_content}\n\nSummary:"
+            stale = [doc_id for doc_ids in existing.values() for doc_id in doc_ids]
+            logger.info(
+                f"Updating index {previous_key}: {len(chunks) - len(added)} chunks unchanged, "
+                f"{len(added)} to embed, {len(stale)} to remove"
             )
-            try:
-                chunk_summary = self.llm_generate(prompt, max_tokens=350)
-                chunk_summaries.append(chunk_summary.strip())
-            except Exception as e:
-                logger.error(f"Error summarizing chunk {idx + 1}: {e}")
+
+            progress('embed', 0.0)
+            if stale:
+                vectorstore.delete(stale)
+            if added:
+                self._add_to_vectorstore(vectorstore, added)
+            progress('embed', 1.0)
+
+            progress('index', 0.0)
+            statistics = {
+                'total_characters': len(document_text),
+                'total_words': len(document_text.split()),
+                'segments': 1
+            }
+            bm25 = self._save_index(index_key, vectorstore, metadata, statistics)
+            qa_chain = self._create_chain(vectorstore, metadata, index_key, statistics, bm25)
+            progress('index', 1.0)
+            return qa_chain
+
+        except Exception as e:
+            logger.error(f"Error updating document: {str(e)}")
+            raise
+
+    def _stored_vectors(self, vectorstore: FAISS) -> Optional[np.ndarray]:
+        """
+        Exact vectors of an index's chunks in position order, from the
+        embedding cache when enabled (None otherwise)
+        """
+        if self.embedding_cache is None:
+            return None
+        texts = [
+            vectorstore.docstore.search(vectorstore.index_to_docstore_id[i]).page_content
+            for i in range(vectorstore.index.ntotal)
+        ]
+        return self.embedding_cache.embed(texts, embed_texts)
+
+    def _save_index(self, index_key: str, vectorstore: FAISS, metadata: Optional[Dict[str, Any]],
+                    statistics: Dict[str, Any]) -> Optional[BM25Index]:
+        """
+        Build the search and keyword indexes and persist both with the metadata and statistics.
+        Returns the keyword index (None when hybrid search is disabled).
+        """
+        # Large documents switch to the configured approximate index type
+        vectorstore.index = build_search_index(vectorstore.index)
+
+        bm25 = BM25Index.from_vectorstore(vectorstore) if self.hybrid_search else None
+        try:
+            self.index_store.save(index_key, vectorstore, {
+                'metadata': metadata or {},
+                'statistics': statistics,
+                'settings': self.get_index_settings()
+            }, bm25=bm25)
+        except Exception as e:
+            # Persisting is an optimization; the in-memory index is still usable
+            logger.warning(f"Failed to persist index {index_key}: {str(e)}")
+        return bm25
+
+    def get_source_key(self, data: bytes) -> str:
+        """
+        Key identifying raw source bytes (e.g. an uploaded PDF) under the current settings
+        """
+        return self.index_store.compute_source_key(data, self.get_index_settings())
+
+    def load_by_source(self, source_key: str) -> Optional['EnhancedRetrievalQA']:
+        """
+        Load the retrieval chain previously built from identical source bytes
+        """
+        index_key = self.index_store.resolve_alias(source_key)
+        if index_key is None:
+            return None
+
+        loaded = self.load_document(index_key)
+        if loaded is None:
+            return None
+
+        logger.info(f"Reusing stored index {index_key} for identical source {source_key}")
+        return loaded[0]
+
+    def _add_to_vectorstore(self, vectorstore: Optional[FAISS], chunks: List[Document]) -> FAISS:
+        """
+        Embed a batch of chunks (reusing cached chunk embeddings when enabled)
+        and add them to the vector store, creating it on the first batch
+        """
+        started = time.perf_counter()
+        texts = [chunk.page_content for chunk in chunks]
+        if self.embedding_cache is not None:
+            # Only chunks not seen before (in any document) are embedded
+            vectors = self.embedding_cache.embed(texts, embed_texts)
+        else:
+            vectors = embed_texts(texts)
+        elapsed = time.perf_counter() - started
+        logger.info(f"Embedded {len(texts)} chunks in {elapsed:.2f}s ({len(texts) / max(elapsed, 1e-9):.1f} chunks/s)")
+
+        text_embeddings = list(zip(texts, vectors))
+        metadatas = [chunk.metadata for chunk in chunks]
+        if vectorstore is None:
+            return FAISS.from_embeddings(text_embeddings, self.embeddings, metadatas=metadatas)
+
+        vectorstore.add_embeddings(text_embeddings, metadatas=metadatas)
+        return vectorstore
+
+    def load_document(self, document_id: str) -> Optional[tuple]:
+        """
+        Rebuild a retrieval chain from a persisted index.
+        Returns (retrieval_chain, metadata, statistics) or None if not stored.
+        """
+        vectorstore = self.index_store.load(document_id, self.embeddings)
+        if vectorstore is None:
+            return None
+
+        meta = self.index_store.load_meta(document_id)
+        metadata = meta.get('metadata', {})
+        qa_chain = self._create_chain(vectorstore, metadata, document_id, meta.get('statistics'))
+        return qa_chain, metadata, qa_chain.statistics
+
+    def _create_chain(self, vectorstore, metadata: Dict[str, Any], index_key: str,
+                      statistics: Optional[Dict[str, Any]] = None,
+                      bm25: Optional[BM25Index] = None) -> 'EnhancedRetrievalQA':
+        """
+        Wrap a vector store (and its keyword index) in an enhanced retrieval chain
+        """
+        qa_chain = EnhancedRetrievalQA(
+            llm=self.groq_llm,
+            retriever=vectorstore.as_retriever(
+                search_type="similarity",
+                search_kwargs={"k": self.retrieval_k}
+            ),
+            document_metadata=metadata or {}
+        )
+        qa_chain.index_key = index_key
+        qa_chain.statistics = statistics or {}
+        qa_chain.answer_cache = self.answer_cache
+        qa_chain.set_suggestions(self.index_store.load_suggestions(index_key))
+
+        if self.hybrid_search:
+            if bm25 is None:
+                bm25 = self.index_store.load_bm25(index_key)
+            if bm25 is None:
+                # Indexes stored before keyword search existed; building it is cheap
+                bm25 = BM25Index.from_vectorstore(vectorstore)
+            qa_chain.bm25 = bm25
+        return qa_chain
+
+    def get_document_summary(self, chunks: List[Document], document_id: Optional[str] = None,
+                             refresh: bool = False, progress: Optional[Callable[[str, float], None]] = None,
+                             section_summaries: Optional[List[str]] = None):
+        """
+        Generate a detailed, structured summary for the document using map-reduce summarization to avoid token limit errors.
+        Takes the document's chunks (see EnhancedRetrievalQA.get_chunks) so the text is not re-split.
+
+        When a document_id is given the summary is served from the summary cache,
+        unless refresh is set. When the summary is generated, the map-phase
+        section summaries are appended to section_summaries if given. A summary
+        missing sections because model calls failed is returned but not cached.
+        """
+        if document_id:
+            return self.summary_cache.get_or_create(
+                SummaryCache.make_key(document_id, SUMMARY_PROMPT_VERSION),
+                lambda: self._generate_summary(chunks, progress, section_summaries),
+                refresh=refresh
+            )
+        try:
+            return self._generate_summary(chunks, progress, section_summaries)
+        except DegradedSummaryError as e:
+            return e.summary
+
+    def _generate_summary(self, chunks: List[Document],
+                          progress: Optional[Callable[[str, float], None]] = None,
+                          section_summaries: Optional[List[str]] = None) -> str:
+        """
+        Sections are summarized concurrently (bounded by SUMMARY_MAX_CONCURRENCY), then the
+        section summaries are combined, hierarchically for long documents.
+        Raises DegradedSummaryError (with the best-effort summary) when any
+        section or combine call failed.
+        """
+        progress = progress or _no_progress
+        sections = self._build_summary_sections(chunks)
+
+        logger.info(f"Summarizing {len(sections)} sections built from {len(chunks)} chunks.")
+
+        # Map: summarize every section concurrently, keeping document order
+        done = [0]
+        done_lock = threading.Lock()
+
+        def summarize(item):
+            summary = self._summarize_section(*item)
+            with done_lock:
+                done[0] += 1
+                # The map phase is most of the work; leave the rest for the reduce calls
+                progress('summarize', 0.9 * done[0] / max(1, len(sections)))
+            return summary
+
+        progress('summarize', 0.0)
+        with ThreadPoolExecutor(max_workers=self.summary_max_concurrency) as executor:
+            results = list(executor.map(summarize, enumerate(sections, 1)))
+        chunk_summaries = [summary for summary in results if summary]
+        if section_summaries is not None:
+            section_summaries.extend(chunk_summaries)
+
+        failed_sections = len(sections) - len(chunk_summaries)
+        if sections and not chunk_summaries:
+            raise DegradedSummaryError('', f"all {len(sections)} sections failed to summarize")
+
+        # Reduce: combine the section summaries into a final summary
+        summary, complete = self._reduce_summaries(chunk_summaries)
+        if failed_sections:
+            raise DegradedSummaryError(summary, f"{failed_sections} of {len(sections)} sections failed to summarize")
+        if not complete:
+            raise DegradedSummaryError(summary, "combining the section summaries failed")
+        return summary
+
+    def _build_summary_sections(self, chunks: List[Document]) -> List[str]:
+        """
+        Group consecutive chunks into sections of about SUMMARY_SECTION_TOKENS tokens,
+        never more than fits the model's window next to the map prompt and its summary
+        """
+        budget = min(self.summary_section_tokens,
+                     prompt_budget(SECTION_SUMMARY_MAX_TOKENS, self._section_prompt(0, '')))
+        return split_by_budget(chunks, max(1, budget), self.chunk_overlap)
+
+    def _summarize_section(self, idx: int, text: str) -> Optional[str]:
+        """
+        Summarize a single section (map step)
+        """
+        try:
+            return self.llm_generate(self._section_prompt(idx, text), max_tokens=SECTION_SUMMARY_MAX_TOKENS).strip()
+        except Exception as e:
+            logger.error(f"Error summarizing section {idx}: {e}")
+            return None
+
+    @staticmethod
+    def _section_prompt(idx: int, text: str) -> str:
+        return (
+            "Read the following section of a document and generate a concise bullet-point summary. "
+            "Use '-' or '*' for bullets. Be specific to the content. Keep the summary under 120 words.\n\n"
+            f"Section {idx}:\n{text}\n\nSummary:"
+        )
+
+    def _reduce_summaries(self, summaries: List[str]) -> Tuple[str, bool]:
+        """
+        Combine section summaries into one, merging in groups of
+        SUMMARY_REDUCE_FANOUT until a single final combine call fits.
+        Returns the summary and whether every combine call succeeded.
+        """
+        fanout = max(2, self.summary_reduce_fanout)
+        complete = True
+
+        while len(summaries) > fanout:
+            groups = [summaries[i:i + fanout] for i in range(0, len(summaries), fanout)]
+            logger.info(f"Reducing {len(summaries)} summaries in {len(groups)} groups")
+            with ThreadPoolExecutor(max_workers=self.summary_max_concurrency) as executor:
+                results = list(executor.map(self._combine_summaries, groups))
+            summaries = [summary for summary, _ in results]
+            complete = complete and all(combined for _, combined in results)
 
         # Combine all chunk summaries into a final summary
-        combined_summaries = "\n\n".join(chunk_summaries)
+        combined_summaries = "\n\n".join(summaries)
         final_prompt = (
             "You are an expert document summarizer. Combine the following summaries into a single, detailed, bullet-point summary "
             "with section headers if appropriate. Avoid repetition and capture all main points.\n\n"
@@ -137,61 +590,135 @@ class DocumentProcessor:
         )
         try:
             final_summary = self.llm_generate(final_prompt, max_tokens=600)
-            return final_summary.strip()
+            return final_summary.strip(), complete
         except Exception as e:
             logger.error(f"Error during final summary combination: {e}")
             # As fallback, return joined chunk summaries
-            return combined_summaries.strip()
-
-    def llm_generate(self, prompt, max_tokens=500, max_retries=5):
-        import requests
-        api_key = os.getenv("GROQ_API_KEY") or self.groq_api_key
-        url = "https://api.groq.com/openai/v1/chat/completions"
-        headers = {"Authorization": f"Bearer {api_key}"}
-        payload = {
-            "model": "llama3-8b-8192",
-            "messages": [{"role": "user", "content": prompt}],
-            "max_tokens": max_tokens,
-            "temperature": 0.4,
-        }
-        for attempt in range(max_retries):
+            return combined_summaries.strip(), False
+
+    def _combine_summaries(self, summaries: List[str]) -> Tuple[str, bool]:
+        """
+        Merge a group of summaries into one intermediate summary (inner reduce step).
+        Returns the summary and whether the model call succeeded.
+        """
+        combined_summaries = "\n\n".join(summaries)
+        prompt = (
+            "Combine the following partial summaries of consecutive document sections into one concise "
+            "bullet-point summary. Keep every distinct point, remove repetition, and stay under 200 words.\n\n"
+            f"{combined_summaries}\n\n"
+            "Combined Summary:"
+        )
+        try:
+            return self.llm_generate(prompt, max_tokens=450).strip(), True
+        except Exception as e:
+            logger.error(f"Error combining summaries: {e}")
+            return combined_summaries.strip(), False
+
+    def prepare_suggestions(self, qa_chain: 'EnhancedRetrievalQA', summaries: List[str]) -> List[str]:
+        """
+        Generate document-specific suggested questions from the summaries
+        (the map-phase section summaries, or the final summary), store them
+        with the index and pre-answer them in the background. Questions
+        already stored for the index are reused.
+        """
+        if not qa_chain.suggested_questions:
+            questions = self._generate_questions(summaries)
+            if not questions:
+                return []
+            qa_chain.set_suggestions({'questions': questions})
+            self._save_suggestions(qa_chain)
+
+        if self.suggestion_preanswer and qa_chain.unanswered_suggestions():
+            self._suggestion_executor.submit(self._answer_suggestions, qa_chain)
+        return qa_chain.suggested_questions
+
+    def _generate_questions(self, summaries: List[str]) -> List[str]:
+        """
+        Ask the LLM for questions the document answers, one per line
+        """
+        count = self.suggested_questions_count
+        prompt_start = (
+            f"Below are summaries of the sections of a document. Write {count} specific questions a reader "
+            "could ask about this document, each answerable from its content. Cover different sections. "
+            "Write one question per line, with no numbering or other text.\n\n"
+        )
+        # Use as many summaries as fit the window, in document order
+        budget = prompt_budget(SUGGESTION_MAX_TOKENS, prompt_start)
+        material, used = [], 0
+        for summary in summaries:
+            if not summary.strip():
+                continue
+            tokens = count_tokens(summary)
+            if used + tokens > budget:
+                break
+            material.append(summary)
+            used += tokens
+        if not material:
+            return []
+
+        try:
+            text = self.llm_generate(prompt_start + "\n\n".join(material) + "\n\nQuestions:",
+                                     max_tokens=SUGGESTION_MAX_TOKENS)
+        except Exception as e:
+            logger.error(f"Error generating suggested questions: {e}")
+            return []
+
+        questions, seen = [], set()
+        for line in text.splitlines():
+            question = QUESTION_PREFIX_RE.sub('', line).strip()
+            key = normalize_question(question)
+            if question.endswith('?') and validate_question(question) and key not in seen:
+                seen.add(key)
+                questions.append(question)
+        return questions[:count]
+
+    def _answer_suggestions(self, qa_chain: 'EnhancedRetrievalQA'):
+        """
+        Answer the suggested questions that have no stored answer yet
+        (through the answer cache, concurrently) and store the answers
+        """
+        questions = qa_chain.unanswered_suggestions()
+        started = time.perf_counter()
+
+        def pre_answer(question):
             try:
-                response = requests.post(url, headers=headers, json=payload, timeout=45)
-                data = response.json()
-                # Handle rate limit (429) with Groq-specific retry logic
-                if response.status_code == 429:
-                    msg = data.get("error", {}).get("message", "")
-                    logger.error(f"LLM API error (429): {msg}")
-                    # Try to extract "Please try again in Xs." or "in Xms."
-                    wait_match = re.search(r"Please try again in ([\d\.]+)(ms|s)", msg)
-                    if wait_match:
-                        wait_time = float(wait_match.group(1))
-                        unit = wait_match.group(2)
-                        if unit == "ms":
-                            wait_time = wait_time / 1000.0
-                        logger.warning(f"Rate limit hit, sleeping for {wait_time + 0.1:.2f} seconds...")
-                        time.sleep(wait_time + 0.1)  # Add a small buffer
-                        continue  # Retry after waiting
-                    else:
-                        # If we can't parse, default to 1.5s and try again
-                        logger.warning("Rate limit hit, couldn't parse wait time, sleeping for 1.5s")
-                        time.sleep(1.5)
-                        continue
-                if response.status_code != 200:
-                    logger.error(f"LLM API error (status {response.status_code}): {data.get('error', data)}")
-                    logger.error(f"LLM API full response: {response.text}")
-                    raise RuntimeError(f"LLM API error: {data.get('error', data)}")
-                if "choices" not in data or not data["choices"]:
-                    logger.error(f"LLM API response missing 'choices': {data}")
-                    logger.error(f"LLM API full response: {response.text}")
-                    raise RuntimeError(f"LLM API response missing 'choices': {data}")
-                return data["choices"][0]["message"]["content"]
+                return question, qa_chain.answer(question)
             except Exception as e:
-                logger.error(f"Exception during LLM call (attempt {attempt+1}/{max_retries}): {str(e)}")
-                if attempt == max_retries - 1:
-                    raise RuntimeError(f"Exception during LLM call after {max_retries} retries: {str(e)}")
-                else:
-                    time.sleep(2)  # Fallback wait before retry
+                logger.error(f"Error pre-answering suggested question: {e}")
+                return question, None
+
+        with ThreadPoolExecutor(max_workers=self.summary_max_concurrency) as executor:
+            results = list(executor.map(pre_answer, questions))
+
+        answered = 0
+        for question, result in results:
+            if result and result['contexts']:
+                qa_chain.suggested_answers[normalize_question(question)] = {
+                    'answer': result['answer'],
+                    'contexts': result['contexts']
+                }
+                answered += 1
+        if answered:
+            self._save_suggestions(qa_chain)
+        logger.info(f"Pre-answered {answered}/{len(questions)} suggested questions in "
+                    f"{time.perf_counter() - started:.1f}s")
+
+    def _save_suggestions(self, qa_chain: 'EnhancedRetrievalQA'):
+        try:
+            self.index_store.save_suggestions(qa_chain.index_key, qa_chain.get_suggestions())
+        except (OSError, ValueError) as e:
+            logger.warning(f"Failed to store suggested questions for {qa_chain.index_key}: {str(e)}")
+
+    def llm_generate(self, prompt, max_tokens=500, max_retries=None):
+        """
+        Single-prompt completion through the shared Groq client
+        """
+        return get_llm_client().chat(
+            [{"role": "user", "content": prompt}],
+            max_tokens=max_tokens,
+            temperature=0.4,
+            max_retries=max_retries
+        )
 
 
 class EnhancedRetrievalQA:
@@ -202,59 +729,479 @@ class EnhancedRetrievalQA:
     def __init__(self, llm, retriever, document_metadata: Dict[str, Any] = None):
         self.llm = llm
         self.retriever = retriever
+        self.vectorstore = retriever.vectorstore
+        self.k = retriever.search_kwargs.get('k', 4)
         self.document_metadata = document_metadata or {}
+        self.index_key = None
+        self.statistics = {}
+        self.answer_cache = None
+
+        # Document-specific suggested questions and their pre-generated answers
+        # (keyed by normalized question)
+        self.suggested_questions: List[str] = []
+        self.suggested_answers: Dict[str, Dict[str, Any]] = {}
+
+        # Keyword index fused with vector search when set
+        config = get_config()
+        self.bm25 = None
+        self.fetch_k = config.RETRIEVAL_FETCH_K
+        self.vector_weight = config.HYBRID_VECTOR_WEIGHT
+        self.keyword_weight = config.HYBRID_KEYWORD_WEIGHT
+        self.rrf_k = config.RRF_K
+
+        # Cross-encoder reranking of over-fetched candidates when enabled
+        self.rerank = config.RERANK_ENABLED
+        self.rerank_fetch_k = config.RERANK_FETCH_K
+        self.rerank_top_n = config.RERANK_TOP_N
+
+        # Prompt sizing
+        self.context_budget_tokens = config.CONTEXT_BUDGET_TOKENS
+        self.chunk_overlap = config.CHUNK_OVERLAP
+
+    def retrieve(self, question: str, k: Optional[int] = None, vector_weight: Optional[float] = None,
+                 keyword_weight: Optional[float] = None, rrf_k: Optional[int] = None,
+                 rerank: Optional[bool] = None, query_vector: Optional[np.ndarray] = None) -> List[Tuple[Document, float]]:
+        """
+        Retrieve the top-k chunks for a question, best first.
+
+        Without a keyword index the scores are cosine similarities. With one,
+        fetch_k candidates from vector search and from BM25 are merged with
+        weighted reciprocal-rank fusion, and the scores are fused scores
+        normalized to 0-1. With reranking, rerank_fetch_k candidates are
+        rescored by the cross-encoder (0-1 relevance) and k defaults to
+        rerank_top_n. Weights, k and reranking can be overridden per call.
+        query_vector is the question's embedding, when already computed.
+        """
+        return self.retrieve_batch(
+            [question], k, vector_weight, keyword_weight, rrf_k, rerank,
+            None if query_vector is None else np.asarray([query_vector], dtype=np.float32)
+        )[0]
+
+    def retrieve_batch(self, questions: List[str], k: Optional[int] = None, vector_weight: Optional[float] = None,
+                       keyword_weight: Optional[float] = None, rrf_k: Optional[int] = None,
+                       rerank: Optional[bool] = None,
+                       query_vectors: Optional[np.ndarray] = None) -> List[List[Tuple[Document, float]]]:
+        """
+        retrieve() for several questions, with one FAISS search for all of
+        them. query_vectors holds their embeddings (one row per question),
+        when already computed.
+        """
+        rerank = self.rerank if rerank is None else rerank
+        if rerank:
+            top_n = k or self.rerank_top_n
+            k = max(top_n, self.rerank_fetch_k)
+        else:
+            k = k or self.k
+        vector_weight = self.vector_weight if vector_weight is None else vector_weight
+        keyword_weight = self.keyword_weight if keyword_weight is None else keyword_weight
+        hybrid = self.bm25 is not None and keyword_weight > 0
+        fetch_k = max(k, self.fetch_k) if hybrid else k
+
+        if not hybrid or vector_weight > 0:
+            vector_hits = self._vector_search(questions, fetch_k, query_vectors)
+        else:
+            vector_hits = [[] for _ in questions]
+
+        results = []
+        for question, hits in zip(questions, vector_hits):
+            if hybrid:
+                keyword_hits = self.bm25.search(question, fetch_k)
+                hits = reciprocal_rank_fusion([
+                    ([doc_id for doc_id, _ in hits], vector_weight),
+                    ([doc_id for doc_id, _ in keyword_hits], keyword_weight)
+                ], rrf_k or self.rrf_k)
+
+            scored_docs = [(self.vectorstore.docstore.search(doc_id), score) for doc_id, score in hits[:k]]
+            if rerank:
+                scored_docs, _ = reranker.rerank(question, scored_docs, top_n)
+            results.append(scored_docs)
+        return results
+
+    def _vector_search(self, questions: List[str], k: int,
+                       query_vectors: Optional[np.ndarray] = None) -> List[List[Tuple[str, float]]]:
+        """
+        Search the FAISS index with the questions' embeddings (computed here
+        in one batch unless given), returning (docstore_id, cosine similarity)
+        pairs for every question
+        """
+        if query_vectors is None:
+            query_vectors = self._embed_questions(questions)
+        query = np.ascontiguousarray(query_vectors, dtype=np.float32)
+        distances, indices = self.vectorstore.index.search(query, min(k, self.vectorstore.index.ntotal))
+        # Embeddings are normalized, so the squared L2 distance FAISS reports is 2 - 2 * cosine
+        return [
+            [
+                (self.vectorstore.index_to_docstore_id[int(i)], 1.0 - float(distance) / 2.0)
+                for distance, i in zip(row_distances, row_indices)
+                if i != -1
+            ]
+            for row_distances, row_indices in zip(distances, indices)
+        ]
+
+    @staticmethod
+    def _embed_question(question: str) -> np.ndarray:
+        return np.asarray(get_embeddings().embed_query(question), dtype=np.float32)
+
+    @staticmethod
+    def _embed_questions(questions: List[str]) -> np.ndarray:
+        """
+        Embed several questions in one batched encoder call
+        """
+        if len(questions) == 1:
+            return np.asarray([get_embeddings().embed_query(questions[0])], dtype=np.float32)
+        return np.asarray(get_embeddings().embed_documents(questions), dtype=np.float32)
+
+    def _lookup_answer(self, question: str,
+                       retrieval: Optional[Dict[str, Any]]) -> Tuple[Optional[Dict[str, Any]], Optional[np.ndarray]]:
+        """
+        Check the pre-generated suggestion answers, then the answer cache.
+        The question is only embedded when there is no exact match; the
+        embedding is returned so retrieval can reuse it.
+        """
+        cached = self._cached_exact(question, retrieval)
+        if cached is not None or self.answer_cache is None or self.index_key is None:
+            return cached, None
+        vector = self._embed_question(question)
+        return self._cached_similar(question, retrieval, vector), vector
+
+    def _cached_exact(self, question: str, retrieval: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """
+        Stored suggestion answer or exact answer cache match, without embedding the question
+        """
+        if not retrieval:
+            stored = self.suggested_answers.get(normalize_question(question))
+            if stored is not None:
+                return {**stored, 'cache': {'match': 'suggested', 'similarity': 1.0, 'question': question}}
+
+        if self.answer_cache is None or self.index_key is None:
+            return None
+        return self.answer_cache.get(AnswerCache.make_namespace(self.index_key, retrieval), question)
+
+    def _cached_similar(self, question: str, retrieval: Optional[Dict[str, Any]],
+                        vector: np.ndarray) -> Optional[Dict[str, Any]]:
+        """
+        Answer cache match for a question with the given embedding
+        """
+        if self.answer_cache is None or self.index_key is None:
+            return None
+        return self.answer_cache.get(AnswerCache.make_namespace(self.index_key, retrieval), question, vector)
+
+    def _store_answer(self, question: str, retrieval: Optional[Dict[str, Any]], vector: Optional[np.ndarray],
+                      answer: str, contexts: List[Dict[str, Any]]):
+        if self.answer_cache is None or self.index_key is None or not answer:
+            return
+        self.answer_cache.put(
+            AnswerCache.make_namespace(self.index_key, retrieval),
+            question,
+            {'answer': answer, 'contexts': contexts},
+            vector
+        )
 
     def run(self, question: str) -> str:
         """
         Run the QA chain with enhanced context
         """
+        return self.run_with_context(question)['answer']
+
+    def run_with_context(self, question: str, max_context: Optional[int] = None,
+                         retrieval: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Answer a question from a single retrieval pass (see answer()), reporting
+        failures as the answer text
+        """
         try:
-            logger.info(f"Processing question: {question[:100]}...")
+            return self.answer(question, max_context, retrieval)
 
-            # Retrieve relevant documents
-            relevant_docs = self.retriever.get_relevant_documents(question)
+        except Exception as e:
+            logger.error(f"Error in QA chain: {str(e)}")
+            return {
+                'answer': f"I encountered an error while processing your question: {str(e)}",
+                'contexts': []
+            }
 
-            if not relevant_docs:
-                return "I couldn't find relevant information to answer your question."
+    def answer(self, question: str, max_context: Optional[int] = None,
+               retrieval: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Answer a question from a single retrieval pass.
+        Returns the answer together with the scored chunks used to produce it
+        (the first ``max_context`` of them, or all when not given).
+        retrieval holds optional retrieve() overrides (k, weights, rrf_k, rerank).
+        Answers come from the pre-generated suggestion answers or the answer
+        cache when the same or a near-identical question was answered before;
+        the result then carries a 'cache' entry.
+        """
+        logger.info(f"Processing question: {question[:100]}...")
 
-            # Combine context from retrieved documents
-            context_parts = []
-            for i, doc in enumerate(relevant_docs):
-                context_parts.append(f"Context {i + 1}: {doc.page_content}")
+        cached, vector = self._lookup_answer(question, retrieval)
+        if cached is not None:
+            logger.info(f"Answered from cache ({cached['cache']['match']} match)")
+            return {**cached, 'contexts': cached['contexts'][:max_context]}
 
-            context = "\n\n".join(context_parts)
+        # Retrieve relevant documents
+        scored_docs = self.retrieve(question, query_vector=vector, **(retrieval or {}))
 
-            # Generate answer using the LLM
-            answer = self.llm.generate_with_context(question, context)
+        if not scored_docs:
+            return {
+                'answer': "I couldn't find relevant information to answer your question.",
+                'contexts': []
+            }
 
-            logger.info("Successfully generated answer")
-            return answer
+        # Generate answer using the LLM, from the chunks that fit the prompt budget
+        packed = self._pack_context(question, scored_docs)
+        answer = self.llm.generate_with_context(question, self._build_context(packed))
 
-        except Exception as e:
-            logger.error(f"Error in QA chain: {str(e)}")
-            return f"I encountered an error while processing your question: {str(e)}"
+        contexts = self._format_contexts([(doc, score) for doc, score, _ in packed])
+        self._store_answer(question, retrieval, vector, answer, contexts)
 
-    def get_relevant_context(self, question: str, max_docs: int = 3) -> List[Dict[str, Any]]:
+        logger.info("Successfully generated answer")
+        return {
+            'answer': answer,
+            'contexts': contexts[:max_context]
+        }
+
+    def answer_batch(self, questions: List[str], max_context: Optional[int] = None,
+                     retrieval: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
-        Get relevant context without generating answer
+        Answer several questions at once.
+
+        Stored and cached answers are served first. The remaining questions
+        are embedded in one encoder call and searched with one multi-query
+        FAISS search, then answered by concurrent LLM calls held to the
+        shared rate-limit-aware limiter (see AdaptiveLimiter). A question
+        whose answer fails gets an 'error' instead of failing the batch.
+
+        Returns {'results': [...], 'timings': {...}} with one result per
+        question, in order, each with its own timings.
+        """
+        started = time.perf_counter()
+        results: List[Optional[Dict[str, Any]]] = [None] * len(questions)
+        timings = {}
+
+        pending = []
+        for position, question in enumerate(questions):
+            cached = self._cached_exact(question, retrieval)
+            if cached is not None:
+                results[position] = self._batch_result(question, cached, max_context)
+            else:
+                pending.append(position)
+
+        if pending:
+            step = time.perf_counter()
+            vectors = self._embed_questions([questions[position] for position in pending])
+            timings['embed_ms'] = round((time.perf_counter() - step) * 1000, 1)
+
+            misses = []
+            for position, vector in zip(pending, vectors):
+                cached = self._cached_similar(questions[position], retrieval, vector)
+                if cached is not None:
+                    results[position] = self._batch_result(questions[position], cached, max_context)
+                else:
+                    misses.append((position, vector))
+
+            if misses:
+                step = time.perf_counter()
+                retrieved = self.retrieve_batch(
+                    [questions[position] for position, _ in misses],
+                    query_vectors=np.vstack([vector for _, vector in misses]),
+                    **(retrieval or {})
+                )
+                timings['retrieval_ms'] = round((time.perf_counter() - step) * 1000, 1)
+
+                limiter = get_llm_limiter()
+
+                def generate(item):
+                    (position, vector), scored_docs = item
+                    question = questions[position]
+                    queued = time.perf_counter()
+                    try:
+                        if not scored_docs:
+                            result = {
+                                'answer': "I couldn't find relevant information to answer your question.",
+                                'contexts': []
+                            }
+                            return position, self._batch_result(question, result, max_context)
+
+                        packed = self._pack_context(question, scored_docs)
+                        with limiter.slot():
+                            generation_started = time.perf_counter()
+                            answer = self.llm.generate_with_context(question, self._build_context(packed))
+                        finished = time.perf_counter()
+
+                        contexts = self._format_contexts([(doc, score) for doc, score, _ in packed])
+                        self._store_answer(question, retrieval, vector, answer, contexts)
+                        question_timings = {
+                            'queue_ms': round((generation_started - queued) * 1000, 1),
+                            'generation_ms': round((finished - generation_started) * 1000, 1)
+                        }
+                        result = {'answer': answer, 'contexts': contexts}
+                        return position, self._batch_result(question, result, max_context, question_timings)
+
+                    except Exception as e:
+                        logger.error(f"Error answering batch question: {str(e)}")
+                        return position, {'question': question, 'error': str(e)}
+
+                step = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=limiter.max_concurrency, thread_name_prefix='ask-batch') as executor:
+                    for position, result in executor.map(generate, zip(misses, retrieved)):
+                        results[position] = result
+                timings['generation_ms'] = round((time.perf_counter() - step) * 1000, 1)
+
+        timings['total_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        logger.info(f"Answered {len(questions)} questions ({len(questions) - len(pending)} exact cache hits) "
+                    f"in {timings['total_ms']:.0f}ms")
+        return {'results': results, 'timings': timings}
+
+    @staticmethod
+    def _batch_result(question: str, result: Dict[str, Any], max_context: Optional[int],
+                      timings: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+        entry = {
+            'question': question,
+            'answer': result['answer'],
+            'contexts': result['contexts'][:max_context],
+            'timings': timings or {}
+        }
+        if 'cache' in result:
+            entry['cache'] = result['cache']
+        return entry
+
+    def stream_with_context(self, question: str, max_context: Optional[int] = None,
+                            retrieval: Optional[Dict[str, Any]] = None) -> Iterator[Tuple[str, Any]]:
+        """
+        Stream an answer as (event, data) pairs: one 'context' event with the
+        scored chunks, 'token' events as text is generated, then a 'done'
+        event with timings. Failures are reported as an 'error' event.
+        A cached answer is sent as a single 'token' event, and 'done' then
+        carries the cache match.
         """
+        started = time.perf_counter()
         try:
-            relevant_docs = self.retriever.get_relevant_documents(question)
+            logger.info(f"Streaming answer for question: {question[:100]}...")
+
+            cached, vector = self._lookup_answer(question, retrieval)
+            if cached is not None:
+                yield 'context', cached['contexts'][:max_context]
+                yield 'token', cached['answer']
+                total_ms = round((time.perf_counter() - started) * 1000, 1)
+                yield 'done', {'retrieval_ms': total_ms, 'total_ms': total_ms, 'cache': cached['cache']}
+                return
+
+            packed = self._pack_context(question, self.retrieve(question, query_vector=vector, **(retrieval or {})))
+            retrieval_ms = (time.perf_counter() - started) * 1000
+            contexts = self._format_contexts([(doc, score) for doc, score, _ in packed])
+            yield 'context', contexts[:max_context]
 
-            contexts = []
-            for i, doc in enumerate(relevant_docs[:max_docs]):
-                contexts.append({
-                    'content': doc.page_content,
-                    'metadata': doc.metadata,
-                    'relevance_rank': i + 1
-                })
+            if not packed:
+                yield 'token', "I couldn't find relevant information to answer your question."
+                yield 'done', {'retrieval_ms': round(retrieval_ms, 1), 'total_ms': round(retrieval_ms, 1)}
+                return
 
-            return contexts
+            first_token_ms = None
+            tokens = []
+            for token in self.llm.stream_with_context(question, self._build_context(packed)):
+                if first_token_ms is None:
+                    first_token_ms = (time.perf_counter() - started) * 1000
+                tokens.append(token)
+                yield 'token', token
+            self._store_answer(question, retrieval, vector, ''.join(tokens).strip(), contexts)
+
+            yield 'done', {
+                'retrieval_ms': round(retrieval_ms, 1),
+                'first_token_ms': round(first_token_ms, 1) if first_token_ms is not None else None,
+                'total_ms': round((time.perf_counter() - started) * 1000, 1)
+            }
+
+        except Exception as e:
+            logger.error(f"Error streaming answer: {str(e)}")
+            yield 'error', {'error': f"I encountered an error while processing your question: {str(e)}"}
+
+    def _pack_context(self, question: str, scored_docs: List[Tuple[Document, float]]) -> List[Tuple[Document, float, str]]:
+        """
+        Keep the best chunks that fit CONTEXT_BUDGET_TOKENS and the room the
+        model's window leaves next to the question and the answer
+        """
+        budget = min(self.context_budget_tokens, prompt_budget(self.llm.max_tokens, question))
+        return pack_context(scored_docs, max(1, budget), self.chunk_overlap)
+
+    @staticmethod
+    def _build_context(packed: List[Tuple[Document, float, str]]) -> str:
+        """
+        Combine packed (doc, score, text) entries into the prompt context block
+        """
+        context_parts = []
+        for i, (doc, _, text) in enumerate(packed):
+            source = doc.metadata.get('source')
+            if source:
+                # Chunks from a multi-document collection name their source document
+                context_parts.append(f"Context {i + 1} (from {source}): {text}")
+            else:
+                context_parts.append(f"Context {i + 1}: {text}")
+
+        return "\n\n".join(context_parts)
+
+    def set_suggestions(self, suggestions: Optional[Dict[str, Any]]):
+        """
+        Set the suggested questions and pre-generated answers, as stored with the index
+        """
+        suggestions = suggestions or {}
+        self.suggested_questions = list(suggestions.get('questions') or [])
+        self.suggested_answers = {
+            normalize_question(question): result
+            for question, result in (suggestions.get('answers') or {}).items()
+        }
+
+    def get_suggestions(self) -> Dict[str, Any]:
+        """
+        The suggested questions and their pre-generated answers, for storing with the index
+        """
+        answers = {}
+        for question in self.suggested_questions:
+            result = self.suggested_answers.get(normalize_question(question))
+            if result is not None:
+                answers[question] = result
+        return {'questions': self.suggested_questions, 'answers': answers}
+
+    def unanswered_suggestions(self) -> List[str]:
+        """
+        Suggested questions without a pre-generated answer
+        """
+        return [question for question in self.suggested_questions
+                if normalize_question(question) not in self.suggested_answers]
+
+    def get_chunks(self) -> List[Document]:
+        """
+        Get all indexed chunks in document order
+        """
+        docs = list(self.vectorstore.docstore._dict.values())
+        return sorted(docs, key=lambda doc: doc.metadata.get('chunk_index', 0))
+
+    def get_relevant_context(self, question: str, max_docs: int = 3,
+                             retrieval: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Get relevant context without generating answer
+        """
+        try:
+            options = {'k': max(max_docs, self.k), **(retrieval or {})}
+            return self._format_contexts(self.retrieve(question, **options), max_docs)
 
         except Exception as e:
             logger.error(f"Error retrieving context: {str(e)}")
             return []
 
+    @staticmethod
+    def _format_contexts(scored_docs: List[Tuple[Document, float]], max_docs: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Convert scored chunks into JSON-serializable context entries
+        """
+        contexts = []
+        for i, (doc, score) in enumerate(scored_docs[:max_docs]):
+            contexts.append({
+                'content': doc.page_content,
+                'metadata': doc.metadata,
+                'relevance_rank': i + 1,
+                'score': round(score, 4)
+            })
+        return contexts
+
 
 # Convenience function for backward compatibility
 def get_retrieval_chain(document_text: str) -> EnhancedRetrievalQA:
@@ -0,0 +1,174 @@
+import math
+import logging
+import threading
+from typing import List, Tuple, Optional, Dict, Any
+
+from langchain.schema import Document
+from config import get_config
+
+logger = logging.getLogger(__name__)
+
+# Fallback when no tokenizer is available; errs on the side of more tokens
+CHARS_PER_TOKEN = 3.5
+
+# Shorter prefix/suffix matches between neighbouring chunks are treated as coincidence
+MIN_OVERLAP_CHARS = 16
+
+# "Context 12 (from ...): " and the blank line between contexts
+CONTEXT_ENTRY_OVERHEAD_TOKENS = 12
+
+_tokenizer = None
+_tokenizer_loaded = False
+_tokenizer_lock = threading.Lock()
+
+
+def _get_tokenizer():
+    """
+    The configured Hugging Face tokenizer, or None when it can't be loaded
+    (token counts then fall back to a character estimate)
+    """
+    global _tokenizer, _tokenizer_loaded
+    if _tokenizer_loaded:
+        return _tokenizer
+
+    with _tokenizer_lock:
+        if not _tokenizer_loaded:
+            name = get_config().CONTEXT_TOKENIZER
+            if name:
+                try:
+                    from tokenizers import Tokenizer
+                    tokenizer = Tokenizer.from_pretrained(name)
+                    # Count whole texts, not the model's truncated input
+                    tokenizer.no_truncation()
+                    tokenizer.no_padding()
+                    _tokenizer = tokenizer
+                except Exception as e:
+                    logger.warning(f"Tokenizer {name} unavailable ({str(e)}), estimating token counts")
+            _tokenizer_loaded = True
+
+    return _tokenizer
+
+
+def count_tokens(text: str) -> int:
+    """
+    Number of tokens in a text
+    """
+    if not text:
+        return 0
+    tokenizer = _get_tokenizer()
+    if tokenizer is None:
+        return math.ceil(len(text) / CHARS_PER_TOKEN)
+    return len(tokenizer.encode(text, add_special_tokens=False).ids)
+
+
+def prompt_budget(max_tokens: int, *fixed_texts: str) -> int:
+    """
+    Tokens left for variable prompt content once the completion (max_tokens),
+    the prompt template (PROMPT_OVERHEAD_TOKENS) and any fixed texts such as
+    the question are reserved from the model's context window
+    """
+    config = get_config()
+    reserved = max_tokens + config.PROMPT_OVERHEAD_TOKENS + sum(count_tokens(text) for text in fixed_texts)
+    return max(0, config.CONTEXT_WINDOW_TOKENS - reserved)
+
+
+def overlap_length(previous: str, text: str, max_overlap: Optional[int] = None) -> int:
+    """
+    Length of the longest suffix of previous that text starts with (the text
+    the splitter repeated from CHUNK_OVERLAP), or 0 when under MIN_OVERLAP_CHARS
+    """
+    max_overlap = get_config().CHUNK_OVERLAP if max_overlap is None else max_overlap
+    for length in range(min(max_overlap, len(previous), len(text)), MIN_OVERLAP_CHARS - 1, -1):
+        if text.startswith(previous[-length:]):
+            return length
+    return 0
+
+
+def _chunk_key(doc: Document) -> Optional[Tuple[Any, int]]:
+    index = doc.metadata.get('chunk_index')
+    if index is None:
+        return None
+    return doc.metadata.get('source'), index
+
+
+def pack_context(scored_docs: List[Tuple[Document, float]], budget: int,
+                 max_overlap: Optional[int] = None) -> List[Tuple[Document, float, str]]:
+    """
+    Fill a token budget with the highest-scoring chunks.
+
+    Chunks are taken best first; one that doesn't fit is skipped in favour of
+    smaller lower-ranked ones. Text a chunk shares with an already packed
+    neighbour (chunk_index +/- 1 of the same source) is dropped, so the
+    CHUNK_OVERLAP region is only paid for once. The best chunk is always
+    included, truncated when it exceeds the budget on its own.
+
+    Returns (doc, score, text) entries in score order, where text is the part
+    of the chunk to put in the prompt.
+    """
+    packed = []
+    packed_by_key: Dict[Tuple[Any, int], Document] = {}
+    used = 0
+
+    for doc, score in scored_docs:
+        text = doc.page_content
+        key = _chunk_key(doc)
+        if key is not None:
+            source, index = key
+            previous = packed_by_key.get((source, index - 1))
+            if previous is not None:
+                text = text[overlap_length(previous.page_content, text, max_overlap):]
+            following = packed_by_key.get((source, index + 1))
+            if following is not None:
+                shared = overlap_length(doc.page_content, following.page_content, max_overlap)
+                if shared:
+                    text = text[:max(0, len(text) - shared)]
+        if not text.strip():
+            continue
+
+        tokens = count_tokens(text) + CONTEXT_ENTRY_OVERHEAD_TOKENS
+        if used + tokens > budget:
+            if packed:
+                continue
+            # Even the best chunk is too long; keep as much of it as fits
+            text = text[:max(1, int(len(text) * budget / tokens))]
+            tokens = budget
+
+        packed.append((doc, score, text))
+        used += tokens
+        if key is not None:
+            packed_by_key[key] = doc
+
+    if len(packed) < len(scored_docs):
+        logger.info(f"Packed {len(packed)} of {len(scored_docs)} chunks into {used}/{budget} tokens")
+    return packed
+
+
+def split_by_budget(chunks: List[Document], budget: int, max_overlap: Optional[int] = None) -> List[str]:
+    """
+    Group consecutive chunks (in document order) into sections of at most
+    budget tokens, dropping the overlap each chunk repeats from the previous one
+    """
+    sections = []
+    current = []
+    current_tokens = 0
+    previous = None
+
+    for chunk in chunks:
+        text = chunk.page_content
+        if previous is not None:
+            text = text[overlap_length(previous, text, max_overlap):]
+        previous = chunk.page_content
+        if not text.strip():
+            continue
+
+        tokens = count_tokens(text)
+        if current and current_tokens + tokens > budget:
+            sections.append("\n".join(current))
+            current, current_tokens = [], 0
+        current.append(text)
+        current_tokens += tokens
+
+    if current:
+        sections.append("\n".join(current))
+
+    return sections
@@ -0,0 +1,153 @@
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Callable, Tuple
+from config import get_config
+
+logger = logging.getLogger(__name__)
+
+
+class DocumentEntry:
+    """
+    A live, analyzed document held by the registry
+    """
+
+    def __init__(self, document_id: str, retrieval_chain, metadata: Dict[str, Any] = None,
+                 statistics: Dict[str, Any] = None):
+        self.document_id = document_id
+        self.retrieval_chain = retrieval_chain
+        self.metadata = metadata or {}
+        self.statistics = statistics or {}
+        self.created_at = time.time()
+        self.last_access = self.created_at
+        self.memory_bytes = self._estimate_memory(retrieval_chain)
+
+    @staticmethod
+    def _estimate_memory(retrieval_chain) -> int:
+        """
+        Approximate resident size of the index: vectors, chunk text and keyword index.
+        Memory-mapped vectors are left out, they are paged in from disk as needed.
+        """
+        try:
+            vectorstore = retrieval_chain.vectorstore
+            index = vectorstore.index
+            if getattr(vectorstore, 'mmapped_index', None) is index:
+                vector_bytes = 0
+            else:
+                vector_bytes = index.ntotal * index.d * 4
+            text_bytes = sum(
+                len(doc.page_content)
+                for doc in vectorstore.docstore._dict.values()
+            )
+            bm25 = getattr(retrieval_chain, 'bm25', None)
+            keyword_bytes = bm25.nbytes if bm25 is not None else 0
+            return vector_bytes + text_bytes + keyword_bytes
+        except Exception:
+            return 0
+
+
+class DocumentRegistry:
+    """
+    Thread-safe registry of analyzed documents keyed by document ID.
+
+    Entries are evicted least-recently-used first once the estimated index
+    memory exceeds the configured budget. Evicted documents are reloaded
+    lazily from the persisted index store on their next access.
+    """
+
+    def __init__(self, max_memory_bytes: Optional[int] = None,
+                 loader: Optional[Callable[[str], Optional[Tuple[Any, Dict[str, Any], Dict[str, Any]]]]] = None):
+        config = get_config()
+        if max_memory_bytes is None:
+            max_memory_bytes = config.DOCUMENT_REGISTRY_MAX_MEMORY_MB * 1024 * 1024
+        self.max_memory_bytes = max_memory_bytes
+        self.loader = loader
+
+        self._entries: 'OrderedDict[str, DocumentEntry]' = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.RLock()
+
+    def put(self, document_id: str, retrieval_chain, metadata: Dict[str, Any] = None,
+            statistics: Dict[str, Any] = None) -> DocumentEntry:
+        """
+        Register (or replace) a document and evict older ones if over budget
+        """
+        entry = DocumentEntry(document_id, retrieval_chain, metadata, statistics)
+
+        with self._lock:
+            previous = self._entries.pop(document_id, None)
+            if previous is not None:
+                self._memory_bytes -= previous.memory_bytes
+
+            self._entries[document_id] = entry
+            self._memory_bytes += entry.memory_bytes
+            self._evict_locked()
+
+        return entry
+
+    def get(self, document_id: str) -> Optional[DocumentEntry]:
+        """
+        Get a document, reloading it from the persisted index if it was evicted
+        """
+        with self._lock:
+            entry = self._entries.get(document_id)
+            if entry is not None:
+                self._entries.move_to_end(document_id)
+                entry.last_access = time.time()
+                return entry
+
+        if self.loader is None:
+            return None
+
+        try:
+            loaded = self.loader(document_id)
+        except Exception as e:
+            logger.error(f"Error reloading document {document_id}: {str(e)}")
+            return None
+
+        if loaded is None:
+            return None
+
+        retrieval_chain, metadata, statistics = loaded
+        logger.info(f"Reloaded document {document_id} from index store")
+        return self.put(document_id, retrieval_chain, metadata, statistics)
+
+    def remove(self, document_id: str) -> bool:
+        """
+        Drop a document from memory (the persisted index is kept)
+        """
+        with self._lock:
+            entry = self._entries.pop(document_id, None)
+            if entry is None:
+                return False
+            self._memory_bytes -= entry.memory_bytes
+            return True
+
+    def _evict_locked(self):
+        """
+        Evict least-recently-used entries until within budget, always keeping the newest
+        """
+        while self._memory_bytes > self.max_memory_bytes and len(self._entries) > 1:
+            document_id, entry = self._entries.popitem(last=False)
+            self._memory_bytes -= entry.memory_bytes
+            logger.info(f"Evicted document {document_id} ({entry.memory_bytes} bytes) from registry")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get registry occupancy statistics
+        """
+        with self._lock:
+            return {
+                'documents': len(self._entries),
+                'memory_bytes': self._memory_bytes,
+                'max_memory_bytes': self.max_memory_bytes
+            }
+
+    def __contains__(self, document_id: str) -> bool:
+        with self._lock:
+            return document_id in self._entries
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
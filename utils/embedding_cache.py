@@ -0,0 +1,191 @@
+import os
+import re
+import json
+import hashlib
+import logging
+import threading
+from typing import Dict, List, Optional, Callable
+
+import numpy as np
+from filelock import FileLock
+from config import get_config
+
+logger = logging.getLogger(__name__)
+
+KEY_BYTES = 16
+
+
+class EmbeddingCache:
+    """
+    Persistent chunk embedding cache shared across documents.
+
+    Vectors are keyed by a hash of the model name and chunk text and stored
+    as float16 rows appended to a memory-mapped file; a parallel file holds
+    the fixed-size keys in the same row order. Appends are serialized with a
+    file lock, so several worker processes can share one cache.
+    """
+
+    def __init__(self, model_name: Optional[str] = None, path: Optional[str] = None):
+        config = get_config()
+        self.model_name = model_name or config.EMBEDDING_MODEL
+        if config.EMBEDDING_BACKEND != 'torch':
+            # Quantized/ONNX vectors differ slightly from torch ones
+            self.model_name = f'{self.model_name}-{config.EMBEDDING_BACKEND}'
+
+        slug = re.sub(r'[^0-9A-Za-z_.-]+', '_', self.model_name)
+        self.path = os.path.join(path or config.EMBEDDING_CACHE_PATH, slug)
+        os.makedirs(self.path, exist_ok=True)
+
+        self.vectors_path = os.path.join(self.path, 'vectors.f16')
+        self.keys_path = os.path.join(self.path, 'keys.bin')
+        self.meta_path = os.path.join(self.path, 'meta.json')
+        self._file_lock = FileLock(os.path.join(self.path, '.lock'))
+
+        self.dim = self._read_dim()
+        self._index: Dict[bytes, int] = {}
+        self._count = 0
+        self._vectors = None
+        self._lock = threading.Lock()
+
+        with self._lock:
+            self._refresh_locked()
+
+    def key_for(self, text: str) -> bytes:
+        """
+        Cache key for a chunk: hash of the model name and the chunk text
+        """
+        hasher = hashlib.blake2b(digest_size=KEY_BYTES)
+        hasher.update(self.model_name.encode('utf-8'))
+        hasher.update(b'\0')
+        hasher.update(text.encode('utf-8'))
+        return hasher.digest()
+
+    def embed(self, texts: List[str], embed_fn: Callable[[List[str]], np.ndarray],
+              progress: Optional[Callable[[float], None]] = None) -> np.ndarray:
+        """
+        Embed texts, computing only cache misses with embed_fn and storing them.
+        Returns a float32 (n, dim) array in input order.
+        """
+        keys = [self.key_for(text) for text in texts]
+
+        with self._lock:
+            self._refresh_locked()
+            rows = [self._index.get(key) for key in keys]
+            vectors = self._vectors
+
+        miss_positions = [i for i, row in enumerate(rows) if row is None]
+        hits = len(texts) - len(miss_positions)
+        logger.info(f"Embedding cache: {hits} hits, {len(miss_positions)} misses")
+
+        # Embed each distinct missing text once
+        miss_vectors = {}
+        dim = self.dim
+        if miss_positions:
+            unique_misses = {}
+            for i in miss_positions:
+                unique_misses.setdefault(keys[i], texts[i])
+
+            miss_keys = list(unique_misses)
+            computed = np.asarray(embed_fn([unique_misses[key] for key in miss_keys]), dtype=np.float32)
+            dim = computed.shape[1]
+            miss_vectors = dict(zip(miss_keys, computed))
+            self._store(miss_keys, computed)
+
+        if progress:
+            progress(1.0)
+
+        if not texts:
+            return np.zeros((0, dim or 0), dtype=np.float32)
+
+        result = np.empty((len(texts), dim), dtype=np.float32)
+        for i, row in enumerate(rows):
+            if row is None:
+                result[i] = miss_vectors[keys[i]]
+            else:
+                result[i] = vectors[row]
+        return result
+
+    def _store(self, keys: List[bytes], vectors: np.ndarray):
+        """
+        Append new vectors under the cross-process lock
+        """
+        vectors = np.asarray(vectors, dtype=np.float16)
+        if vectors.ndim != 2 or len(vectors) == 0:
+            return
+
+        try:
+            with self._file_lock:
+                with self._lock:
+                    if self.dim is None:
+                        self._write_dim(vectors.shape[1])
+                    elif vectors.shape[1] != self.dim:
+                        logger.warning(f"Embedding dimension {vectors.shape[1]} does not match cache ({self.dim})")
+                        return
+
+                    self._refresh_locked()
+                    new_rows = [i for i, key in enumerate(keys) if key not in self._index]
+                    if not new_rows:
+                        return
+
+                    # Vectors first, keys second: a row only becomes visible once its key is written.
+                    # Drop any partial rows left by an interrupted writer so rows stay aligned.
+                    key_rows = os.path.getsize(self.keys_path) // KEY_BYTES if os.path.exists(self.keys_path) else 0
+                    with open(self.vectors_path, 'ab') as f:
+                        if f.tell() != key_rows * self.dim * 2:
+                            f.truncate(key_rows * self.dim * 2)
+                            f.seek(0, os.SEEK_END)
+                        f.write(np.ascontiguousarray(vectors[new_rows]).tobytes())
+                    with open(self.keys_path, 'ab') as f:
+                        f.write(b''.join(keys[i] for i in new_rows))
+
+                    self._refresh_locked()
+        except OSError as e:
+            # Caching is an optimization; the computed vectors are still returned
+            logger.warning(f"Failed to store embeddings in cache: {str(e)}")
+
+    def _refresh_locked(self):
+        """
+        Pick up rows appended by this or other processes since the last refresh
+        """
+        if self.dim is None:
+            self.dim = self._read_dim()
+            if self.dim is None:
+                return
+
+        try:
+            vector_rows = os.path.getsize(self.vectors_path) // (self.dim * 2)
+            key_rows = os.path.getsize(self.keys_path) // KEY_BYTES
+        except OSError:
+            return
+
+        count = min(vector_rows, key_rows)
+        if count <= self._count:
+            return
+
+        with open(self.keys_path, 'rb') as f:
+            f.seek(self._count * KEY_BYTES)
+            data = f.read((count - self._count) * KEY_BYTES)
+        for i in range(count - self._count):
+            self._index.setdefault(data[i * KEY_BYTES:(i + 1) * KEY_BYTES], self._count + i)
+
+        self._vectors = np.memmap(self.vectors_path, dtype=np.float16, mode='r', shape=(count, self.dim))
+        self._count = count
+
+    def _read_dim(self) -> Optional[int]:
+        try:
+            with open(self.meta_path, encoding='utf-8') as f:
+                return int(json.load(f)['dim'])
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _write_dim(self, dim: int):
+        with open(self.meta_path, 'w', encoding='utf-8') as f:
+            json.dump({'model': self.model_name, 'dim': dim}, f)
+        self.dim = dim
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get cache size statistics
+        """
+        with self._lock:
+            return {'entries': self._count, 'dim': self.dim or 0}
@@ -0,0 +1,170 @@
+import gc
+import time
+import logging
+import threading
+import importlib.util
+from typing import Optional, List, Callable
+
+import numpy as np
+# from langchain_community.embeddings import HuggingFaceEmbeddings
+from langchain_huggingface import HuggingFaceEmbeddings
+from config import get_config
+
+logger = logging.getLogger(__name__)
+
+# Supported EMBEDDING_BACKEND values
+EMBEDDING_BACKENDS = ('torch', 'onnx', 'onnx-int8')
+
+# Packages the ONNX backends need (optional, from optimum[onnxruntime])
+ONNX_PACKAGES = ('optimum', 'onnxruntime')
+
+_embeddings = None
+_load_lock = threading.Lock()
+_ready = threading.Event()
+_load_error: Optional[str] = None
+
+
+def get_embeddings() -> HuggingFaceEmbeddings:
+    """
+    Get the process-wide embedding model, loading it on first use
+    """
+    global _embeddings, _load_error
+    if _embeddings is not None:
+        return _embeddings
+
+    with _load_lock:
+        if _embeddings is None:
+            started = time.perf_counter()
+            try:
+                _embeddings = create_embeddings()
+            except Exception as e:
+                _load_error = str(e)
+                logger.error(f"Error loading embedding model: {str(e)}")
+                raise
+            _load_error = None
+            _ready.set()
+            logger.info(f"Embedding model loaded in {time.perf_counter() - started:.1f}s")
+
+    return _embeddings
+
+
+def create_embeddings(backend: Optional[str] = None, num_threads: Optional[int] = None) -> HuggingFaceEmbeddings:
+    """
+    Build a new embedding model instance for the configured (or given) backend.
+
+    'torch' runs the regular PyTorch model; 'onnx' and 'onnx-int8' run it
+    through ONNX Runtime (the latter with the int8-quantized weights), which
+    needs the optional optimum[onnxruntime] package. Missing ONNX support
+    falls back to torch.
+    """
+    config = get_config()
+    backend = backend or config.EMBEDDING_BACKEND
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown embedding backend: {backend}. Expected one of {EMBEDDING_BACKENDS}")
+
+    if backend != 'torch':
+        missing = [name for name in ONNX_PACKAGES if importlib.util.find_spec(name) is None]
+        if missing:
+            logger.warning(f"ONNX backend needs {', '.join(missing)} (pip install 'optimum[onnxruntime]'), "
+                           f"falling back to torch")
+            backend = 'torch'
+
+    _configure_threads(config.EMBEDDING_NUM_THREADS if num_threads is None else num_threads)
+
+    model_kwargs = {'device': 'cpu'}
+    if backend != 'torch':
+        model_kwargs['backend'] = 'onnx'
+        if backend == 'onnx-int8':
+            model_kwargs['model_kwargs'] = {'file_name': config.EMBEDDING_ONNX_INT8_FILE}
+
+    logger.info(f"Loading embedding model: {config.EMBEDDING_MODEL} ({backend} backend)")
+    try:
+        return HuggingFaceEmbeddings(
+            model_name=config.EMBEDDING_MODEL,
+            model_kwargs=model_kwargs,
+            encode_kwargs={'normalize_embeddings': True, 'batch_size': config.EMBEDDING_BATCH_SIZE}
+        )
+    except Exception as e:
+        # sentence-transformers reports missing ONNX support (or a missing
+        # exported model file) as a plain Exception, not an ImportError
+        if backend == 'torch':
+            raise
+        logger.warning(f"ONNX backend unavailable ({str(e)}), falling back to torch")
+        return create_embeddings('torch', num_threads)
+
+
+def _configure_threads(num_threads: int):
+    """
+    Set torch intra-op threads (0 keeps the torch default)
+    """
+    if not num_threads:
+        return
+    try:
+        import torch
+        torch.set_num_threads(num_threads)
+    except ImportError:
+        pass
+
+
+def embed_texts(texts: List[str], batch_size: Optional[int] = None, embeddings: Optional[HuggingFaceEmbeddings] = None,
+                progress: Optional[Callable[[float], None]] = None) -> np.ndarray:
+    """
+    Embed texts in explicit batches, returning a float32 (n, dim) array.
+    progress(fraction) is called after every batch.
+    """
+    embeddings = embeddings or get_embeddings()
+    batch_size = batch_size or get_config().EMBEDDING_BATCH_SIZE
+
+    batches = []
+    for start in range(0, len(texts), batch_size):
+        batch = texts[start:start + batch_size]
+        batches.append(np.asarray(embeddings.embed_documents(batch), dtype=np.float32))
+        if progress:
+            progress(min(1.0, (start + len(batch)) / len(texts)))
+
+    if not batches:
+        return np.zeros((0, 0), dtype=np.float32)
+    return np.vstack(batches)
+
+
+def is_embeddings_ready() -> bool:
+    """
+    Whether the embedding model is loaded and requests won't block on it
+    """
+    return _ready.is_set()
+
+
+def get_embeddings_error() -> Optional[str]:
+    """
+    The last model loading error, if loading failed
+    """
+    return _load_error
+
+
+def warm_up_embeddings(background: bool = True):
+    """
+    Load the embedding model ahead of the first request.
+
+    In the foreground this is meant to run in a preforking server's master
+    process (e.g. gunicorn with preload_app): the model is loaded once and the
+    loaded objects are moved out of the garbage collector's tracking so the
+    forked workers share the pages copy-on-write instead of each holding a copy.
+    """
+    if background:
+        thread = threading.Thread(target=_warm_up_quietly, name='embedding-warmup', daemon=True)
+        thread.start()
+        return thread
+
+    get_embeddings()
+    # Keep GC passes in the workers from touching (and so copying) the shared objects
+    gc.collect()
+    gc.freeze()
+    return None
+
+
+def _warm_up_quietly():
+    try:
+        get_embeddings()
+    except Exception:
+        # Already logged; the next request retries the load
+        pass
@@ -1,8 +1,7 @@
-import requests
-import json
 import logging
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Iterator
 from langchain.llms.base import LLM
+from utils.llm_client import get_llm_client
 from config import get_config
 
 logger = logging.getLogger(__name__)
@@ -44,84 +43,89 @@ class GroqLLM(LLM):
         Make a call to the Groq API
         """
         try:
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json",
-            }
-
-            # Enhanced system prompt for best-quality, well-formatted responses
-            messages = [
-                {
-                    "role": "system",
-                    "content": (
-                        "You are a highly intelligent, accurate, and helpful AI assistant. "
-                        "Always provide clear, concise, and well-structured answers using proper markdown formatting. "
-                        "Use bullet points, code blocks, and tables where appropriate. "
-                        "If you reference code or examples, format them using markdown. "
-                        "Explain your reasoning when needed. "
-                        "If you cannot answer based on the given context, respond with: "
-                        "\"I don't have enough information to answer this question based on the provided context.\""
-                    )
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ]
-
-            data = {
-                "model": self.model,
-                "messages": messages,
-                "max_tokens": self.max_tokens,
-                "temperature": 0.7,
-                "top_p": 1,
-                "stream": False
-            }
-
-            if stop:
-                data["stop"] = stop
-
             logger.info(f"Making Groq API request with model: {self.model}")
 
-            response = requests.post(
-                self.api_url,
-                headers=headers,
-                json=data,
-                timeout=30
+            generated_text = self._get_client().chat(
+                self._build_messages(prompt),
+                model=self.model,
+                max_tokens=self.max_tokens,
+                temperature=0.7,
+                stop=stop,
+                top_p=1,
+                stream=False
             )
 
-            if response.status_code != 200:
-                error_msg = f"Groq API error ({response.status_code}): {response.text}"
-                logger.error(error_msg)
-                raise Exception(error_msg)
-
-            result = response.json()
-
-            # Extract the generated text
-            if 'choices' in result and len(result['choices']) > 0:
-                generated_text = result['choices'][0]['message']['content']
-                logger.info("Successfully received response from Groq API")
-                return generated_text.strip()
-            else:
-                raise Exception("No response generated from Groq API")
-
-        except requests.exceptions.RequestException as e:
-            error_msg = f"Network error calling Groq API: {str(e)}"
-            logger.error(error_msg)
-            raise Exception(error_msg)
-        except json.JSONDecodeError as e:
-            error_msg = f"Invalid JSON response from Groq API: {str(e)}"
-            logger.error(error_msg)
-            raise Exception(error_msg)
+            logger.info("Successfully received response from Groq API")
+            return generated_text.strip()
+
         except Exception as e:
             logger.error(f"Unexpected error in Groq API call: {str(e)}")
             raise
 
+    def stream_generate(self, prompt: str, stop: Optional[List[str]] = None) -> Iterator[str]:
+        """
+        Stream a completion from the Groq API, yielding text as it is generated
+        """
+        logger.info(f"Making streaming Groq API request with model: {self.model}")
+
+        yield from self._get_client().stream_chat(
+            self._build_messages(prompt),
+            model=self.model,
+            max_tokens=self.max_tokens,
+            temperature=0.7,
+            stop=stop,
+            top_p=1
+        )
+
+    def _get_client(self):
+        """
+        The shared pooled client for this instance's API key and endpoint
+        """
+        return get_llm_client(self.api_key, self.api_url)
+
+    @staticmethod
+    def _build_messages(prompt: str) -> List[Dict[str, str]]:
+        """
+        Wrap a prompt with the assistant system prompt
+        """
+        # Enhanced system prompt for best-quality, well-formatted responses
+        return [
+            {
+                "role": "system",
+                "content": (
+                    "You are a highly intelligent, accurate, and helpful AI assistant. "
+                    "Always provide clear, concise, and well-structured answers using proper markdown formatting. "
+                    "Use bullet points, code blocks, and tables where appropriate. "
+                    "If you reference code or examples, format them using markdown. "
+                    "Explain your reasoning when needed. "
+                    "If you cannot answer based on the given context, respond with: "
+                    "\"I don't have enough information to answer this question based on the provided context.\""
+                )
+            },
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ]
+
     def generate_with_context(self, question: str, context: str) -> str:
         """
         Generate answer with specific context
         """
-        prompt = (
+        return self._call(self._build_context_prompt(question, context))
+
+    def stream_with_context(self, question: str, context: str) -> Iterator[str]:
+        """
+        Stream an answer with specific context
+        """
+        return self.stream_generate(self._build_context_prompt(question, context))
+
+    @staticmethod
+    def _build_context_prompt(question: str, context: str) -> str:
+        """
+        Build the question-answering prompt around retrieved context
+        """
+        return (
             f"## Context\n"
             f"{context}\n\n"
             f"## Question\n"
@@ -136,8 +140,6 @@ class GroqLLM(LLM):
             "## Answer"
         )
 
-        return self._call(prompt)
-
     def get_model_info(self) -> Dict[str, Any]:
         """
         Get information about the current model
@@ -145,6 +147,6 @@ class GroqLLM(LLM):
         return {
             "model": self.model,
             "max_tokens": self.max_tokens,
-            "api_url": self.api_url,
+            "api_url": self._get_client().api_url,
             "type": self._llm_type
         }
\ No newline at end of file
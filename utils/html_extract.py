@@ -0,0 +1,282 @@
+import logging
+from typing import Dict, Any, List, Optional
+from bs4 import BeautifulSoup
+from config import get_config
+
+logger = logging.getLogger(__name__)
+
+# Supported SCRAPER_BACKEND values
+EXTRACTION_BACKENDS = ('lxml', 'bs4')
+
+# Elements that never hold main content
+REMOVED_TAGS = ('script', 'style', 'nav', 'footer', 'header')
+
+# Main content containers, in order of preference
+MAIN_SELECTORS = [
+    'main', 'article', '[role="main"]',
+    '.content', '#content', '.post-content',
+    '.entry-content', '.article-content'
+]
+
+MIN_PARAGRAPH_CHARS = 20
+MIN_BLOCK_CHARS = 100
+MIN_BLOCK_WORDS = 20
+
+
+def _clean_lines(text: str) -> str:
+    """
+    Strip every line and drop empty ones
+    """
+    lines = [line.strip() for line in text.split('\n')]
+    return '\n'.join(line for line in lines if line)
+
+
+class BeautifulSoupExtractor:
+    """
+    Extraction with BeautifulSoup and the pure-Python html.parser
+    """
+
+    name = 'bs4'
+
+    def extract(self, html: str, url: str) -> Dict[str, Any]:
+        """
+        Extract the title, main content and metadata of a page
+        """
+        # Parse HTML
+        soup = BeautifulSoup(html, 'html.parser')
+
+        # Remove script and style elements
+        for script in soup(list(REMOVED_TAGS)):
+            script.decompose()
+
+        # Extract title
+        title = soup.find('title')
+        title_text = title.get_text().strip() if title else "No title"
+
+        return {
+            'title': title_text,
+            'content': self._extract_main_content(soup),
+            'metadata': self._extract_metadata(soup, url)
+        }
+
+    def _extract_main_content(self, soup: BeautifulSoup) -> str:
+        """
+        Extract main content using multiple strategies
+        """
+        content_parts = []
+
+        # Strategy 1: Look for main content containers
+        for selector in MAIN_SELECTORS:
+            main_content = soup.select_one(selector)
+            if main_content:
+                content_parts.append(_clean_lines(main_content.get_text(separator='\n')))
+                break
+
+        # Strategy 2: Extract paragraphs if no main content found
+        if not content_parts:
+            paragraphs = soup.find_all('p')
+            for p in paragraphs:
+                text = p.get_text().strip()
+                if len(text) > MIN_PARAGRAPH_CHARS:  # Only include substantial paragraphs
+                    content_parts.append(text)
+
+        # Strategy 3: Fallback to div elements with substantial text
+        if not content_parts:
+            divs = soup.find_all('div')
+            for div in divs:
+                text = div.get_text().strip()
+                if len(text) > MIN_BLOCK_CHARS and len(text.split()) > MIN_BLOCK_WORDS:
+                    content_parts.append(text)
+
+        return '\n\n'.join(content_parts)
+
+    def _extract_metadata(self, soup: BeautifulSoup, url: str) -> Dict[str, Any]:
+        """
+        Extract metadata from the webpage
+        """
+        metadata = {'source_url': url}
+
+        # Extract meta description
+        meta_desc = soup.find('meta', attrs={'name': 'description'})
+        if meta_desc:
+            metadata['description'] = meta_desc.get('content', '')
+
+        # Extract meta keywords
+        meta_keywords = soup.find('meta', attrs={'name': 'keywords'})
+        if meta_keywords:
+            metadata['keywords'] = meta_keywords.get('content', '')
+
+        # Extract author
+        author = soup.find('meta', attrs={'name': 'author'})
+        if author:
+            metadata['author'] = author.get('content', '')
+
+        # Extract publication date
+        pub_date = soup.find('meta', attrs={'property': 'article:published_time'})
+        if not pub_date:
+            pub_date = soup.find('meta', attrs={'name': 'date'})
+        if pub_date:
+            metadata['published_date'] = pub_date.get('content', '')
+
+        return metadata
+
+
+class LxmlExtractor:
+    """
+    Extraction with lxml's C parser and a single walk over the tree.
+
+    One pass records the first match of every main content selector, the
+    paragraph texts and, for the fallback, the text owned directly by each
+    div (text inside nested divs belongs to the nested div). Unlike the
+    BeautifulSoup fallback, which calls get_text() on every div and so
+    re-walks nested subtrees quadratically, no subtree is visited twice and
+    nested divs don't repeat their parents' text.
+    """
+
+    name = 'lxml'
+
+    def __init__(self):
+        # Imported here so a missing lxml only matters when this backend is selected
+        from lxml import etree, html as lxml_html
+        self._etree = etree
+        self._html = lxml_html
+        self._parser = lxml_html.HTMLParser(encoding='utf-8', remove_comments=True)
+
+    def extract(self, html: str, url: str) -> Dict[str, Any]:
+        """
+        Extract the title, main content and metadata of a page
+        """
+        try:
+            root = self._html.document_fromstring(html.encode('utf-8'), parser=self._parser)
+        except (self._etree.ParserError, ValueError):
+            # Empty or unparseable document
+            return {'title': 'No title', 'content': '', 'metadata': {'source_url': url}}
+
+        self._etree.strip_elements(root, *REMOVED_TAGS, with_tail=False)
+
+        title = None
+        metadata = {'source_url': url}
+        published = {}
+        main_matches: List[Optional[Any]] = [None] * len(MAIN_SELECTORS)
+        paragraphs = []
+        owner = {}
+        blocks = {}
+
+        for element in root.iter():
+            tag = element.tag if isinstance(element.tag, str) else None
+            parent = element.getparent()
+            parent_block = owner.get(parent) if parent is not None else None
+
+            if tag is None:
+                # Processing instructions and the like: only their tail is content
+                if element.tail and parent_block is not None:
+                    blocks[parent_block].append(element.tail)
+                continue
+
+            # Main content candidates
+            if any(match is None for match in main_matches):
+                for rank in self._selector_ranks(element, tag):
+                    if main_matches[rank] is None:
+                        main_matches[rank] = element
+
+            if tag == 'title' and title is None:
+                title = (element.text_content() or '').strip()
+            elif tag == 'meta':
+                self._read_meta(element, metadata, published)
+            elif tag == 'p':
+                paragraphs.append(element)
+
+            # Text ownership for the div fallback
+            block = element if tag == 'div' else parent_block
+            owner[element] = block
+            if block is not None:
+                blocks.setdefault(block, [])
+                if element.text:
+                    blocks[block].append(element.text)
+            if element.tail and parent_block is not None:
+                blocks[parent_block].append(element.tail)
+
+        published_date = published.get('article:published_time', published.get('date'))
+        if published_date is not None:
+            metadata['published_date'] = published_date
+
+        content = self._main_content(main_matches, paragraphs, blocks)
+        return {'title': title or 'No title', 'content': content, 'metadata': metadata}
+
+    @staticmethod
+    def _selector_ranks(element, tag: str) -> List[int]:
+        """
+        Positions in MAIN_SELECTORS that the element matches
+        """
+        ranks = []
+        if tag == 'main':
+            ranks.append(0)
+        elif tag == 'article':
+            ranks.append(1)
+        if element.get('role') == 'main':
+            ranks.append(2)
+
+        classes = (element.get('class') or '').split()
+        if classes:
+            if 'content' in classes:
+                ranks.append(3)
+            if 'post-content' in classes:
+                ranks.append(5)
+            if 'entry-content' in classes:
+                ranks.append(6)
+            if 'article-content' in classes:
+                ranks.append(7)
+        if element.get('id') == 'content':
+            ranks.append(4)
+        return ranks
+
+    @staticmethod
+    def _read_meta(element, metadata: Dict[str, Any], published: Dict[str, str]):
+        name = (element.get('name') or '').lower()
+        content = element.get('content', '')
+        if name in ('description', 'keywords', 'author') and name not in metadata:
+            metadata[name] = content
+        elif name == 'date':
+            published.setdefault('date', content)
+        elif element.get('property') == 'article:published_time':
+            published.setdefault('article:published_time', content)
+
+    @staticmethod
+    def _main_content(main_matches, paragraphs, blocks) -> str:
+        # Strategy 1: the preferred main content container
+        for match in main_matches:
+            if match is not None:
+                return _clean_lines('\n'.join(match.itertext()))
+
+        # Strategy 2: substantial paragraphs
+        content_parts = []
+        for p in paragraphs:
+            text = ''.join(p.itertext()).strip()
+            if len(text) > MIN_PARAGRAPH_CHARS:
+                content_parts.append(text)
+
+        # Strategy 3: divs owning substantial text themselves
+        if not content_parts:
+            for pieces in blocks.values():
+                text = ''.join(pieces).strip()
+                if len(text) > MIN_BLOCK_CHARS and len(text.split()) > MIN_BLOCK_WORDS:
+                    content_parts.append(text)
+
+        return '\n\n'.join(content_parts)
+
+
+def create_extractor(backend: Optional[str] = None):
+    """
+    Build the configured (or given) extraction backend, falling back to
+    BeautifulSoup when lxml is not installed
+    """
+    backend = backend or get_config().SCRAPER_BACKEND
+    if backend not in EXTRACTION_BACKENDS:
+        raise ValueError(f"Unknown extraction backend: {backend}. Expected one of {EXTRACTION_BACKENDS}")
+
+    if backend == 'lxml':
+        try:
+            return LxmlExtractor()
+        except ImportError as e:
+            logger.warning(f"lxml backend unavailable ({str(e)}), falling back to bs4")
+    return BeautifulSoupExtractor()
@@ -0,0 +1,155 @@
+import re
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+from config import get_config
+
+logger = logging.getLogger(__name__)
+
+
+class CachedResponse:
+    """
+    A fetched page: raw HTML, its validators and the extracted result
+    """
+
+    def __init__(self, url: str, html: str, result: Dict[str, Any], expires_at: float,
+                 etag: Optional[str] = None, last_modified: Optional[str] = None):
+        self.url = url
+        self.html = html
+        self.result = result
+        self.expires_at = expires_at
+        self.etag = etag
+        self.last_modified = last_modified
+        self.size = len(html.encode('utf-8'))
+
+    @property
+    def is_fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+
+def parse_cache_control(header: Optional[str]) -> Dict[str, Optional[str]]:
+    """
+    Parse a Cache-Control header into a {directive: value or None} dict
+    """
+    directives = {}
+    for part in (header or '').split(','):
+        name, _, value = part.strip().partition('=')
+        if name:
+            directives[name.lower()] = value.strip('"') or None
+    return directives
+
+
+class ResponseCache:
+    """
+    In-memory LRU cache of fetched pages, bounded by entry count and total HTML size.
+
+    Freshness follows the response's Cache-Control header: no-store and private
+    responses are never cached (the cache is shared by every user of the
+    server), no-cache ones are kept only for revalidation, and
+    max-age/s-maxage (capped at the configured TTL) set the lifetime.
+    Stale entries are kept so they can be revalidated with a conditional request.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, max_bytes: Optional[int] = None,
+                 default_ttl: Optional[int] = None):
+        config = get_config()
+        self.max_entries = max_entries or config.SCRAPER_CACHE_MAX_ENTRIES
+        self.max_bytes = max_bytes or config.SCRAPER_CACHE_MAX_MB * 1024 * 1024
+        self.default_ttl = config.SCRAPER_CACHE_TTL if default_ttl is None else default_ttl
+
+        self._entries: 'OrderedDict[str, CachedResponse]' = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, url: str) -> Optional[CachedResponse]:
+        """
+        Get the cached entry for a URL, fresh or stale
+        """
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None:
+                self._entries.move_to_end(url)
+            return entry
+
+    def record(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def ttl_for(self, cache_control: Optional[str]) -> Optional[float]:
+        """
+        Lifetime in seconds for a response, or None when it must not be stored
+        """
+        directives = parse_cache_control(cache_control)
+        # This is a shared cache: private responses are as uncacheable as no-store ones
+        if 'no-store' in directives or 'private' in directives:
+            return None
+        if 'no-cache' in directives:
+            return 0.0
+
+        for name in ('s-maxage', 'max-age'):
+            value = directives.get(name)
+            if value and re.fullmatch(r'\d+', value):
+                return float(min(int(value), self.default_ttl))
+        return float(self.default_ttl)
+
+    def store(self, url: str, html: str, result: Dict[str, Any], cache_control: Optional[str] = None,
+              etag: Optional[str] = None, last_modified: Optional[str] = None) -> Optional[CachedResponse]:
+        """
+        Cache a fetched page unless its Cache-Control forbids it
+        """
+        ttl = self.ttl_for(cache_control)
+        if ttl is None:
+            self.remove(url)
+            return None
+
+        entry = CachedResponse(url, html, result, time.time() + ttl, etag, last_modified)
+        if entry.size > self.max_bytes:
+            return None
+
+        with self._lock:
+            self._remove_locked(url)
+            self._entries[url] = entry
+            self._total_bytes += entry.size
+            while len(self._entries) > self.max_entries or self._total_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._total_bytes -= evicted.size
+        return entry
+
+    def refresh(self, entry: CachedResponse, cache_control: Optional[str] = None) -> bool:
+        """
+        Extend an entry after a 304 revalidation. Returns False if it must no longer be stored.
+        """
+        ttl = self.ttl_for(cache_control)
+        if ttl is None:
+            self.remove(entry.url)
+            return False
+        entry.expires_at = time.time() + ttl
+        return True
+
+    def remove(self, url: str):
+        with self._lock:
+            self._remove_locked(url)
+
+    def _remove_locked(self, url: str):
+        entry = self._entries.pop(url, None)
+        if entry is not None:
+            self._total_bytes -= entry.size
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get cache size and hit statistics
+        """
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._total_bytes,
+                'hits': self.hits,
+                'misses': self.misses
+            }
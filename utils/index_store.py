@@ -0,0 +1,322 @@
+import os
+import re
+import json
+import time
+import pickle
+import shutil
+import hashlib
+import logging
+import tempfile
+import threading
+import unicodedata
+from typing import Dict, Any, Optional
+
+import faiss
+from langchain_community.vectorstores import FAISS
+from utils.bm25 import BM25Index
+from utils.vector_index import configure_search
+from config import get_config
+
+logger = logging.getLogger(__name__)
+
+# Bump when the on-disk layout or the chunking pipeline changes in a way
+# that makes previously persisted indexes incompatible
+STORE_FORMAT_VERSION = 2
+
+INDEX_FILE_NAME = 'index'
+META_FILE_NAME = 'meta.json'
+SUGGESTIONS_FILE_NAME = 'suggestions.json'
+ALIAS_DIR_NAME = 'sources'
+URL_STATE_DIR_NAME = 'urls'
+
+
+class IndexKeyHasher:
+    """
+    Computes an index key incrementally.
+
+    Segments are normalized independently and joined with single spaces, which
+    gives the same key as hashing the whitespace-joined full text at once.
+    """
+
+    def __init__(self, settings: Dict[str, Any]):
+        self._hasher = hashlib.sha256()
+        self._hasher.update(json.dumps(
+            {'format_version': STORE_FORMAT_VERSION, **settings},
+            sort_keys=True
+        ).encode('utf-8'))
+        self._hasher.update(b'\0')
+        self._started = False
+
+    def update(self, segment: str):
+        normalized = IndexStore.normalize_text(segment)
+        if not normalized:
+            return
+        if self._started:
+            self._hasher.update(b' ')
+        self._hasher.update(normalized.encode('utf-8'))
+        self._started = True
+
+    def hexdigest(self) -> str:
+        return self._hasher.hexdigest()[:32]
+
+
+class IndexStore:
+    """
+    Content-addressed on-disk store for FAISS indexes.
+
+    Each index lives in ``<VECTOR_STORE_PATH>/<key>/`` where the key is a hash
+    of the normalized document text plus the chunking and embedding settings,
+    so re-analyzing the same content loads the saved index instead of
+    re-embedding it.
+    """
+
+    def __init__(self, base_path: Optional[str] = None, use_mmap: Optional[bool] = None):
+        config = get_config()
+        self.base_path = base_path or config.VECTOR_STORE_PATH
+        self.use_mmap = config.VECTOR_STORE_MMAP if use_mmap is None else use_mmap
+        os.makedirs(self.base_path, exist_ok=True)
+
+    @staticmethod
+    def normalize_text(text: str) -> str:
+        """
+        Normalize text so insignificant whitespace/unicode differences hash the same
+        """
+        text = unicodedata.normalize('NFC', text or '')
+        return re.sub(r'\s+', ' ', text).strip()
+
+    def compute_key(self, text: str, settings: Dict[str, Any]) -> str:
+        """
+        Compute the content-addressed key for a document and its processing settings
+        """
+        hasher = self.key_hasher(settings)
+        hasher.update(text)
+        return hasher.hexdigest()
+
+    def key_hasher(self, settings: Dict[str, Any]) -> 'IndexKeyHasher':
+        """
+        Incremental variant of compute_key for text that arrives in segments
+        """
+        return IndexKeyHasher(settings)
+
+    def compute_source_key(self, data: bytes, settings: Dict[str, Any]) -> str:
+        """
+        Key for raw source bytes (e.g. an uploaded PDF), used to find the index
+        built from an identical upload without extracting the text again
+        """
+        hasher = hashlib.sha256()
+        hasher.update(json.dumps(
+            {'format_version': STORE_FORMAT_VERSION, 'source': True, **settings},
+            sort_keys=True
+        ).encode('utf-8'))
+        hasher.update(b'\0')
+        hasher.update(data)
+        return hasher.hexdigest()[:32]
+
+    def save_alias(self, source_key: str, key: str):
+        """
+        Record that the source with source_key produced the index key
+        """
+        alias_dir = os.path.join(self.base_path, ALIAS_DIR_NAME)
+        os.makedirs(alias_dir, exist_ok=True)
+        path = os.path.join(alias_dir, source_key)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(key)
+        os.replace(tmp_path, path)
+
+    def resolve_alias(self, source_key: str) -> Optional[str]:
+        """
+        Get the index key a source produced, if that index is still stored
+        """
+        if not re.fullmatch(r'[0-9a-f]{32}', source_key or ''):
+            return None
+        try:
+            with open(os.path.join(self.base_path, ALIAS_DIR_NAME, source_key), encoding='utf-8') as f:
+                key = f.read().strip()
+        except OSError:
+            return None
+        return key if self.exists(key) else None
+
+    def load_url_state(self, url: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the fetch state recorded for a URL (validators and index key),
+        if its index is still stored
+        """
+        try:
+            with open(self._url_state_path(url), encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return state if self.exists(state.get('index_key')) else None
+
+    def save_url_state(self, url: str, state: Dict[str, Any]):
+        """
+        Record the fetch state of a URL for conditional re-fetching
+        """
+        path = self._url_state_path(url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'url': url, 'updated_at': time.time(), **state}, f)
+        os.replace(tmp_path, path)
+
+    def _url_state_path(self, url: str) -> str:
+        name = hashlib.sha256(url.encode('utf-8')).hexdigest()[:32]
+        return os.path.join(self.base_path, URL_STATE_DIR_NAME, f'{name}.json')
+
+    def path_for(self, key: str) -> str:
+        """
+        Get the directory holding the index for a key
+        """
+        if not re.fullmatch(r'[0-9a-f]{32}', key or ''):
+            raise ValueError(f"Invalid index key: {key!r}")
+        return os.path.join(self.base_path, key)
+
+    def exists(self, key: str) -> bool:
+        """
+        Check whether a complete index is stored for a key
+        """
+        try:
+            path = self.path_for(key)
+        except ValueError:
+            return False
+        return (
+            os.path.isfile(os.path.join(path, f'{INDEX_FILE_NAME}.faiss')) and
+            os.path.isfile(os.path.join(path, f'{INDEX_FILE_NAME}.pkl'))
+        )
+
+    def load(self, key: str, embeddings, use_mmap: Optional[bool] = None) -> Optional[FAISS]:
+        """
+        Load a stored index, memory-mapping the FAISS data when enabled.
+        Pass use_mmap=False to get an index that can be modified.
+        Returns None when no index is stored for the key.
+        """
+        if not self.exists(key):
+            return None
+
+        path = self.path_for(key)
+        index_path = os.path.join(path, f'{INDEX_FILE_NAME}.faiss')
+
+        try:
+            index = None
+            mmap_flag = self._mmap_flag(index_path) if (self.use_mmap if use_mmap is None else use_mmap) else None
+            if mmap_flag is not None:
+                try:
+                    index = faiss.read_index(index_path, mmap_flag | faiss.IO_FLAG_READ_ONLY)
+                except RuntimeError as e:
+                    # Not every index type supports mmap; fall back to a regular read
+                    logger.warning(f"Could not mmap index {key}, reading into memory: {str(e)}")
+            mmapped = index is not None
+            if index is None:
+                index = faiss.read_index(index_path)
+            configure_search(index)
+
+            with open(os.path.join(path, f'{INDEX_FILE_NAME}.pkl'), 'rb') as f:
+                docstore, index_to_docstore_id = pickle.load(f)
+
+            logger.info(f"Loaded stored index {key} with {index.ntotal} vectors")
+            vectorstore = FAISS(
+                embedding_function=embeddings,
+                index=index,
+                docstore=docstore,
+                index_to_docstore_id=index_to_docstore_id
+            )
+            # Lets memory estimates leave out the vectors, which stay on disk
+            vectorstore.mmapped_index = index if mmapped else None
+            return vectorstore
+
+        except Exception as e:
+            logger.error(f"Error loading stored index {key}: {str(e)}")
+            return None
+
+    @staticmethod
+    def _mmap_flag(index_path: str) -> Optional[int]:
+        """
+        The read flag that memory-maps an index's vectors, or None when this
+        FAISS version can't map them.
+
+        IO_FLAG_MMAP only maps the inverted lists of IVF indexes; flat codes
+        (the flat index and HNSW storage) need IO_FLAG_MMAP_IFC. The two can't
+        be combined, so the type is taken from the file's fourcc (IVF ones
+        start with "Iw").
+        """
+        with open(index_path, 'rb') as f:
+            fourcc = f.read(4)
+        if fourcc.startswith(b'Iw'):
+            return faiss.IO_FLAG_MMAP
+        return getattr(faiss, 'IO_FLAG_MMAP_IFC', None)
+
+    def save(self, key: str, vectorstore: FAISS, meta: Optional[Dict[str, Any]] = None,
+             bm25: Optional[BM25Index] = None) -> str:
+        """
+        Persist an index (and its keyword index, when given) atomically:
+        write to a temp directory, then rename into place
+        """
+        path = self.path_for(key)
+        tmp_path = tempfile.mkdtemp(prefix=f'.{key}-', dir=self.base_path)
+
+        try:
+            vectorstore.save_local(tmp_path, index_name=INDEX_FILE_NAME)
+            if bm25 is not None:
+                bm25.save(tmp_path)
+
+            with open(os.path.join(tmp_path, META_FILE_NAME), 'w', encoding='utf-8') as f:
+                json.dump({
+                    'key': key,
+                    'created_at': time.time(),
+                    'vector_count': vectorstore.index.ntotal,
+                    **(meta or {})
+                }, f, default=str)
+
+            try:
+                os.rename(tmp_path, path)
+            except OSError:
+                # Another request stored the same content first; keep theirs
+                shutil.rmtree(tmp_path, ignore_errors=True)
+                if not self.exists(key):
+                    raise
+
+            logger.info(f"Stored index {key} at {path}")
+            return path
+
+        except Exception:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            raise
+
+    def load_bm25(self, key: str) -> Optional[BM25Index]:
+        """
+        Load the keyword index stored alongside an index, if any
+        """
+        if not self.exists(key):
+            return None
+        return BM25Index.load(self.path_for(key))
+
+    def load_meta(self, key: str) -> Dict[str, Any]:
+        """
+        Load the metadata saved alongside an index
+        """
+        try:
+            with open(os.path.join(self.path_for(key), META_FILE_NAME), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def load_suggestions(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Load the suggested questions (and pre-generated answers) stored with an index
+        """
+        try:
+            with open(os.path.join(self.path_for(key), SUGGESTIONS_FILE_NAME), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def save_suggestions(self, key: str, suggestions: Dict[str, Any]):
+        """
+        Store suggested questions and their answers alongside an index
+        """
+        path = os.path.join(self.path_for(key), SUGGESTIONS_FILE_NAME)
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'updated_at': time.time(), **suggestions}, f, default=str)
+        os.replace(tmp_path, path)
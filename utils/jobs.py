@@ -0,0 +1,208 @@
+import os
+import json
+import time
+import uuid
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, Callable
+from config import get_config
+
+logger = logging.getLogger(__name__)
+
+# Analysis stages and their share of overall progress (percent)
+STAGE_WEIGHTS = {
+    'extract': 15,
+    'chunk': 5,
+    'embed': 45,
+    'index': 10,
+    'summarize': 25,
+}
+STAGES = list(STAGE_WEIGHTS)
+
+
+class JobQueueFullError(Exception):
+    """
+    Raised when the job queue has no room for another job
+    """
+
+
+class Job:
+    """
+    A background analysis job and its progress
+    """
+
+    def __init__(self, job_id: Optional[str] = None):
+        self.job_id = job_id or uuid.uuid4().hex
+        self.status = 'queued'
+        self.stage = None
+        self.stage_progress = 0.0
+        self.percent = 0
+        self.message = 'Waiting for a free worker'
+        self.document_id = None
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+        self._manager = None
+
+    def update(self, stage: Optional[str] = None, fraction: float = 0.0, message: Optional[str] = None):
+        """
+        Report progress: the current stage and how far along it is (0.0-1.0)
+        """
+        if stage is not None:
+            self.stage = stage
+        self.stage_progress = max(0.0, min(1.0, fraction))
+        if message is not None:
+            self.message = message
+
+        completed = 0
+        for name in STAGES:
+            if name == self.stage:
+                break
+            completed += STAGE_WEIGHTS[name]
+        current = STAGE_WEIGHTS.get(self.stage, 0) * self.stage_progress
+        self.percent = min(100, int(completed + current))
+        self._touch()
+
+    def set_document(self, document_id: str):
+        """
+        Mark the document's index as ready so questions can be asked before the job finishes
+        """
+        self.document_id = document_id
+        self._touch()
+
+    def complete(self, result: Dict[str, Any]):
+        self.status = 'completed'
+        self.result = result
+        self.stage_progress = 1.0
+        self.percent = 100
+        self.message = 'Analysis complete'
+        self._touch()
+
+    def fail(self, error: str):
+        self.status = 'failed'
+        self.error = error
+        self.message = 'Analysis failed'
+        self._touch()
+
+    def _touch(self):
+        self.updated_at = time.time()
+        if self._manager is not None:
+            self._manager.persist(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'job_id': self.job_id,
+            'status': self.status,
+            'stage': self.stage,
+            'stages': STAGES,
+            'percent': self.percent,
+            'message': self.message,
+            'document_id': self.document_id,
+            'ready_for_questions': self.document_id is not None,
+            'result': self.result,
+            'error': self.error,
+            'created_at': self.created_at,
+            'updated_at': self.updated_at
+        }
+
+
+class JobManager:
+    """
+    Runs analysis jobs on a bounded worker pool.
+
+    Job state is mirrored to JSON files under JOB_STATE_PATH so any worker
+    process can answer status polls, not only the one running the job.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, max_pending: Optional[int] = None,
+                 state_path: Optional[str] = None):
+        config = get_config()
+        self.max_workers = max_workers or config.ANALYZE_WORKERS
+        self.max_pending = max_pending or config.ANALYZE_MAX_PENDING_JOBS
+        self.job_ttl = config.JOB_TTL_SECONDS
+        self.state_path = state_path or config.JOB_STATE_PATH
+        os.makedirs(self.state_path, exist_ok=True)
+
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='analyze')
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, fn: Callable[..., Dict[str, Any]], *args, **kwargs) -> Job:
+        """
+        Queue fn(job, *args, **kwargs); its return value becomes the job result
+        """
+        with self._lock:
+            self._expire_locked()
+            active = sum(1 for job in self._jobs.values() if job.status in ('queued', 'running'))
+            if active >= self.max_pending:
+                raise JobQueueFullError('Too many documents are being analyzed. Please try again shortly.')
+
+            job = Job()
+            job._manager = self
+            self._jobs[job.job_id] = job
+
+        self.persist(job)
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a job's state, from memory or from another worker's state file
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None:
+            return job.to_dict()
+
+        path = self._state_file(job_id)
+        if not path or not os.path.isfile(path):
+            return None
+        try:
+            with open(path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def persist(self, job: Job):
+        """
+        Write the job state file atomically
+        """
+        path = self._state_file(job.job_id)
+        tmp_path = f'{path}.{threading.get_ident()}.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(job.to_dict(), f, default=str)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Failed to persist job {job.job_id}: {str(e)}")
+
+    def _run(self, job: Job, fn, args, kwargs):
+        job.status = 'running'
+        job.message = 'Starting analysis'
+        job._touch()
+        try:
+            job.complete(fn(job, *args, **kwargs))
+            logger.info(f"Job {job.job_id} completed")
+        except Exception as e:
+            logger.error(f"Job {job.job_id} failed: {str(e)}")
+            job.fail(str(e))
+
+    def _state_file(self, job_id: str) -> Optional[str]:
+        if not job_id or not job_id.isalnum():
+            return None
+        return os.path.join(self.state_path, f'{job_id}.json')
+
+    def _expire_locked(self):
+        """
+        Forget finished jobs older than JOB_TTL_SECONDS
+        """
+        cutoff = time.time() - self.job_ttl
+        for job_id, job in list(self._jobs.items()):
+            if job.status in ('completed', 'failed') and job.updated_at < cutoff:
+                del self._jobs[job_id]
+                try:
+                    os.remove(self._state_file(job_id))
+                except OSError:
+                    pass
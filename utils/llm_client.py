@@ -0,0 +1,298 @@
+import re
+import json
+import time
+import random
+import logging
+import threading
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from typing import Optional, List, Dict, Any, Iterator, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from config import get_config
+
+logger = logging.getLogger(__name__)
+
+# Status codes worth retrying: rate limits and transient server errors
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class GroqClient:
+    """
+    Transport layer for the Groq chat completions API.
+
+    Holds one pooled keep-alive session and applies a single retry/backoff
+    policy. When the API rate-limits a request, every caller sharing the
+    client pauses until the reported retry time.
+    """
+
+    def __init__(self, api_key: Optional[str] = None, api_url: Optional[str] = None,
+                 model: Optional[str] = None, pool_size: Optional[int] = None):
+        config = get_config()
+        self.api_key = api_key or config.GROQ_API_KEY
+        self.api_url = api_url or config.GROQ_API_URL
+        self.model = model or config.GROQ_MODEL
+        self.timeout = (config.LLM_CONNECT_TIMEOUT, config.LLM_READ_TIMEOUT)
+        self.max_retries = config.LLM_MAX_RETRIES
+        self.retry_backoff = config.LLM_RETRY_BACKOFF
+
+        pool_size = pool_size or config.LLM_POOL_SIZE
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self._rate_limit_lock = threading.Lock()
+        self._rate_limited_until = 0.0
+        self.rate_limit_count = 0  # 429 responses seen so far
+
+    def chat(self, messages: List[Dict[str, str]], max_tokens: int = 500, temperature: float = 0.7,
+             model: Optional[str] = None, stop: Optional[List[str]] = None,
+             max_retries: Optional[int] = None, **extra) -> str:
+        """
+        Run a chat completion and return the generated message content
+        """
+        payload = self._build_payload(messages, max_tokens, temperature, model, stop, **extra)
+        response = self._post(payload, max_retries=max_retries)
+
+        try:
+            data = response.json()
+        except ValueError as e:
+            raise RuntimeError(f"Invalid JSON response from Groq API: {str(e)}")
+
+        if not data.get('choices'):
+            logger.error(f"LLM API response missing 'choices': {data}")
+            raise RuntimeError("No response generated from Groq API")
+
+        return data['choices'][0]['message']['content']
+
+    def stream_chat(self, messages: List[Dict[str, str]], max_tokens: int = 500, temperature: float = 0.7,
+                    model: Optional[str] = None, stop: Optional[List[str]] = None, **extra) -> Iterator[str]:
+        """
+        Run a streaming chat completion, yielding content deltas as they arrive
+        """
+        payload = self._build_payload(messages, max_tokens, temperature, model, stop, stream=True, **extra)
+        response = self._post(payload, stream=True)
+        # text/event-stream responses often carry no charset; the API sends UTF-8
+        response.encoding = response.encoding or 'utf-8'
+
+        try:
+            for line in response.iter_lines(decode_unicode=True):
+                # Server-sent events: "data: {...}" lines, terminated by "data: [DONE]"
+                if not line or not line.startswith('data:'):
+                    continue
+                data = line[len('data:'):].strip()
+                if data == '[DONE]':
+                    break
+                try:
+                    chunk = json.loads(data)
+                except ValueError:
+                    logger.warning(f"Skipping malformed stream chunk: {data[:200]}")
+                    continue
+                for choice in chunk.get('choices', []):
+                    content = choice.get('delta', {}).get('content')
+                    if content:
+                        yield content
+        finally:
+            response.close()
+
+    def _build_payload(self, messages, max_tokens, temperature, model=None, stop=None, **extra) -> Dict[str, Any]:
+        payload = {
+            'model': model or self.model,
+            'messages': messages,
+            'max_tokens': max_tokens,
+            'temperature': temperature,
+            **extra
+        }
+        if stop:
+            payload['stop'] = stop
+        return payload
+
+    def _post(self, payload: Dict[str, Any], stream: bool = False,
+              max_retries: Optional[int] = None) -> requests.Response:
+        """
+        POST to the completions endpoint, retrying rate limits, transient
+        server errors and network failures with backoff
+        """
+        max_retries = max_retries or self.max_retries
+        headers = {
+            'Authorization': f'Bearer {self.api_key}',
+            'Content-Type': 'application/json',
+        }
+
+        for attempt in range(1, max_retries + 1):
+            self._wait_for_rate_limit()
+            try:
+                response = self.session.post(
+                    self.api_url,
+                    headers=headers,
+                    json=payload,
+                    timeout=self.timeout,
+                    stream=stream
+                )
+            except requests.exceptions.RequestException as e:
+                logger.error(f"Network error calling Groq API (attempt {attempt}/{max_retries}): {str(e)}")
+                if attempt == max_retries:
+                    raise RuntimeError(f"Network error calling Groq API: {str(e)}")
+                time.sleep(self._backoff(attempt))
+                continue
+
+            if response.status_code == 200:
+                return response
+
+            error_text = response.text
+            response.close()
+
+            if response.status_code not in RETRYABLE_STATUS_CODES or attempt == max_retries:
+                logger.error(f"Groq API error ({response.status_code}): {error_text}")
+                raise RuntimeError(f"Groq API error ({response.status_code}): {error_text}")
+
+            wait_time = self._retry_after(response, error_text)
+            if wait_time is None:
+                wait_time = self._backoff(attempt)
+
+            if response.status_code == 429:
+                logger.warning(f"Rate limit hit, pausing LLM calls for {wait_time:.2f} seconds...")
+                self._pause_for_rate_limit(wait_time)
+            else:
+                logger.warning(
+                    f"Groq API error ({response.status_code}), retrying in {wait_time:.2f} seconds "
+                    f"(attempt {attempt}/{max_retries})"
+                )
+                time.sleep(wait_time)
+
+        raise RuntimeError(f"Groq API call failed after {max_retries} retries")
+
+    def _backoff(self, attempt: int) -> float:
+        """
+        Exponential backoff with jitter
+        """
+        return self.retry_backoff * (2 ** (attempt - 1)) * (0.5 + random.random() / 2)
+
+    @staticmethod
+    def _retry_after(response: requests.Response, error_text: str = '') -> Optional[float]:
+        """
+        Work out how long the API asked us to wait, from the retry-after header
+        or from Groq's "Please try again in Xs" error message
+        """
+        header = response.headers.get('retry-after')
+        if header:
+            try:
+                return max(0.0, float(header)) + 0.1
+            except ValueError:
+                try:
+                    return max(0.0, parsedate_to_datetime(header).timestamp() - time.time()) + 0.1
+                except (TypeError, ValueError):
+                    pass
+
+        wait_match = re.search(r"Please try again in ([\d\.]+)(ms|s)", error_text or '')
+        if wait_match:
+            wait_time = float(wait_match.group(1))
+            if wait_match.group(2) == 'ms':
+                wait_time = wait_time / 1000.0
+            return wait_time + 0.1  # Add a small buffer
+
+        return None
+
+    def _wait_for_rate_limit(self):
+        """
+        Block while a rate-limit pause reported by the API is in effect
+        """
+        with self._rate_limit_lock:
+            wait_time = self._rate_limited_until - time.time()
+        if wait_time > 0:
+            time.sleep(wait_time)
+
+    def _pause_for_rate_limit(self, wait_time: float):
+        """
+        Pause all calls sharing this client for wait_time seconds
+        """
+        with self._rate_limit_lock:
+            self._rate_limited_until = max(self._rate_limited_until, time.time() + wait_time)
+            self.rate_limit_count += 1
+
+
+class AdaptiveLimiter:
+    """
+    Concurrency limit for LLM calls that adapts to the API's rate limits.
+
+    Works like a semaphore whose size follows additive-increase /
+    multiplicative-decrease: when the shared client has hit a rate limit
+    since the last adjustment the limit is halved (once, however many calls
+    saw it), and every call that completes otherwise grows it by 1/limit, so
+    it creeps back up to max_concurrency at about one slot per round of calls.
+    """
+
+    def __init__(self, client: GroqClient, max_concurrency: int):
+        self.client = client
+        self.max_concurrency = max(1, max_concurrency)
+        self._limit = float(self.max_concurrency)
+        self._active = 0
+        self._rate_limits_seen = client.rate_limit_count
+        self._condition = threading.Condition()
+
+    @property
+    def limit(self) -> int:
+        return max(1, int(self._limit))
+
+    @contextmanager
+    def slot(self):
+        """
+        Hold one slot for the duration of an LLM call
+        """
+        with self._condition:
+            while self._active >= self.limit:
+                self._condition.wait()
+            self._active += 1
+
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._active -= 1
+                rate_limits = self.client.rate_limit_count
+                if rate_limits != self._rate_limits_seen:
+                    self._rate_limits_seen = rate_limits
+                    self._limit = max(1.0, self._limit / 2)
+                    logger.warning(f"Rate limited; lowering LLM concurrency to {self.limit}")
+                else:
+                    self._limit = min(float(self.max_concurrency), self._limit + 1.0 / self._limit)
+                self._condition.notify_all()
+
+
+_clients: Dict[Tuple[str, str], GroqClient] = {}
+_client_lock = threading.Lock()
+
+
+def get_llm_client(api_key: Optional[str] = None, api_url: Optional[str] = None) -> GroqClient:
+    """
+    Get the process-wide shared Groq client for an API key and endpoint
+    (the configured ones by default). Callers with the same key and
+    endpoint share one pooled session and its rate-limit state.
+    """
+    config = get_config()
+    key = (api_key or config.GROQ_API_KEY, api_url or config.GROQ_API_URL)
+    client = _clients.get(key)
+    if client is None:
+        with _client_lock:
+            client = _clients.get(key)
+            if client is None:
+                client = _clients[key] = GroqClient(*key)
+    return client
+
+
+_limiter = None
+
+
+def get_llm_limiter() -> AdaptiveLimiter:
+    """
+    Get the process-wide concurrency limiter for batched LLM calls
+    """
+    global _limiter
+    if _limiter is None:
+        client = get_llm_client()
+        with _client_lock:
+            if _limiter is None:
+                _limiter = AdaptiveLimiter(client, get_config().LLM_BATCH_CONCURRENCY)
+    return _limiter
@@ -1,11 +1,108 @@
-import io
+import os
+import re
+import time
+import shutil
 import logging
-from typing import Dict, Any, Optional
+import tempfile
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Any, Optional, List, Tuple, Iterator
 from PyPDF2 import PdfReader
 import magic
+from config import get_config
 
 logger = logging.getLogger(__name__)
 
+_extract_pool = None
+_extract_pool_lock = threading.Lock()
+
+# Worker-process state: the PDF last parsed, as (path, reader)
+_worker_reader = None
+
+
+def _get_extract_pool(max_workers: int) -> ProcessPoolExecutor:
+    """
+    Get the shared process pool used for parallel page extraction.
+
+    Workers are started from a fork server (spawned where that is not
+    available) rather than forked from this process, so they don't inherit
+    the embedding model and loaded indexes, nor locks held by other threads.
+    """
+    global _extract_pool
+    with _extract_pool_lock:
+        if _extract_pool is None:
+            method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+            _extract_pool = ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=multiprocessing.get_context(method)
+            )
+        return _extract_pool
+
+
+def _reset_extract_pool(pool: ProcessPoolExecutor):
+    """
+    Drop a broken pool (e.g. a worker was killed) so the next extraction starts a new one
+    """
+    global _extract_pool
+    with _extract_pool_lock:
+        if _extract_pool is pool:
+            _extract_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def clean_text(text: str) -> str:
+    """
+    Clean and normalize extracted text
+    """
+    if not text:
+        return ""
+
+    # Remove excessive whitespace
+    lines = [line.strip() for line in text.split('\n')]
+
+    # Remove empty lines
+    lines = [line for line in lines if line]
+
+    # Join lines with single newlines
+    cleaned = '\n'.join(lines)
+
+    # Remove excessive spaces
+    cleaned = re.sub(r' +', ' ', cleaned)
+
+    return cleaned.strip()
+
+
+def _extract_pages(pdf_reader: PdfReader, start: int, end: int) -> List[Tuple[int, str, float]]:
+    """
+    Extract and clean pages [start, end) (0-based), returning
+    (page_number, text, seconds) tuples with 1-based page numbers
+    """
+    pages = []
+    for index in range(start, end):
+        page_num = index + 1
+        started = time.perf_counter()
+        try:
+            cleaned_text = clean_text(pdf_reader.pages[index].extract_text())
+        except Exception as e:
+            logger.warning(f"Error extracting text from page {page_num}: {str(e)}")
+            cleaned_text = ""
+        pages.append((page_num, cleaned_text, time.perf_counter() - started))
+    return pages
+
+
+def _extract_page_range(pdf_path: str, start: int, end: int) -> List[Tuple[int, str, float]]:
+    """
+    Process-pool worker: extract one page range of the PDF at pdf_path.
+    The file is read and parsed once per worker, not once per range.
+    """
+    global _worker_reader
+    if _worker_reader is None or _worker_reader[0] != pdf_path:
+        _worker_reader = (pdf_path, PdfReader(pdf_path))
+    return _extract_pages(_worker_reader[1], start, end)
+
 
 class PDFProcessor:
     """
@@ -13,7 +110,10 @@ class PDFProcessor:
     """
 
     def __init__(self):
+        config = get_config()
         self.max_file_size = 16 * 1024 * 1024  # 16MB
+        self.parallel_min_pages = config.PDF_PARALLEL_MIN_PAGES
+        self.extract_workers = config.PDF_EXTRACT_WORKERS or os.cpu_count() or 1
         self.allowed_mime_types = [
             'application/pdf',
             'application/x-pdf',
@@ -59,32 +159,8 @@ class PDFProcessor:
         Enhanced PDF reading with metadata extraction
         """
         try:
-            # Validate the PDF file
-            self.validate_pdf_file(file_obj)
-
-            # Create PDF reader
-            pdf_reader = PdfReader(file_obj)
-
-            # Extract metadata
-            metadata = self._extract_pdf_metadata(pdf_reader)
-
-            # Extract text from all pages
-            text_content = []
-            page_count = len(pdf_reader.pages)
-
-            logger.info(f"Processing PDF with {page_count} pages")
-
-            for page_num, page in enumerate(pdf_reader.pages, 1):
-                try:
-                    page_text = page.extract_text()
-                    if page_text and page_text.strip():
-                        # Clean up the text
-                        cleaned_text = self._clean_text(page_text)
-                        if cleaned_text:
-                            text_content.append(f"[Page {page_num}]\n{cleaned_text}")
-                except Exception as e:
-                    logger.warning(f"Error extracting text from page {page_num}: {str(e)}")
-                    continue
+            stream = self.iter_pdf_pages(file_obj)
+            text_content = [page_text for _, page_text in stream['pages']]
 
             if not text_content:
                 raise ValueError("No readable text found in the PDF file")
@@ -93,10 +169,13 @@ class PDFProcessor:
 
             result = {
                 'content': full_text,
-                'metadata': metadata,
-                'page_count': page_count,
+                'metadata': stream['metadata'],
+                'page_count': stream['page_count'],
                 'word_count': len(full_text.split()),
-                'char_count': len(full_text)
+                'char_count': len(full_text),
+                'extraction_mode': stream['extraction_mode'],
+                'extraction_ms': stream['extraction_ms'],
+                'page_timings': stream['page_timings']
             }
 
             logger.info(f"Successfully extracted {result['char_count']} characters from PDF")
@@ -106,6 +185,115 @@ class PDFProcessor:
             logger.error(f"Error reading PDF: {str(e)}")
             raise Exception(f"Failed to process PDF file: {str(e)}")
 
+    def iter_pdf_pages(self, file_obj) -> Dict[str, Any]:
+        """
+        Validate a PDF and return its metadata plus a lazy page stream.
+
+        result['pages'] yields (page_number, "[Page N]\n<text>") for every
+        page with text, in page order, as pages are extracted. Large PDFs are
+        extracted on the process pool with only a few page ranges in flight,
+        so pages can be consumed (chunked and embedded) while later ones are
+        still being extracted. extraction_ms and page_timings are filled in
+        as the stream is consumed.
+        """
+        # Validate the PDF file
+        self.validate_pdf_file(file_obj)
+
+        # Create PDF reader
+        pdf_reader = PdfReader(file_obj)
+
+        # Extract metadata
+        metadata = self._extract_pdf_metadata(pdf_reader)
+        page_count = len(pdf_reader.pages)
+
+        logger.info(f"Processing PDF with {page_count} pages")
+
+        if page_count >= self.parallel_min_pages and self.extract_workers > 1:
+            file_obj.seek(0)
+            batches = self._extract_parallel(file_obj, page_count)
+            extraction_mode = 'parallel'
+        else:
+            batches = (_extract_pages(pdf_reader, index, index + 1) for index in range(page_count))
+            extraction_mode = 'serial'
+
+        result = {
+            'metadata': metadata,
+            'page_count': page_count,
+            'extraction_mode': extraction_mode,
+            'extraction_ms': 0.0,
+            'page_timings': []
+        }
+
+        def generate_pages():
+            started = time.perf_counter()
+            for batch in batches:
+                for page_num, page_text, seconds in batch:
+                    result['page_timings'].append({'page': page_num, 'ms': round(seconds * 1000, 1)})
+                    if page_text:
+                        yield page_num, f"[Page {page_num}]\n{page_text}"
+                result['extraction_ms'] = round((time.perf_counter() - started) * 1000, 1)
+
+            logger.info(
+                f"Extracted {page_count} pages in {result['extraction_ms'] / 1000:.2f}s ({extraction_mode}); "
+                f"slowest page took {max((t['ms'] for t in result['page_timings']), default=0):.0f}ms"
+            )
+
+        result['pages'] = generate_pages()
+        return result
+
+    def _extract_parallel(self, file_obj, page_count: int) -> Iterator[List[Tuple[int, str, float]]]:
+        """
+        Split pages into contiguous ranges, extract them in worker processes
+        and yield them in page order, keeping at most two ranges per worker in flight.
+
+        The PDF is copied to a temporary file once and workers read it from
+        there, instead of every range shipping the whole file through the
+        pool. If the pool breaks (a worker died), the remaining pages are
+        extracted serially.
+        """
+        # A few ranges per worker evens out pages that are slow to extract
+        range_count = min(page_count, self.extract_workers * 4)
+        range_size = -(-page_count // range_count)
+        ranges = [(start, min(start + range_size, page_count)) for start in range(0, page_count, range_size)]
+
+        with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as tmp:
+            shutil.copyfileobj(file_obj, tmp)
+            pdf_path = tmp.name
+
+        pool = _get_extract_pool(self.extract_workers)
+        max_in_flight = self.extract_workers * 2
+        futures = deque()
+        next_page = 0  # First page (0-based) not yet yielded
+        try:
+            try:
+                for start, end in ranges:
+                    futures.append((end, pool.submit(_extract_page_range, pdf_path, start, end)))
+                    if len(futures) >= max_in_flight:
+                        end, future = futures.popleft()
+                        batch = future.result()
+                        next_page = end
+                        yield batch
+                while futures:
+                    end, future = futures.popleft()
+                    batch = future.result()
+                    next_page = end
+                    yield batch
+            except BrokenProcessPool:
+                logger.warning(f"PDF extraction pool broke; extracting pages {next_page + 1}-{page_count} serially")
+                _reset_extract_pool(pool)
+                futures.clear()
+                pdf_reader = PdfReader(pdf_path)
+                for index in range(next_page, page_count):
+                    yield _extract_pages(pdf_reader, index, index + 1)
+        finally:
+            # The consumer stopped early (e.g. embedding failed); drop queued ranges
+            for _, future in futures:
+                future.cancel()
+            try:
+                os.remove(pdf_path)
+            except OSError:
+                pass
+
     def _extract_pdf_metadata(self, pdf_reader: PdfReader) -> Dict[str, Any]:
         """
         Extract metadata from PDF
@@ -145,23 +333,7 @@ class PDFProcessor:
         """
         Clean and normalize extracted text
         """
-        if not text:
-            return ""
-
-        # Remove excessive whitespace
-        lines = [line.strip() for line in text.split('\n')]
-
-        # Remove empty lines
-        lines = [line for line in lines if line]
-
-        # Join lines with single newlines
-        cleaned = '\n'.join(lines)
-
-        # Remove excessive spaces
-        import re
-        cleaned = re.sub(r' +', ' ', cleaned)
-
-        return cleaned.strip()
+        return clean_text(text)
 
     def get_pdf_info(self, file_obj) -> Dict[str, Any]:
         """
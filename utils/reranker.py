@@ -0,0 +1,136 @@
+import math
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import List, Tuple, Optional, Any
+
+from config import get_config
+
+logger = logging.getLogger(__name__)
+
+_model = None
+_load_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+_slots: Optional[threading.BoundedSemaphore] = None
+_executor_lock = threading.Lock()
+
+
+def get_reranker():
+    """
+    Get the process-wide cross-encoder, loading it on first use
+    """
+    global _model
+    if _model is not None:
+        return _model
+
+    with _load_lock:
+        if _model is None:
+            # Imported here so the model code is only loaded when reranking is enabled
+            from sentence_transformers import CrossEncoder
+
+            config = get_config()
+            started = time.perf_counter()
+            logger.info(f"Loading reranking model: {config.RERANK_MODEL}")
+            _model = CrossEncoder(config.RERANK_MODEL, device='cpu', max_length=config.RERANK_MAX_LENGTH)
+            logger.info(f"Reranking model loaded in {time.perf_counter() - started:.1f}s")
+
+    return _model
+
+
+def _get_executor() -> Tuple[ThreadPoolExecutor, threading.BoundedSemaphore]:
+    """
+    Worker threads scoring candidates, plus the slots bounding how many
+    scoring passes (including ones that outlived their budget) may run
+    """
+    global _executor, _slots
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                workers = max(1, get_config().RERANK_MAX_CONCURRENCY)
+                _slots = threading.BoundedSemaphore(workers)
+                _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='rerank')
+    return _executor, _slots
+
+
+def _score(question: str, texts: List[str], slots: threading.BoundedSemaphore) -> List[float]:
+    try:
+        # All candidates in a single forward pass
+        scores = get_reranker().predict(
+            [(question, text) for text in texts],
+            batch_size=len(texts),
+            show_progress_bar=False
+        )
+        # ms-marco cross-encoders output logits; map them to 0-1 relevance
+        return [1.0 / (1.0 + math.exp(-float(score))) for score in scores]
+    finally:
+        slots.release()
+
+
+def rerank(question: str, scored_docs: List[Tuple[Any, float]], top_n: int,
+           timeout_ms: Optional[int] = None) -> Tuple[List[Tuple[Any, float]], bool]:
+    """
+    Rescore retrieved (Document, score) candidates with the cross-encoder in
+    one batched forward pass and keep the top_n, best first.
+
+    Scoring runs in a worker thread under a time budget (RERANK_TIMEOUT_MS by
+    default). When the budget is exceeded, every worker is busy or the model
+    fails, the first top_n candidates are returned in their retrieval order.
+    Returns the chunks and whether they were reranked.
+    """
+    if len(scored_docs) <= 1:
+        return scored_docs[:top_n], False
+
+    timeout_ms = get_config().RERANK_TIMEOUT_MS if timeout_ms is None else timeout_ms
+    executor, slots = _get_executor()
+    if not slots.acquire(blocking=False):
+        # Earlier passes are still running; queueing behind them would only blow the budget
+        logger.warning("Reranker busy, keeping retrieval order")
+        return scored_docs[:top_n], False
+
+    started = time.perf_counter()
+    texts = [doc.page_content for doc, _ in scored_docs]
+    try:
+        future = executor.submit(_score, question, texts, slots)
+    except RuntimeError:
+        slots.release()
+        raise
+
+    try:
+        scores = future.result(timeout=timeout_ms / 1000.0)
+    except FutureTimeoutError:
+        # The pass keeps its slot until it finishes
+        logger.warning(f"Reranking {len(texts)} chunks exceeded {timeout_ms}ms, keeping retrieval order")
+        return scored_docs[:top_n], False
+    except Exception as e:
+        logger.error(f"Error reranking chunks: {str(e)}")
+        return scored_docs[:top_n], False
+
+    order = sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)[:top_n]
+    logger.info(f"Reranked {len(texts)} chunks in {(time.perf_counter() - started) * 1000:.0f}ms")
+    return [(scored_docs[i][0], scores[i]) for i in order], True
+
+
+def warm_up_reranker(background: bool = True):
+    """
+    Load the cross-encoder ahead of the first questions so they don't spend
+    their time budget loading it.
+
+    In the foreground this is meant for a preforking server's master process,
+    before the embedding warm-up freezes the shared objects: a worker forked
+    while a background load holds the model lock would never get the model.
+    """
+    if background:
+        thread = threading.Thread(target=_warm_up_quietly, name='rerank-warmup', daemon=True)
+        thread.start()
+        return thread
+
+    _warm_up_quietly()
+    return None
+
+
+def _warm_up_quietly():
+    try:
+        get_reranker()
+    except Exception as e:
+        logger.error(f"Error loading reranking model: {str(e)}")
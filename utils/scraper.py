@@ -1,12 +1,26 @@
-import requests
+import os
+import re
+import codecs
 import logging
-from bs4 import BeautifulSoup
+import tempfile
+import requests
+from requests.adapters import HTTPAdapter
 from typing import Optional, Dict, Any
 from urllib.parse import urlparse, urljoin
+from utils.http_cache import ResponseCache, CachedResponse
+from utils.html_extract import create_extractor
 from config import get_config
 
 logger = logging.getLogger(__name__)
 
+HTML_CONTENT_TYPES = ('text/html', 'application/xhtml+xml', 'application/xml', 'text/xml')
+PDF_CONTENT_TYPES = ('application/pdf', 'application/x-pdf')
+
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+SPOOL_MAX_MEMORY = 4 * 1024 * 1024  # Downloaded PDFs larger than this are spooled to disk
+ENCODING_SNIFF_BYTES = 2048
+META_CHARSET_RE = re.compile(rb'<meta[^>]+charset=["\']?([A-Za-z0-9_.:-]+)', re.IGNORECASE)
+
 
 class WebScraper:
     """
@@ -17,6 +31,16 @@ class WebScraper:
         config = get_config()
         self.timeout = config.REQUEST_TIMEOUT
         self.max_url_length = config.MAX_URL_LENGTH
+        self.max_bytes = config.SCRAPER_MAX_BYTES
+
+        # Pooled keep-alive session shared by all scrapes
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=config.SCRAPER_POOL_SIZE, pool_maxsize=config.SCRAPER_POOL_SIZE)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self.cache = ResponseCache() if config.SCRAPER_CACHE_ENABLED else None
+        self.extractor = create_extractor()
 
         # Common headers to avoid blocking
         self.headers = {
@@ -40,9 +64,15 @@ class WebScraper:
         except Exception:
             return False
 
-    def scrape_url_content(self, url: str) -> Dict[str, Any]:
+    def scrape_url_content(self, url: str, etag: Optional[str] = None,
+                           last_modified: Optional[str] = None) -> Dict[str, Any]:
         """
-        Enhanced URL scraping with better content extraction
+        Enhanced URL scraping with better content extraction.
+
+        Fresh pages are served from the response cache without downloading or
+        parsing; stale cached pages are revalidated with a conditional request.
+        When validators from a previous fetch are given and the page has not
+        changed since, {'url': url, 'not_modified': True} is returned.
         """
         if not self.validate_url(url):
             raise ValueError("Invalid URL provided")
@@ -50,45 +80,82 @@ class WebScraper:
         try:
             logger.info(f"Scraping content from: {url}")
 
-            # Make the request
-            response = requests.get(
+            entry = self.cache.get(url) if self.cache else None
+            if entry is not None and entry.is_fresh:
+                self.cache.record(hit=True)
+                logger.info(f"Serving {url} from response cache")
+                return self._cached_result(entry, etag, last_modified)
+
+            # Revalidate our stale copy if it has validators, otherwise the caller's previous fetch
+            if entry is not None and (entry.etag or entry.last_modified):
+                etag_header, modified_header = entry.etag, entry.last_modified
+            else:
+                entry = None
+                etag_header, modified_header = etag, last_modified
+
+            headers = dict(self.headers)
+            if etag_header:
+                headers['If-None-Match'] = etag_header
+            if modified_header:
+                headers['If-Modified-Since'] = modified_header
+
+            # Make the request; the body is streamed so it can be capped and checked first
+            response = self.session.get(
                 url,
-                headers=self.headers,
+                headers=headers,
                 timeout=self.timeout,
-                allow_redirects=True
+                allow_redirects=True,
+                stream=True
             )
-            response.raise_for_status()
-
-            # Parse HTML
-            soup = BeautifulSoup(response.text, 'html.parser')
-
-            # Remove script and style elements
-            for script in soup(["script", "style", "nav", "footer", "header"]):
-                script.decompose()
 
-            # Extract title
-            title = soup.find('title')
-            title_text = title.get_text().strip() if title else "No title"
-
-            # Extract main content
-            content = self._extract_main_content(soup)
-
-            # Extract metadata
-            metadata = self._extract_metadata(soup, url)
-
-            if not content.strip():
-                raise ValueError("No readable content found on the webpage")
-
-            logger.info(f"Successfully extracted {len(content)} characters from {url}")
-
-            return {
-                'content': content,
-                'title': title_text,
-                'url': url,
-                'metadata': metadata,
-                'word_count': len(content.split()),
-                'char_count': len(content)
-            }
+            with response:
+                if response.status_code == 304:
+                    if entry is None:
+                        logger.info(f"Content not modified since last fetch: {url}")
+                        return {'url': url, 'not_modified': True}
+                    self.cache.refresh(entry, response.headers.get('Cache-Control'))
+                    self.cache.record(hit=True)
+                    logger.info(f"Revalidated cached copy of {url}")
+                    return self._cached_result(entry, etag, last_modified)
+
+                if self.cache:
+                    self.cache.record(hit=False)
+                response.raise_for_status()
+
+                content_kind = self._content_kind(response, url)
+                validators = {
+                    'etag': response.headers.get('ETag'),
+                    'last_modified': response.headers.get('Last-Modified')
+                }
+
+                if content_kind == 'pdf':
+                    # Hand PDFs to the caller as a file for PDFProcessor instead of parsing them as HTML
+                    pdf_file = self._download_to_file(response)
+                    logger.info(f"Downloaded PDF from {url} ({pdf_file.tell()} bytes)")
+                    pdf_file.seek(0)
+                    return {
+                        'url': url,
+                        'content_type': 'pdf',
+                        'pdf_file': pdf_file,
+                        'filename': os.path.basename(urlparse(response.url or url).path) or 'document.pdf',
+                        'not_modified': False,
+                        **validators
+                    }
+
+                html = self._download_text(response)
+
+            result = self._parse_html(html, url)
+            result.update(validators)
+
+            if self.cache:
+                self.cache.store(
+                    url, html, result,
+                    cache_control=response.headers.get('Cache-Control'),
+                    etag=result['etag'],
+                    last_modified=result['last_modified']
+                )
+
+            return self._copy_result(result)
 
         except requests.exceptions.Timeout:
             raise Exception(f"Request timeout while accessing {url}")
@@ -100,85 +167,128 @@ class WebScraper:
             logger.error(f"Error scraping {url}: {str(e)}")
             raise Exception(f"Failed to scrape content from {url}: {str(e)}")
 
-    def _extract_main_content(self, soup: BeautifulSoup) -> str:
+    def _content_kind(self, response: requests.Response, url: str) -> str:
         """
-        Extract main content using multiple strategies
+        Classify a response as 'html' or 'pdf' from its headers, rejecting
+        oversized bodies and other content types before anything is downloaded
         """
-        content_parts = []
-
-        # Strategy 1: Look for main content containers
-        main_selectors = [
-            'main', 'article', '[role="main"]',
-            '.content', '#content', '.post-content',
-            '.entry-content', '.article-content'
-        ]
-
-        for selector in main_selectors:
-            main_content = soup.select_one(selector)
-            if main_content:
-                content_parts.append(self._extract_text_from_element(main_content))
-                break
-
-        # Strategy 2: Extract paragraphs if no main content found
-        if not content_parts:
-            paragraphs = soup.find_all('p')
-            for p in paragraphs:
-                text = p.get_text().strip()
-                if len(text) > 20:  # Only include substantial paragraphs
-                    content_parts.append(text)
-
-        # Strategy 3: Fallback to div elements with substantial text
-        if not content_parts:
-            divs = soup.find_all('div')
-            for div in divs:
-                text = div.get_text().strip()
-                if len(text) > 100 and len(text.split()) > 20:
-                    content_parts.append(text)
-
-        return '\n\n'.join(content_parts)
-
-    def _extract_text_from_element(self, element) -> str:
+        content_length = response.headers.get('Content-Length', '')
+        if content_length.isdigit() and int(content_length) > self.max_bytes:
+            raise ValueError(f"Content size ({content_length} bytes) exceeds maximum allowed size")
+
+        content_type = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+        path = urlparse(response.url or url).path.lower()
+
+        if content_type in PDF_CONTENT_TYPES or (
+            content_type in ('', 'application/octet-stream') and path.endswith('.pdf')
+        ):
+            return 'pdf'
+        if not content_type or content_type in HTML_CONTENT_TYPES:
+            return 'html'
+        raise ValueError(f"Unsupported content type: {content_type}")
+
+    def _iter_body(self, response: requests.Response):
         """
-        Extract clean text from an HTML element
+        Yield the (decompressed) body in chunks, aborting once it exceeds max_bytes
         """
-        # Get text and clean it up
-        text = element.get_text(separator='\n')
-
-        # Clean up whitespace
-        lines = [line.strip() for line in text.split('\n')]
-        lines = [line for line in lines if line]  # Remove empty lines
-
-        return '\n'.join(lines)
-
-    def _extract_metadata(self, soup: BeautifulSoup, url: str) -> Dict[str, Any]:
+        received = 0
+        for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+            received += len(chunk)
+            if received > self.max_bytes:
+                raise ValueError(f"Content exceeds maximum allowed size of {self.max_bytes} bytes")
+            yield chunk
+
+    def _download_text(self, response: requests.Response) -> str:
         """
-        Extract metadata from the webpage
+        Download and decode an HTML body incrementally
         """
-        metadata = {'source_url': url}
-
-        # Extract meta description
-        meta_desc = soup.find('meta', attrs={'name': 'description'})
-        if meta_desc:
-            metadata['description'] = meta_desc.get('content', '')
+        decoder = None
+        head = b''
+        parts = []
+
+        for chunk in self._iter_body(response):
+            if decoder is None:
+                # Wait for enough bytes to find a <meta charset> declaration
+                head += chunk
+                if len(head) < ENCODING_SNIFF_BYTES:
+                    continue
+                decoder = self._make_decoder(response, head)
+                chunk, head = head, b''
+            parts.append(decoder.decode(chunk))
+
+        if decoder is None:
+            decoder = self._make_decoder(response, head)
+            parts.append(decoder.decode(head))
+        parts.append(decoder.decode(b'', final=True))
+        return ''.join(parts)
+
+    @staticmethod
+    def _make_decoder(response: requests.Response, head: bytes):
+        """
+        Incremental decoder for the charset from the Content-Type header,
+        the document's <meta charset>, or UTF-8
+        """
+        encoding = None
+        if 'charset' in response.headers.get('Content-Type', '').lower():
+            encoding = response.encoding
+        if not encoding:
+            match = META_CHARSET_RE.search(head[:ENCODING_SNIFF_BYTES])
+            if match:
+                encoding = match.group(1).decode('ascii', 'ignore')
 
-        # Extract meta keywords
-        meta_keywords = soup.find('meta', attrs={'name': 'keywords'})
-        if meta_keywords:
-            metadata['keywords'] = meta_keywords.get('content', '')
+        try:
+            return codecs.getincrementaldecoder(encoding or 'utf-8')(errors='replace')
+        except LookupError:
+            return codecs.getincrementaldecoder('utf-8')(errors='replace')
 
-        # Extract author
-        author = soup.find('meta', attrs={'name': 'author'})
-        if author:
-            metadata['author'] = author.get('content', '')
+    def _download_to_file(self, response: requests.Response):
+        """
+        Download a binary body into a temporary file that spills to disk when large
+        """
+        spooled = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+        try:
+            for chunk in self._iter_body(response):
+                spooled.write(chunk)
+        except Exception:
+            spooled.close()
+            raise
+        return spooled
 
-        # Extract publication date
-        pub_date = soup.find('meta', attrs={'property': 'article:published_time'})
-        if not pub_date:
-            pub_date = soup.find('meta', attrs={'name': 'date'})
-        if pub_date:
-            metadata['published_date'] = pub_date.get('content', '')
+    def _parse_html(self, html: str, url: str) -> Dict[str, Any]:
+        """
+        Parse a page and extract its title, main content and metadata
+        """
+        extracted = self.extractor.extract(html, url)
+        content = extracted['content']
+
+        if not content.strip():
+            raise ValueError("No readable content found on the webpage")
+
+        logger.info(f"Successfully extracted {len(content)} characters from {url} ({self.extractor.name})")
+
+        return {
+            'content': content,
+            'title': extracted['title'],
+            'url': url,
+            'metadata': extracted['metadata'],
+            'word_count': len(content.split()),
+            'char_count': len(content),
+            'not_modified': False
+        }
 
-        return metadata
+    def _cached_result(self, entry: CachedResponse, etag: Optional[str],
+                       last_modified: Optional[str]) -> Dict[str, Any]:
+        """
+        Result for a cached page, or not_modified when it is the caller's previous version
+        """
+        if (etag and etag == entry.etag) or (not etag and last_modified and last_modified == entry.last_modified):
+            return {'url': entry.url, 'not_modified': True}
+        return self._copy_result(entry.result)
+
+    @staticmethod
+    def _copy_result(result: Dict[str, Any]) -> Dict[str, Any]:
+        # Callers get their own copy so the cached entry cannot be modified
+        return {**result, 'metadata': dict(result['metadata'])}
 
 
 # Convenience function for backward compatibility
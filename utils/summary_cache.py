@@ -0,0 +1,142 @@
+import os
+import re
+import json
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional
+from config import get_config
+
+logger = logging.getLogger(__name__)
+
+
+class DegradedSummaryError(Exception):
+    """
+    Raised by a summary factory when generation partly failed; carries the
+    best-effort summary, which is returned but not cached
+    """
+
+    def __init__(self, summary: str, reason: str):
+        super().__init__(reason)
+        self.summary = summary
+
+
+class SummaryCache:
+    """
+    LRU cache of generated document summaries with optional on-disk persistence.
+
+    Keys combine the document content hash and the summary prompt version, so
+    a prompt change never serves summaries produced by the old prompts.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, persist_path: Optional[str] = None):
+        config = get_config()
+        self.max_entries = max_entries or config.SUMMARY_CACHE_MAX_ENTRIES
+        if persist_path is None and config.SUMMARY_CACHE_PERSIST:
+            persist_path = os.path.join(config.VECTOR_STORE_PATH, 'summaries')
+        self.persist_path = persist_path
+        if self.persist_path:
+            os.makedirs(self.persist_path, exist_ok=True)
+
+        self._entries: 'OrderedDict[str, str]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks = {}
+
+    @staticmethod
+    def make_key(document_id: str, prompt_version: int) -> str:
+        """
+        Build the cache key for a document and prompt version
+        """
+        return f"{document_id}-v{prompt_version}"
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Look up a summary in memory, then on disk
+        """
+        with self._lock:
+            summary = self._entries.get(key)
+            if summary is not None:
+                self._entries.move_to_end(key)
+                return summary
+
+        summary = self._read_from_disk(key)
+        if summary is not None:
+            self._remember(key, summary)
+        return summary
+
+    def set(self, key: str, summary: str):
+        """
+        Store a summary in memory and, when enabled, on disk
+        """
+        self._remember(key, summary)
+        self._write_to_disk(key, summary)
+
+    def get_or_create(self, key: str, factory: Callable[[], str], refresh: bool = False) -> str:
+        """
+        Return the cached summary, generating it with factory() on a miss or when refresh is set.
+        Concurrent requests for the same key wait for a single generation.
+        A factory raising DegradedSummaryError has its summary returned uncached,
+        so the next request generates it again.
+        """
+        if not refresh:
+            summary = self.get(key)
+            if summary is not None:
+                return summary
+
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            # Another request may have generated it while we were waiting
+            if not refresh:
+                summary = self.get(key)
+                if summary is not None:
+                    return summary
+
+            try:
+                summary = factory()
+                self.set(key, summary)
+            except DegradedSummaryError as e:
+                logger.warning(f"Not caching degraded summary {key}: {str(e)}")
+                summary = e.summary
+            finally:
+                with self._lock:
+                    self._key_locks.pop(key, None)
+
+        return summary
+
+    def _remember(self, key: str, summary: str):
+        with self._lock:
+            self._entries[key] = summary
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _disk_path(self, key: str) -> Optional[str]:
+        if not self.persist_path or not re.fullmatch(r'[0-9a-zA-Z_-]+', key):
+            return None
+        return os.path.join(self.persist_path, f'{key}.json')
+
+    def _read_from_disk(self, key: str) -> Optional[str]:
+        path = self._disk_path(key)
+        if not path or not os.path.isfile(path):
+            return None
+        try:
+            with open(path, encoding='utf-8') as f:
+                return json.load(f)['summary_markdown']
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Ignoring unreadable cached summary {path}: {str(e)}")
+            return None
+
+    def _write_to_disk(self, key: str, summary: str):
+        path = self._disk_path(key)
+        if not path:
+            return
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'summary_markdown': summary, 'created_at': time.time()}, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Failed to persist summary {key}: {str(e)}")
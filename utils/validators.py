@@ -1,7 +1,7 @@
 import re
 import validators
 from urllib.parse import urlparse
-from typing import List, Optional
+from typing import List, Optional, Dict, Any
 from werkzeug.datastructures import FileStorage
 
 
@@ -105,6 +105,67 @@ def validate_question(question: str) -> bool:
     return True
 
 
+def validate_document_id(document_id: str) -> bool:
+    """
+    Validate a document ID as returned by /api/analyze
+    """
+    if not document_id or not isinstance(document_id, str):
+        return False
+
+    return re.fullmatch(r'[0-9a-f]{32}', document_id) is not None
+
+
+def get_string_field(data: Dict[str, Any], name: str) -> str:
+    """
+    Read an optional string field from a request body, stripped ('' when
+    missing or null), raising ValueError when it is not a string
+    """
+    value = data.get(name)
+    if value is None:
+        return ''
+    if not isinstance(value, str):
+        raise ValueError(f'{name} must be a string')
+    return value.strip()
+
+
+def parse_retrieval_options(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Read optional per-request retrieval settings (k, vector_weight,
+    keyword_weight, rrf_k, rerank) from a request body, raising ValueError when invalid
+    """
+    options = data.get('retrieval') or {}
+    if not isinstance(options, dict):
+        raise ValueError('retrieval must be an object')
+
+    parsed = {}
+    limits = {
+        'k': (int, 1, 20),
+        'vector_weight': (float, 0.0, 10.0),
+        'keyword_weight': (float, 0.0, 10.0),
+        'rrf_k': (int, 1, 1000),
+    }
+    for name, (cast, low, high) in limits.items():
+        if options.get(name) is None:
+            continue
+        try:
+            value = cast(options[name])
+        except (TypeError, ValueError):
+            raise ValueError(f'retrieval.{name} must be a number')
+        if not low <= value <= high:
+            raise ValueError(f'retrieval.{name} must be between {low} and {high}')
+        parsed[name] = value
+
+    if options.get('rerank') is not None:
+        if not isinstance(options['rerank'], bool):
+            raise ValueError('retrieval.rerank must be true or false')
+        parsed['rerank'] = options['rerank']
+
+    if parsed.get('vector_weight') == 0 and parsed.get('keyword_weight') == 0:
+        raise ValueError('retrieval weights cannot both be zero')
+
+    return parsed
+
+
 def sanitize_filename(filename: str) -> str:
     """
     Sanitize filename for safe storage
@@ -0,0 +1,121 @@
+import math
+import logging
+from typing import Optional
+
+import faiss
+import numpy as np
+from config import get_config
+
+logger = logging.getLogger(__name__)
+
+# Supported FAISS_INDEX_TYPE values
+INDEX_TYPES = ('flat', 'ivf', 'hnsw', 'ivfpq')
+
+
+def index_type_of(index) -> str:
+    """
+    Classify a FAISS index as one of INDEX_TYPES
+    """
+    if isinstance(index, faiss.IndexHNSW):
+        return 'hnsw'
+    if isinstance(index, faiss.IndexIVFPQ):
+        return 'ivfpq'
+    if isinstance(index, faiss.IndexIVF):
+        return 'ivf'
+    return 'flat'
+
+
+def create_index(vectors: np.ndarray, index_type: Optional[str] = None) -> faiss.Index:
+    """
+    Build (training when needed) an index of the given type over vectors.
+    Every type uses the L2 metric like the flat index, so scores stay
+    comparable, and vectors keep their insertion positions as IDs.
+    """
+    config = get_config()
+    index_type = index_type or config.FAISS_INDEX_TYPE
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown FAISS index type: {index_type}. Expected one of {INDEX_TYPES}")
+
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    count, dim = vectors.shape
+
+    if index_type == 'flat':
+        index = faiss.IndexFlatL2(dim)
+    elif index_type == 'hnsw':
+        index = faiss.IndexHNSWFlat(dim, config.FAISS_HNSW_M)
+        index.hnsw.efConstruction = config.FAISS_HNSW_EF_CONSTRUCTION
+    else:
+        # Around 4 * sqrt(n) lists, with enough training points per list
+        nlist = config.FAISS_IVF_NLIST or int(4 * math.sqrt(count))
+        nlist = max(1, min(nlist, count // 39))
+        quantizer = faiss.IndexFlatL2(dim)
+        if index_type == 'ivf':
+            index = faiss.IndexIVFFlat(quantizer, dim, nlist)
+        else:
+            pq_m = config.FAISS_PQ_M
+            if dim % pq_m:
+                raise ValueError(f"FAISS_PQ_M ({pq_m}) must divide the embedding dimension ({dim})")
+            # 8-bit codes need 256 * 39 training points; use fewer bits below that
+            nbits = max(1, min(8, int(math.log2(max(count // 39, 2)))))
+            index = faiss.IndexIVFPQ(quantizer, dim, nlist, pq_m, nbits)
+
+        index.train(vectors)
+
+    index.add(vectors)
+    configure_search(index)
+    return index
+
+
+def configure_search(index):
+    """
+    Apply the configured search-time parameters (nprobe, efSearch)
+    """
+    config = get_config()
+    index_type = index_type_of(index)
+    if index_type == 'hnsw':
+        index.hnsw.efSearch = config.FAISS_HNSW_EF_SEARCH
+    elif index_type in ('ivf', 'ivfpq'):
+        faiss.extract_index_ivf(index).nprobe = config.FAISS_IVF_NPROBE
+
+
+def reconstruct_all(index) -> np.ndarray:
+    """
+    Get the stored vectors of any index in position order
+    (approximate for PQ-compressed indexes)
+    """
+    if index.ntotal == 0:
+        return np.zeros((0, index.d), dtype=np.float32)
+    if index_type_of(index) in ('ivf', 'ivfpq'):
+        faiss.extract_index_ivf(index).make_direct_map()
+    return index.reconstruct_n(0, index.ntotal)
+
+
+def build_search_index(index, index_type: Optional[str] = None,
+                       min_chunks: Optional[int] = None) -> faiss.Index:
+    """
+    Convert a flat index to the configured approximate type once it holds at
+    least FAISS_ANN_MIN_CHUNKS vectors; smaller or already converted indexes
+    are returned unchanged
+    """
+    config = get_config()
+    index_type = index_type or config.FAISS_INDEX_TYPE
+    min_chunks = config.FAISS_ANN_MIN_CHUNKS if min_chunks is None else min_chunks
+
+    if index_type == 'flat' or index.ntotal < min_chunks or index_type_of(index) != 'flat':
+        return index
+
+    logger.info(f"Building {index_type} index over {index.ntotal} vectors")
+    return create_index(reconstruct_all(index), index_type)
+
+
+def to_flat(index, vectors: Optional[np.ndarray] = None) -> faiss.Index:
+    """
+    Get a flat copy of an index (e.g. to delete from it: approximate indexes
+    either can't remove vectors or don't renumber the remaining ones).
+    Pass the original vectors to avoid PQ reconstruction loss.
+    """
+    if index_type_of(index) == 'flat':
+        return index
+    flat = faiss.IndexFlatL2(index.d)
+    flat.add(np.ascontiguousarray(reconstruct_all(index) if vectors is None else vectors, dtype=np.float32))
+    return flat